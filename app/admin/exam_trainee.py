@@ -3,9 +3,10 @@ Exam Trainees Management
 
 This module handles the management of exam trainees.
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from ..models.exam_trainee import ExamTrainee
+from ..models.base import keyset_paginate
 from ..forms.exam_trainee import ExamTraineeForm
 from ..utils.decorators import admin_required
 from datetime import datetime
@@ -22,6 +23,7 @@ def list_trainees():
     """List all exam trainees with search and filters."""
     search = request.args.get('search', '')
     status = request.args.get('status', '')
+    cursor = request.args.get('cursor')
     
     query = {}
     
@@ -38,11 +40,14 @@ def list_trainees():
     if status in ['registered', 'in_progress', 'completed']:
         query['status'] = status
     
-    # Get all matching trainees
-    trainees = ExamTrainee.objects(**query).order_by('-registration_date')
+    # One page of matching trainees, newest registrations first
+    pagination = keyset_paginate(ExamTrainee.objects(**query), cursor=cursor,
+                                 per_page=current_app.config.get('ITEMS_PER_PAGE', 20),
+                                 order_field='registration_date', count='cached')
     
     return render_template('admin/exam_trainee/list.html',
-                         trainees=trainees,
+                         trainees=pagination.items,
+                         pagination=pagination,
                          search=search,
                          status=status)
 
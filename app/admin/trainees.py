@@ -32,6 +32,7 @@ def list_trainees():
     status = request.args.get('status', 'all')
     program = request.args.get('program', 'all')
     search = request.args.get('search', '').strip()
+    cursor = request.args.get('cursor')
     
     # Build query
     query = {}
@@ -42,23 +43,37 @@ def list_trainees():
     
     # Get trainees with user information
     if Trainee:
-        trainees = Trainee.objects(**query).order_by('-created_at')
+        trainees = Trainee.objects(**query)
         
         # Apply search filter if provided
         if search:
             # Get user IDs matching search
-            users = User.objects(name__icontains=search)
-            user_ids = [str(user.id) for user in users]
+            user_ids = User.objects(name__icontains=search).distinct('id')
             trainees = trainees.filter(user__in=user_ids)
         
+        # Keyset pagination, newest first, as read-only rows
+        trainees = trainees.fast('user', 'id_number', 'phone', 'city', 'training_program', 'status',
+                                 'start_date', 'end_date', 'created_at')
+        pagination = trainees.keyset_paginate(cursor=cursor, per_page=current_app.config.get('ITEMS_PER_PAGE', 20),
+                                              count='cached')
+        trainees = pagination.items
+        
+        # Rows hold the user id: resolve the page's names in one query
+        user_names = {user.id: user.name
+                      for user in User.objects(id__in=[t.user for t in trainees]).fast('name')}
+        
         # Get unique programs for filter
-        programs = sorted(list(set(t.training_program for t in Trainee.objects.distinct('training_program') if t.training_program)))
+        programs = sorted(name for name in Trainee.objects.distinct('training_program') if name)
     else:
         trainees = []
         programs = []
+        pagination = None
+        user_names = {}
     
     return render_template('admin/trainees/list.html',
                          trainees=trainees,
+                         pagination=pagination,
+                         user_names=user_names,
                          status=status,
                          program=program,
                          search=search,
@@ -251,9 +266,11 @@ def update_status(trainee_id):
         if not status:
             return jsonify({'success': False, 'message': 'No status provided'}), 400
         
+        if status not in Trainee.status.choices:
+            return jsonify({'success': False, 'message': 'Invalid status'}), 400
+        
         trainee = Trainee.objects.get_or_404(id=trainee_id)
-        trainee.status = status
-        trainee.save()
+        trainee.atomic_update(set={'status': status})
         
         return jsonify({'success': True})
     except Exception as e:
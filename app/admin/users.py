@@ -22,7 +22,7 @@ def list_users():
     
     search = request.args.get('search', '')
     role = request.args.get('role', '')
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 6  # Show 6 users per page
     
     query = {}
@@ -67,31 +67,16 @@ def list_users():
     if final_query != Q():
         query = final_query
     
-    # Get total count with current filters
     if isinstance(query, dict):
-        total = User.objects(**query).count()
         users_query = User.objects(**query)
     else:
-        total = User.objects(query).count()
         users_query = User.objects(query)
     
-    # Calculate pagination and get paginated results
-    skip = (page - 1) * per_page
-    users = users_query.order_by('-created_at').skip(skip).limit(per_page)
-    
-    # Create pagination object for template
-    pagination = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'pages': (total + per_page - 1) // per_page if per_page > 0 else 1,
-        'has_prev': page > 1,
-        'has_next': skip + per_page < total,
-        'prev_num': page - 1 if page > 1 else None,
-        'next_num': page + 1 if skip + per_page < total else None,
-        'first': skip + 1 if total > 0 else 0,
-        'last': min(skip + per_page, total) if total > 0 else 0
-    }
+    # Keyset pagination: no skip() over earlier pages and no count() per page view.
+    # The template only reads these fields, so rows are not built into User documents
+    users_query = users_query.fast('name', 'email', 'is_active', 'created_at')
+    pagination = users_query.keyset_paginate(cursor=cursor, per_page=per_page, count='estimated')
+    users = pagination.items
     
     return render_template('admin/users/list.html',
                          users=users,
@@ -112,8 +97,10 @@ def toggle_user_status(user_id):
         if user == current_user:
             return jsonify({'success': False, 'message': 'לא ניתן לשנות את הסטטוס של עצמך'}), 400
             
-        user.is_active = not user.is_active
-        user.save()
+        # Conditional on the value shown, so concurrent toggles don't cancel out
+        if not user.atomic_update(set={'is_active': not user.is_active},
+                                  conditions={'is_active': user.is_active}):
+            return jsonify({'success': False, 'message': 'סטטוס המשתמש שונה בינתיים, יש לרענן את הדף'}), 409
         
         return jsonify({
             'success': True, 
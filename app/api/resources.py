@@ -13,12 +13,17 @@ from datetime import datetime
 
 # Local imports
 from ..models import get_model
+from ..models.serializers import AssessmentSerializer, QuestionSerializer
 User = get_model('User')
 Assessment = get_model('Assessment')
 Question = get_model('Question')
 AudioRecording = get_model('AudioRecording')
+AudioProcessingJob = get_model('AudioProcessingJob')
 from ..utils.decorators import admin_required, examiner_required
-from ..utils.audio_processing import process_audio_file
+from ..utils.helpers import can_access_assessment
+from ..utils.audio_probe import probe_audio
+from ..utils.media import send_media
+from ..services.audio_queue import enqueue_recording
 
 # Request parsers
 assessment_parser = reqparse.RequestParser()
@@ -46,7 +51,9 @@ class AssessmentResource(Resource):
                    str(assessment.candidate_id) == str(current_user.id)):
                 abort(403, message='You do not have permission to view this assessment')
                 
-            return assessment.to_dict()
+            data = AssessmentSerializer.dump(assessment, 'detail')
+            data['questions'] = QuestionSerializer.dump_rows(get_model('QuestionBucket').raw_items_for(assessment.id))
+            return data
         else:
             # Get all assessments (filtered by user role)
             if current_user.is_admin:
@@ -56,7 +63,8 @@ class AssessmentResource(Resource):
             else:
                 assessments = Assessment.objects(candidate_id=current_user.id)
                 
-            return [a.to_dict() for a in assessments]
+            # Projected raw rows: no documents are constructed for the list
+            return AssessmentSerializer.dump_many(assessments, 'summary')
     
     @login_required
     @examiner_required
@@ -120,11 +128,13 @@ class QuestionResource(Resource):
         
         if question_id:
             # Get single question
-            question = assessment.questions.filter(id=question_id).first_or_404()
+            question = assessment.get_question(question_id)
+            if question is None:
+                abort(404, message='Question not found')
             return question.to_dict()
         else:
             # Get all questions for assessment
-            return [q.to_dict() for q in assessment.questions]
+            return [q.to_dict() for q in assessment.get_questions()]
     
     @login_required
     @examiner_required
@@ -145,8 +155,7 @@ class QuestionResource(Resource):
             created_by=current_user.id
         )
         
-        assessment.questions.append(question)
-        assessment.save()
+        assessment.append_question(question)
         
         return question.to_dict(), 201
 
@@ -156,7 +165,7 @@ class AudioRecordingResource(Resource):
     
     @login_required
     def post(self, assessment_id, question_id):
-        """Upload an audio recording for a question."""
+        """Upload an audio recording for a question and queue it for processing."""
         if 'audio' not in request.files:
             abort(400, message='No audio file provided')
         
@@ -167,7 +176,9 @@ class AudioRecordingResource(Resource):
         
         # Get assessment and question
         assessment = Assessment.objects.get_or_404(id=assessment_id)
-        question = assessment.questions.filter(id=question_id).first_or_404()
+        question = assessment.get_question(question_id)
+        if question is None:
+            abort(404, message='Question not found')
         
         # Check permissions
         if not (current_user.is_admin or 
@@ -185,32 +196,100 @@ class AudioRecordingResource(Resource):
         # Save the file
         audio_file.save(filepath)
         
-        # Process the audio file (transcribe, analyze, etc.)
+        # Read duration/format from the header so listings never decode audio
+        info = probe_audio(filepath) or {}
+        
+        # Create the recording and queue it for background processing
         try:
-            transcription = process_audio_file(filepath)
-            
-            # Create audio recording
             recording = AudioRecording(
                 file_path=filepath,
                 file_name=audio_file.filename,
-                mime_type=audio_file.mimetype,
-                transcription=transcription,
-                recorded_by=current_user.id
+                file_type=audio_file.mimetype,
+                file_size=os.path.getsize(filepath),
+                duration=info.get('duration') or 0.0,
+                sample_rate=info.get('sample_rate'),
+                channels=info.get('channels') or 1,
+                is_processed=False
             )
             
-            # Add recording to question
-            question.recording = recording
-            question.updated_at = datetime.utcnow()
-            assessment.save()
+            # Append the recording to its bucket and link the question to it
+            assessment.append_recording(recording)
+            assessment.link_recording(question.id, recording.id)
+            
+            job = enqueue_recording(assessment.id, recording.id, filepath)
             
-            return recording.to_dict(), 201
+            return {
+                'job_id': str(job.id),
+                'status': job.status,
+                'recording': recording.to_dict()
+            }, 202
             
         except Exception as e:
-            # Clean up the file if processing fails
+            # Clean up the file if it could not be queued
             if os.path.exists(filepath):
                 os.remove(filepath)
-            current_app.logger.error(f'Error processing audio file: {str(e)}')
-            abort(500, message='Error processing audio file')
+            current_app.logger.error(f'Error queueing audio file: {str(e)}')
+            abort(500, message='Error queueing audio file')
+
+
+class AudioJobResource(Resource):
+    """Resource for polling background audio processing jobs."""
+    
+    @login_required
+    def get(self, job_id):
+        """Get the status of an audio processing job."""
+        job = AudioProcessingJob.objects.get_or_404(id=job_id)
+        assessment = Assessment.objects.get_or_404(id=job.assessment_id)
+        
+        # Check permissions
+        if not can_access_assessment(assessment):
+            abort(403, message='You do not have permission to view this job')
+        
+        data = job.to_dict()
+        if job.status == AudioProcessingJob.STATUS_DONE:
+            recording = assessment.get_recording(job.recording_id)
+            data['recording'] = recording.to_dict() if recording else None
+        return data
+
+
+class RecordingPreviewResource(Resource):
+    """Resource serving a recording's audio and its precomputed previews."""
+    
+    PREVIEWS = {
+        'audio': ('file_path', None),
+        'waveform': ('waveform_path', 'application/octet-stream'),
+        'spectrogram': ('spectrogram_path', 'image/png')
+    }
+    
+    @login_required
+    def get(self, assessment_id, recording_id, kind):
+        """Get a recording preview."""
+        if kind not in self.PREVIEWS:
+            abort(404, message='Unknown preview type')
+        
+        assessment = Assessment.objects.get_or_404(id=assessment_id)
+        
+        # Check permissions
+        if not can_access_assessment(assessment):
+            abort(403, message='You do not have permission to view this recording')
+        
+        recording = assessment.get_recording(recording_id)
+        field, mimetype = self.PREVIEWS[kind]
+        path = getattr(recording, field, None) if recording else None
+        if not path or not os.path.exists(path):
+            abort(404, message='Preview not available')
+        
+        # Recordings and previews never change once written, so let browsers keep them
+        max_age = current_app.config.get('AUDIO_PREVIEW_MAX_AGE', 365 * 24 * 3600)
+        if kind == 'audio':
+            response = send_media(path, mimetype=recording.file_type or None,
+                                  download_name=recording.file_name, max_age=max_age)
+        else:
+            response = send_media(path, mimetype=mimetype, max_age=max_age)
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
 
 
 # Register API resources
@@ -226,3 +305,9 @@ def register_resources(api):
                     
     api.add_resource(AudioRecordingResource,
                     '/assessments/<string:assessment_id>/questions/<string:question_id>/recording')
+                    
+    api.add_resource(AudioJobResource,
+                    '/audio-jobs/<string:job_id>')
+                    
+    api.add_resource(RecordingPreviewResource,
+                    '/assessments/<string:assessment_id>/recordings/<string:recording_id>/<string:kind>')
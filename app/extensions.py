@@ -55,8 +55,11 @@ def import_models():
     from .models.base import BaseDocument
     from .models.role import Role
     from .models.user import User
-    from .models.assessment import Assessment, Question, AudioRecording
+    from .models.assessment import Assessment, Question, AudioRecording, QuestionBucket, RecordingBucket
     from .models.notification import Notification
+    from .models.audio_job import AudioProcessingJob
+    from .models.audio_upload import AudioUpload
+    from .models.llm_cache import LLMCacheEntry
     
     # Get all registered models from the registry
     from .models.registry import registry as models_registry
@@ -162,10 +165,16 @@ def init_extensions(app):
             from .models.notification import Notification
             
             # 4. Import Assessment models (depend on User)
-            from .models.assessment import Assessment, Question, AudioRecording
+            from .models.assessment import Assessment, Question, AudioRecording, QuestionBucket, RecordingBucket
+            
+            # 5. Import background job models
+            from .models.audio_job import AudioProcessingJob
+            from .models.audio_upload import AudioUpload
+            from .models.llm_cache import LLMCacheEntry
             
             # Force registration of all models
-            models = [Role, User, Notification, Assessment, Question, AudioRecording]
+            models = [Role, User, Notification, Assessment, Question, AudioRecording, QuestionBucket,
+                      RecordingBucket, AudioProcessingJob, AudioUpload, LLMCacheEntry]
             
             # Ensure all models are registered with MongoEngine
             for model in models:
@@ -169,4 +169,4 @@ def internal_error(error):
 bp = main_bp
 
 # Import routes, forms, and utils
-from . import routes, forms, utils
+from . import routes, forms, utils, api
@@ -0,0 +1,249 @@
+"""
+Main API Routes
+
+JSON and streaming endpoints of the main blueprint: question generation,
+evaluation, notifications and chunked recording uploads.
+"""
+import json
+import logging
+from bson import ObjectId
+from flask import request, current_app, jsonify, Response, stream_with_context
+from flask_login import login_required, current_user
+from . import main_bp
+from ..models import get_model
+from ..utils.decorators import examiner_required
+from ..utils.helpers import can_access, can_access_assessment
+
+logger = logging.getLogger(__name__)
+
+Assessment = get_model('Assessment')
+
+def _question_request():
+    """Read the transcript, context and question count of a question-generation request."""
+    data = request.get_json(silent=True) or {}
+    try:
+        num_questions = min(max(int(data.get('num_questions', 3)), 1), 10)
+    except (TypeError, ValueError):
+        num_questions = 3
+    return (data.get('transcript') or '').strip(), data.get('context'), num_questions
+
+@main_bp.route('/api/generate-questions', methods=['POST'])
+@login_required
+def generate_questions_api():
+    """Generate follow-up questions for a transcript."""
+    from utils.openai_utils import generate_questions
+    
+    transcript, context, num_questions = _question_request()
+    if not transcript:
+        return jsonify({'success': False, 'error': 'No transcript provided'}), 400
+    
+    questions = generate_questions(transcript, context, num_questions)
+    if not questions:
+        return jsonify({'success': False, 'error': 'Failed to generate questions'}), 502
+    return jsonify({'success': True, 'questions': questions})
+
+@main_bp.route('/api/generate-questions/stream', methods=['POST'])
+@login_required
+def stream_questions_api():
+    """
+    Stream follow-up questions as Server-Sent Events.
+    
+    Each question is sent as a ``question`` event as soon as the model has
+    finished it, followed by one ``done`` event, or an ``error`` event if
+    generation fails part-way.
+    """
+    from utils.openai_utils import stream_questions
+    
+    transcript, context, num_questions = _question_request()
+    if not transcript:
+        return jsonify({'success': False, 'error': 'No transcript provided'}), 400
+    
+    def event(name, payload):
+        return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+    
+    def generate():
+        count = 0
+        try:
+            for question in stream_questions(transcript, context, num_questions):
+                yield event('question', {'index': count, 'text': question})
+                count += 1
+        except Exception as e:
+            logger.error(f"Error streaming questions: {str(e)}")
+            yield event('error', {'error': 'Failed to generate questions'})
+            return
+        yield event('done', {'count': count})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # let nginx pass events through unbuffered
+    })
+
+@main_bp.route('/api/evaluate', methods=['POST'])
+@login_required
+@examiner_required
+def evaluate_assessment_api():
+    """
+    Score an assessment's transcripts and store the result.
+    
+    Repeating the request for unchanged transcripts is served from the LLM
+    cache; ``{"refresh": true}`` asks the model again.
+    """
+    from utils.openai_utils import evaluate_response
+    
+    data = request.get_json(silent=True) or {}
+    assessment_id = str(data.get('assessmentId') or '')
+    assessment = Assessment.objects(id=assessment_id).first() if ObjectId.is_valid(assessment_id) else None
+    if not assessment:
+        return jsonify({'success': False, 'error': 'Assessment not found'}), 404
+    
+    transcript = "\n\n".join(r.transcript for r in assessment.get_recordings() if r.transcript)
+    if not transcript:
+        return jsonify({'success': False, 'error': 'No transcripts available for evaluation'}), 400
+    
+    result = evaluate_response(transcript, refresh=bool(data.get('refresh')))
+    if not result['scores']:
+        return jsonify({'success': False, 'error': 'Evaluation failed'}), 502
+    
+    assessment.apply_evaluation(result['scores'], result['justifications'])
+    return jsonify({
+        'success': True,
+        'scores': result['scores'],
+        'justifications': result['justifications'],
+        'summary': result['summary'],
+        'overall_score': assessment.overall_score,
+        'icao_level': assessment.icao_level
+    })
+
+@main_bp.route('/api/notifications', methods=['GET'])
+@login_required
+def list_notifications_api():
+    """
+    Page through the current user's notifications, newest first.
+    
+    Pass ``cursor`` from a previous response's ``next_cursor`` or
+    ``prev_cursor``; ``unread=1`` lists unread notifications only.
+    """
+    from ..models.serializers import NotificationSerializer
+    
+    Notification = get_model('Notification')
+    per_page = min(request.args.get('per_page', current_app.config.get('ITEMS_PER_PAGE', 20), type=int), 100)
+    page = Notification.list_for_user(current_user._get_current_object(),
+                                      cursor=request.args.get('cursor'),
+                                      per_page=max(per_page, 1),
+                                      unread_only=request.args.get('unread') in ('1', 'true'),
+                                      raw=True)
+    return jsonify({
+        'success': True,
+        'notifications': NotificationSerializer.dump_rows(page.items),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'total': page.total
+    })
+
+def _get_upload(upload_id):
+    """The live upload ``upload_id`` if the current user may access it, else None."""
+    AudioUpload = get_model('AudioUpload')
+    upload = AudioUpload.objects(id=upload_id).first() if ObjectId.is_valid(upload_id) else None
+    if upload is None or not can_access(upload.user_id):
+        return None
+    return upload
+
+@main_bp.route('/api/recording-uploads', methods=['POST'])
+@login_required
+def create_recording_upload():
+    """
+    Open a chunked upload for an answer that is being recorded.
+    
+    The body may name the ``assessmentId`` and ``questionId`` the finished
+    recording belongs to; without them the upload is only transcribed.
+    """
+    from ..services.live_upload import create_upload
+    
+    data = request.get_json(silent=True) or {}
+    assessment_id = str(data.get('assessmentId') or '')
+    if assessment_id:
+        assessment = Assessment.objects(id=assessment_id).first() if ObjectId.is_valid(assessment_id) else None
+        if not assessment:
+            return jsonify({'success': False, 'error': 'Assessment not found'}), 404
+        if not can_access_assessment(assessment):
+            return jsonify({'success': False, 'error': 'You do not have permission to add recordings to this assessment'}), 403
+    
+    upload = create_upload(
+        file_name=data.get('fileName') or 'recording.webm',
+        file_type=data.get('fileType'),
+        assessment_id=assessment_id or None,
+        question_id=data.get('questionId'),
+        user_id=current_user.id,
+        language=data.get('language') or 'en-US'
+    )
+    return jsonify(dict(upload.to_dict(), success=True)), 201
+
+@main_bp.route('/api/recording-uploads/<upload_id>', methods=['GET'])
+@login_required
+def recording_upload_status(upload_id):
+    """Current offset and partial transcript of an upload, for resuming it."""
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    return jsonify(dict(upload.to_dict(), success=True))
+
+@main_bp.route('/api/recording-uploads/<upload_id>/chunks/<chunk_id>', methods=['PUT'])
+@login_required
+def append_recording_chunk(upload_id, chunk_id):
+    """
+    Append the request body at the byte offset in the ``Upload-Offset`` header.
+    
+    Re-sending an accepted chunk id is acknowledged with ``duplicate: true``.
+    A chunk at any other offset than the upload's end is refused with 409 and
+    the offset to resume from.
+    """
+    from ..services.live_upload import UploadConflict, append_chunk, schedule_transcription
+    
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Missing or invalid Upload-Offset header'}), 400
+    
+    try:
+        upload, duplicate = append_chunk(upload, chunk_id, offset, request.get_data(cache=False))
+    except UploadConflict as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except OSError:
+        return jsonify({'success': False, 'error': 'Could not store chunk'}), 500
+    
+    if not duplicate:
+        schedule_transcription(upload)
+    return jsonify({'success': True, 'offset': upload.size, 'duplicate': duplicate,
+                    'transcript': upload.transcript})
+
+@main_bp.route('/api/recording-uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_recording_upload(upload_id):
+    """
+    Close an upload and return its transcript.
+    
+    ``{"size": <bytes>}`` is checked against the bytes received. Recordings of
+    an assessment are then queued for the full audio analysis.
+    """
+    from ..services.live_upload import UploadConflict, complete_upload
+    
+    upload = _get_upload(upload_id)
+    if upload is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        size = int(data['size']) if data.get('size') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid size'}), 400
+    
+    try:
+        upload = complete_upload(upload, size=size)
+    except UploadConflict as e:
+        return jsonify({'success': False, 'error': str(e), 'offset': e.offset}), 409
+    return jsonify(dict(upload.to_dict(), success=True))
@@ -22,6 +22,11 @@ MODEL_NAMES = [
     'Question',
     'AudioRecording',
     'Assessment',
+    'QuestionBucket',
+    'RecordingBucket',
+    'AudioProcessingJob',
+    'AudioUpload',
+    'LLMCacheEntry',
     'User'
 ]
 
@@ -44,13 +49,23 @@ def _import_models():
         models['Role'] = Role
         
         # 3. Import Assessment and related models (no dependencies on User)
-        from .assessment import Question, AudioRecording, Assessment
+        from .assessment import Question, AudioRecording, Assessment, QuestionBucket, RecordingBucket
         models.update({
             'Question': Question,
             'AudioRecording': AudioRecording,
             'Assessment': Assessment,
+            'QuestionBucket': QuestionBucket,
+            'RecordingBucket': RecordingBucket,
         })
         
+        # 3b. Import background job models (no dependencies on User)
+        from .audio_job import AudioProcessingJob
+        models['AudioProcessingJob'] = AudioProcessingJob
+        from .audio_upload import AudioUpload
+        models['AudioUpload'] = AudioUpload
+        from .llm_cache import LLMCacheEntry
+        models['LLMCacheEntry'] = LLMCacheEntry
+        
         # 4. Import User model (depends on Role and Assessment)
         from .user import User
         models['User'] = User
@@ -79,6 +94,11 @@ def register_models():
             'Question',
             'AudioRecording',
             'Assessment',
+            'QuestionBucket',
+            'RecordingBucket',
+            'AudioProcessingJob',
+            'AudioUpload',
+            'LLMCacheEntry',
             'User',
             'Notification'
         ]
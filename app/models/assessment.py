@@ -4,7 +4,7 @@ Assessment Models
 This module defines the assessment-related models for the EP-Simulator application,
 including the Assessment model and its related models.
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from mongoengine import (
     Document, EmbeddedDocument, 
@@ -12,8 +12,9 @@ from mongoengine import (
     ListField, EmbeddedDocumentField,
     ReferenceField, LazyReferenceField,
     BooleanField, IntField, FloatField,
-    DictField, URLField, FileField
+    DictField, URLField, FileField, ObjectIdField
 )
+from bson import ObjectId
 # Delete rule constants
 NULLIFY = 1
 CASCADE = 2
@@ -51,6 +52,9 @@ class Question(EmbeddedDocument):
     """
     Embedded document representing a question in an assessment.
     """
+    # Stable identifier so recordings and API calls can target this question
+    id = ObjectIdField(default=ObjectId)
+    
     # Question details
     question_type = StringField(choices=[t.value for t in QuestionType], required=True)
     text = StringField(required=True)
@@ -90,10 +94,29 @@ class Question(EmbeddedDocument):
             'updated_at': self.updated_at.isoformat()
         }
 
+class TranscriptSegment(EmbeddedDocument):
+    """
+    Embedded document holding one timestamped piece of a transcript.
+    """
+    start = FloatField(required=True)  # in seconds from the start of the recording
+    end = FloatField(required=True)  # in seconds
+    text = StringField()
+    
+    def to_dict(self):
+        """Convert the segment to a dictionary."""
+        return {
+            'start': self.start,
+            'end': self.end,
+            'text': self.text
+        }
+
 class AudioRecording(EmbeddedDocument):
     """
     Embedded document representing an audio recording in an assessment.
     """
+    # Stable identifier so background jobs can target this recording
+    id = ObjectIdField(default=ObjectId)
+    
     # File information
     file_path = StringField(required=True)
     file_name = StringField(required=True)
@@ -107,8 +130,20 @@ class AudioRecording(EmbeddedDocument):
     
     # Transcription and analysis
     transcript = StringField()
+    transcript_segments = ListField(EmbeddedDocumentField(TranscriptSegment))
     confidence = FloatField(min_value=0, max_value=1)  # confidence score of the transcript
     language = StringField(default='en')
+    quality_metrics = DictField()
+    audio_features = DictField()
+    
+    # Derived copies and storage tier
+    analysis_path = StringField()  # canonical 16 kHz mono PCM WAV
+    archive_path = StringField()  # compressed Opus/Ogg copy
+    storage_tier = StringField(choices=('original', 'archive'), default='original')
+    
+    # Review previews cached next to the file
+    waveform_path = StringField()  # audiowaveform .dat peaks
+    spectrogram_path = StringField()  # PNG thumbnail
     
     # Processing status
     is_processed = BooleanField(default=False)
@@ -129,9 +164,14 @@ class AudioRecording(EmbeddedDocument):
             'sample_rate': self.sample_rate,
             'channels': self.channels,
             'transcript': self.transcript,
+            'transcript_segments': [s.to_dict() for s in self.transcript_segments],
             'confidence': self.confidence,
             'language': self.language,
             'is_processed': self.is_processed,
+            'processing_error': self.processing_error,
+            'storage_tier': self.storage_tier,
+            'has_waveform': bool(self.waveform_path),
+            'has_spectrogram': bool(self.spectrogram_path),
             'created_at': self.created_at.isoformat(),
             'processed_at': self.processed_at.isoformat() if self.processed_at else None
         }
@@ -265,9 +305,11 @@ class Assessment(BaseDocument):
     picture_description = StringField()
     scenario = StringField()
     
-    # Questions and recordings
-    questions = ListField(EmbeddedDocumentField('Question'))
-    recordings = ListField(EmbeddedDocumentField('AudioRecording'))
+    # Questions and recordings live in the per-assessment QuestionBucket and
+    # RecordingBucket collections; only summary counters are kept here
+    question_count = IntField(min_value=0, default=0)
+    recording_count = IntField(min_value=0, default=0)
+    last_recording_at = DateTimeField()
     
     # ICAO scores
     pronunciation_score = FloatField(min_value=0, max_value=6, default=0)
@@ -277,6 +319,7 @@ class Assessment(BaseDocument):
     comprehension_score = FloatField(min_value=0, max_value=6, default=0)
     interaction_score = FloatField(min_value=0, max_value=6, default=0)
     overall_score = FloatField(min_value=0, max_value=6, default=0)
+    score_justifications = DictField()  # criterion -> rater's justification
     
     # ICAO level
     icao_level = StringField(choices=[
@@ -308,13 +351,14 @@ class Assessment(BaseDocument):
     # Methods
     def calculate_scores(self):
         """Calculate overall scores based on individual question scores."""
-        if not self.questions:
+        questions = self.get_questions()
+        if not questions:
             return
             
         total_score = 0
         count = 0
         
-        for question in self.questions:
+        for question in questions:
             if question.score is not None:
                 total_score += question.score
                 count += 1
@@ -339,81 +383,54 @@ class Assessment(BaseDocument):
         else:
             return '1'  # Pre-elementary
     
-    def add_question(self, question_type, text, **kwargs):
-        """Add a new question to the assessment."""
-        question = Question(
-            question_type=question_type,
-            text=text,
-            **kwargs
-        )
-        self.questions.append(question)
-        return question
-    
-    def add_recording(self, file_path, file_name, duration, **kwargs):
-        """Add a new audio recording to the assessment."""
-        recording = AudioRecording(
-            file_path=file_path,
-            file_name=file_name,
-            duration=duration,
-            **kwargs
-        )
-        self.recordings.append(recording)
-        return recording
-    
-    def start_assessment(self):
-        """Mark the assessment as started."""
-        if self.status == AssessmentStatus.DRAFT.value:
-            self.status = AssessmentStatus.IN_PROGRESS.value
-            self.started_at = datetime.utcnow()
-            if self.scheduled_start_time is None:
-                self.scheduled_start_time = self.started_at
-            
-            # Set expiration time if time limit is set
-            if self.time_limit:
-                self.expires_at = datetime.utcnow() + timedelta(minutes=self.time_limit)
-    
     def complete_assessment(self):
         """Mark the assessment as completed."""
-        if self.status in [AssessmentStatus.IN_PROGRESS.value, AssessmentStatus.UNDER_REVIEW.value]:
-            self.status = AssessmentStatus.COMPLETED.value
-            self.completed_at = datetime.utcnow()
-            self.progress = 100
-            
-            # Calculate overall score if not already calculated
-            if not self.overall_score:
-                self.calculate_overall_score()
-            
-            # Update user's assessment history if created_by is set
-            if self.created_by:
-                try:
-                    from .user import User
-                    user = User.objects.get(id=self.created_by.id)
-                    user.update(add_to_set__completed_assessments=self)
-                    user.save()
-                except Exception as e:
-                    import logging
-                    logging.error(f"Error updating user's assessment history: {e}")
-            
-            # Notify assigned_to user if applicable
-            if self.assigned_to and self.assigned_to != self.created_by:
-                try:
-                    from .notification import Notification
-                    user_name = self.created_by.get_full_name() if hasattr(self.created_by, 'get_full_name') else 'A user'
-                    notification = Notification(
-                        user=self.assigned_to,
-                        title=f"Assessment Completed: {self.title}",
-                        message=f"{user_name} has completed the assessment.",
-                        notification_type='assessment_completed',
-                        related_document_id=str(self.id)
-                    )
-                    notification.save()
-                except Exception as e:
-                    import logging
-                    logging.error(f"Error sending notification: {e}")
-            
-            self.save()
-            return True
-        return False
+        completable = [AssessmentStatus.IN_PROGRESS.value, AssessmentStatus.UNDER_REVIEW.value]
+        if self.status not in completable:
+            return False
+        
+        # Only one concurrent request completes the assessment and sends notifications
+        if not self.atomic_update(
+            set={
+                'status': AssessmentStatus.COMPLETED.value,
+                'completed_at': datetime.utcnow(),
+                'progress': 100
+            },
+            conditions={'status__in': completable}
+        ):
+            return False
+        
+        # Calculate overall score if not already calculated
+        if not self.overall_score:
+            self.calculate_overall_score()
+        
+        # Update user's assessment history if created_by is set
+        if self.created_by:
+            try:
+                from .user import User
+                User.objects(id=self.created_by.id).update_one(add_to_set__completed_assessments=self)
+            except Exception as e:
+                import logging
+                logging.error(f"Error updating user's assessment history: {e}")
+        
+        # Notify assigned_to user if applicable
+        if self.assigned_to and self.assigned_to != self.created_by:
+            try:
+                from .notification import Notification
+                user_name = self.created_by.get_full_name() if hasattr(self.created_by, 'get_full_name') else 'A user'
+                notification = Notification(
+                    user=self.assigned_to,
+                    title=f"Assessment Completed: {self.title}",
+                    message=f"{user_name} has completed the assessment.",
+                    notification_type='assessment_completed',
+                    related_document_id=str(self.id)
+                )
+                notification.save()
+            except Exception as e:
+                import logging
+                logging.error(f"Error sending notification: {e}")
+        
+        return True
     
     def submit_for_review(self):
         """Submit the assessment for examiner review."""
@@ -425,16 +442,21 @@ class Assessment(BaseDocument):
         if self.status != AssessmentStatus.ARCHIVED.value:
             self.status = AssessmentStatus.ARCHIVED.value
     
-    def to_dict(self, include_questions=True, include_recordings=False):
-        """Convert the assessment to a dictionary."""
+    def to_dict(self, include_questions=False, include_recordings=False):
+        """
+        Convert the assessment to a dictionary.
+        
+        Questions and recordings are loaded from their buckets only when
+        requested; list views get the counters alone.
+        """
         data = super().to_dict()
         
         # Add related objects
-        if include_questions and 'questions' in data:
-            data['questions'] = [q.to_dict() for q in self.questions]
+        if include_questions:
+            data['questions'] = [q.to_dict() for q in self.get_questions()]
             
-        if include_recordings and 'recordings' in data:
-            data['recordings'] = [r.to_dict() for r in self.recordings]
+        if include_recordings:
+            data['recordings'] = [r.to_dict() for r in self.get_recordings()]
         
         # Add computed fields
         data['duration'] = self.duration
@@ -471,6 +493,23 @@ class Assessment(BaseDocument):
         ]
         return all(score is not None for score in required_scores)
     
+    def apply_evaluation(self, scores, justifications=None):
+        """
+        Store an automated evaluation's criterion scores and justifications
+        and recalculate (and save) the overall score.
+        
+        Args:
+            scores: Criterion name -> score (1-6), e.g. from ``evaluate_response``
+            justifications: Criterion name -> justification text
+        """
+        for criterion, score in scores.items():
+            if f'{criterion}_score' in self._fields:
+                setattr(self, f'{criterion}_score', score)
+        if justifications:
+            self.score_justifications = dict(justifications)
+        self.updated_at = datetime.utcnow()
+        self.calculate_overall_score()
+    
     def calculate_overall_score(self):
         """Calculate the overall score based on individual ICAO scores."""
         scores = [
@@ -489,20 +528,45 @@ class Assessment(BaseDocument):
             return self.overall_score
         return None
     
-    def determine_icao_level(self, score):
-        """Determine ICAO level based on the score."""
-        if score >= 5.5:
-            return '6'  # Expert
-        elif score >= 4.5:
-            return '5'  # Extended
-        elif score >= 3.5:
-            return '4'  # Operational
-        elif score >= 2.5:
-            return '3'  # Pre-operational
-        elif score >= 1.5:
-            return '2'  # Elementary
-        else:
-            return '1'  # Pre-elementary
+    def get_questions(self):
+        """The assessment's questions, in the order they were added."""
+        return QuestionBucket.items_for(self.id) if self.id else []
+    
+    def get_recordings(self):
+        """The assessment's recordings, in the order they were added."""
+        return RecordingBucket.items_for(self.id) if self.id else []
+    
+    def get_question(self, question_id):
+        """Get one question by id, or None."""
+        return QuestionBucket.find_item(self.id, question_id)
+    
+    def get_recording(self, recording_id):
+        """Get one recording by id, or None."""
+        return RecordingBucket.find_item(self.id, recording_id)
+    
+    def append_question(self, question):
+        """
+        Store a question with an append-only ``$push`` and count it.
+        
+        The assessment must already be saved; it is not rewritten.
+        """
+        QuestionBucket.append(self.id, question)
+        type(self).objects(id=self.id).update_one(inc__question_count=1, set__updated_at=datetime.utcnow())
+        self.reload('question_count', 'updated_at')
+        return question
+    
+    def append_recording(self, recording):
+        """
+        Store a recording with an append-only ``$push`` and count it.
+        
+        The assessment must already be saved; it is not rewritten.
+        """
+        RecordingBucket.append(self.id, recording)
+        now = datetime.utcnow()
+        type(self).objects(id=self.id).update_one(inc__recording_count=1, set__last_recording_at=now,
+                                                  set__updated_at=now)
+        self.reload('recording_count', 'last_recording_at', 'updated_at')
+        return recording
     
     def add_question(self, question_type, text, **kwargs):
         """Add a new question to the assessment."""
@@ -511,8 +575,7 @@ class Assessment(BaseDocument):
             text=text,
             **kwargs
         )
-        self.questions.append(question)
-        return question
+        return self.append_question(question)
     
     def add_recording(self, file_path, file_name, duration, **kwargs):
         """Add a new audio recording to the assessment."""
@@ -522,34 +585,149 @@ class Assessment(BaseDocument):
             duration=duration,
             **kwargs
         )
-        self.recordings.append(recording)
-        return recording
+        return self.append_recording(recording)
+    
+    def link_recording(self, question_id, recording_id):
+        """Point a question at the recording that answers it."""
+        return QuestionBucket.update_item(self.id, question_id, audio_recording=str(recording_id),
+                                          updated_at=datetime.utcnow())
 
     def start_assessment(self):
         """Mark the assessment as started."""
-        if self.status == AssessmentStatus.DRAFT.value:
-            self.status = AssessmentStatus.IN_PROGRESS.value
-            self.started_at = datetime.utcnow()
-            if self.scheduled_start_time is None:
-                self.scheduled_start_time = self.started_at
-            
-            # Set expiration time if time limit is set
-            if self.time_limit:
-                self.expires_at = datetime.utcnow() + timedelta(minutes=self.time_limit)
-            
-            self.save()
-            return True
-        return False
+        if self.status != AssessmentStatus.DRAFT.value:
+            return False
+        
+        now = datetime.utcnow()
+        changes = {'status': AssessmentStatus.IN_PROGRESS.value, 'started_at': now}
+        if self.scheduled_start_time is None:
+            changes['scheduled_start_time'] = now
+        
+        # Set expiration time if time limit is set
+        if self.time_limit:
+            changes['expires_at'] = now + timedelta(minutes=self.time_limit)
+        
+        return self.atomic_update(set=changes, conditions={'status': AssessmentStatus.DRAFT.value})
         
     def __str__(self):
         """String representation of the assessment."""
         return f"{self.title} - {self.status}"
 
+
+class AssessmentBucket(BaseDocument):
+    """
+    Base of the per-assessment bucket collections.
+    
+    Items are appended with ``$push`` to an assessment's bucket that still has
+    room; once every bucket holds ``BUCKET_SIZE`` items the upsert opens a new
+    one. Appending therefore never rewrites existing items, and no document
+    grows without bound.
+    """
+    meta = {
+        'abstract': True
+    }
+    
+    # Items per bucket document
+    BUCKET_SIZE = 50
+    
+    # Name of the item list in the subclass
+    ITEMS_FIELD = None
+    
+    assessment_id = ObjectIdField(required=True)
+    count = IntField(min_value=0, default=0)
+    
+    @classmethod
+    def append(cls, assessment_id, item):
+        """Push ``item`` onto the assessment's open bucket, creating one if all are full."""
+        now = datetime.utcnow()
+        cls.objects(assessment_id=assessment_id, count__lt=cls.BUCKET_SIZE).update_one(
+            upsert=True,
+            inc__count=1,
+            set__updated_at=now,
+            set_on_insert__created_at=now,
+            **{f'push__{cls.ITEMS_FIELD}': item}
+        )
+        return item
+    
+    @classmethod
+    def items_for(cls, assessment_id):
+        """All items of an assessment, in insertion order."""
+        items = []
+        for bucket in cls.objects(assessment_id=assessment_id).only(cls.ITEMS_FIELD).order_by('id'):
+            items.extend(getattr(bucket, cls.ITEMS_FIELD))
+        return items
+    
+    @classmethod
+    def raw_items_for(cls, assessment_id):
+        """All items of an assessment as raw dicts, without constructing documents."""
+        items = []
+        buckets = cls.objects(assessment_id=assessment_id).only(cls.ITEMS_FIELD).order_by('id').as_pymongo()
+        for bucket in buckets:
+            items.extend(bucket.get(cls.ITEMS_FIELD) or [])
+        return items
+    
+    @classmethod
+    def find_item(cls, assessment_id, item_id):
+        """One item by id, or None."""
+        if not item_id or not ObjectId.is_valid(str(item_id)):
+            return None
+        bucket = cls.objects(assessment_id=assessment_id,
+                             **{f'{cls.ITEMS_FIELD}__id': ObjectId(str(item_id))}).only(cls.ITEMS_FIELD).first()
+        if bucket is None:
+            return None
+        return next((item for item in getattr(bucket, cls.ITEMS_FIELD) if str(item.id) == str(item_id)), None)
+    
+    @classmethod
+    def update_item(cls, assessment_id, item_id, **fields):
+        """Set ``fields`` on one item with a positional update."""
+        updates = {f'set__{cls.ITEMS_FIELD}__S__{name}': value for name, value in fields.items()}
+        return cls.objects(assessment_id=assessment_id,
+                           **{f'{cls.ITEMS_FIELD}__id': ObjectId(str(item_id))}).update_one(**updates)
+
+
+class QuestionBucket(AssessmentBucket):
+    """
+    Up to ``BUCKET_SIZE`` questions of one assessment.
+    """
+    meta = {
+        'collection': 'question_buckets',
+        'indexes': [
+            {'fields': ['assessment_id', 'count'], 'name': 'assessment_count_idx'},
+            {'fields': ['questions.id'], 'name': 'question_id_idx'}
+        ],
+        'strict': False
+    }
+    
+    ITEMS_FIELD = 'questions'
+    
+    questions = ListField(EmbeddedDocumentField(Question))
+
+
+class RecordingBucket(AssessmentBucket):
+    """
+    Up to ``BUCKET_SIZE`` audio recordings of one assessment.
+    """
+    meta = {
+        'collection': 'recording_buckets',
+        'indexes': [
+            {'fields': ['assessment_id', 'count'], 'name': 'assessment_count_idx'},
+            {'fields': ['recordings.id'], 'name': 'recording_id_idx'}
+        ],
+        'strict': False
+    }
+    
+    ITEMS_FIELD = 'recordings'
+    
+    recordings = ListField(EmbeddedDocumentField(AudioRecording))
+
+
 # Register the models after they're defined
 from . import registry
 registry.register('Question', Question)
+registry.register('TranscriptSegment', TranscriptSegment)
 registry.register('AudioRecording', AudioRecording)
 registry.register('Assessment', Assessment)
+registry.register('QuestionBucket', QuestionBucket)
+registry.register('RecordingBucket', RecordingBucket)
 
 # Export the models
-__all__ = ['Assessment', 'Question', 'AudioRecording']
+__all__ = ['Assessment', 'Question', 'AudioRecording', 'TranscriptSegment', 'QuestionBucket', 'RecordingBucket']
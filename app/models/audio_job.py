@@ -0,0 +1,161 @@
+"""
+Audio Processing Job Model
+
+This module defines the job document used by the background audio processing
+queue. Jobs live in MongoDB so the queue needs no external broker: workers
+claim them with an atomic find-and-modify and write the outcome back to both
+the job and the related AudioRecording.
+"""
+from datetime import datetime, timedelta
+from mongoengine import (
+    StringField, DateTimeField, IntField, DictField, ListField
+)
+
+# Import base document
+from .base import BaseDocument
+
+
+class AudioProcessingJob(BaseDocument):
+    """
+    A unit of background work for a single uploaded audio recording.
+    """
+    # Job states
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED)
+
+    meta = {
+        'collection': 'audio_jobs',
+        'indexes': [
+            {'fields': ['status', 'created_at'], 'name': 'status_created_at_idx'},
+            {'fields': ['assessment_id'], 'name': 'assessment_id_idx'},
+            {'fields': ['heartbeat_at'], 'name': 'heartbeat_at_idx', 'sparse': True}
+        ],
+        'ordering': ['created_at'],
+        'strict': False,
+        'auto_create_index': False
+    }
+
+    # Target recording
+    assessment_id = StringField(required=True)
+    recording_id = StringField(required=True)
+    file_path = StringField(required=True)
+    language = StringField(default='en-US')
+    # Segments already transcribed during a live upload; the worker reuses them
+    transcript_segments = ListField(DictField())
+
+    # Execution state
+    status = StringField(choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = IntField(default=0)
+    max_attempts = IntField(default=3)
+    worker = StringField()
+    error = StringField()
+    result = DictField()
+
+    # Timestamps
+    started_at = DateTimeField()
+    heartbeat_at = DateTimeField()
+    finished_at = DateTimeField()
+
+    @classmethod
+    def claim_next(cls, worker_name):
+        """
+        Atomically claim the oldest queued job.
+
+        Args:
+            worker_name: Identifier of the claiming worker
+
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        now = datetime.utcnow()
+        return cls.objects(status=cls.STATUS_QUEUED, is_deleted__ne=True).order_by('created_at').modify(
+            set__status=cls.STATUS_RUNNING,
+            set__worker=worker_name,
+            set__started_at=now,
+            set__heartbeat_at=now,
+            inc__attempts=1,
+            new=True
+        )
+
+    @classmethod
+    def requeue_stale(cls, stale_after_seconds):
+        """
+        Return jobs whose worker stopped heart-beating to the queue.
+
+        Jobs that have used up their attempts are marked failed instead, and
+        their recording gets the error, as a failed run would leave it.
+
+        Args:
+            stale_after_seconds: Age of the last heartbeat after which a
+                running job is considered abandoned
+
+        Returns:
+            Number of jobs that were requeued
+        """
+        from . import get_model
+        RecordingBucket = get_model('RecordingBucket')
+
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+        stale = cls.objects(status=cls.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+        requeued = 0
+        for job in stale:
+            if job.attempts >= job.max_attempts:
+                error = 'Worker stopped responding'
+                now = datetime.utcnow()
+                # A worker that finishes late has already written its own outcome
+                failed = cls.objects(id=job.id, status=cls.STATUS_RUNNING).update(
+                    set__status=cls.STATUS_FAILED,
+                    set__error=error,
+                    set__finished_at=now
+                )
+                if failed:
+                    RecordingBucket.update_item(job.assessment_id, job.recording_id, is_processed=False,
+                                                processing_error=error, processed_at=now)
+            else:
+                requeued += cls.objects(id=job.id, status=cls.STATUS_RUNNING).update(
+                    set__status=cls.STATUS_QUEUED,
+                    unset__worker=True
+                )
+        return requeued
+
+    def mark_done(self, result):
+        """Record a successful run."""
+        self.update(
+            set__status=self.STATUS_DONE,
+            set__result=result,
+            set__finished_at=datetime.utcnow(),
+            unset__error=True
+        )
+
+    def mark_failed(self, error):
+        """Record a failed run."""
+        self.update(
+            set__status=self.STATUS_FAILED,
+            set__error=error,
+            set__finished_at=datetime.utcnow()
+        )
+
+    def to_dict(self):
+        """Convert the job to a dictionary."""
+        return {
+            'id': str(self.id),
+            'assessment_id': self.assessment_id,
+            'recording_id': self.recording_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Register the model after it's defined
+from . import registry
+registry.register('AudioProcessingJob', AudioProcessingJob)
+
+# Export the model
+__all__ = ['AudioProcessingJob']
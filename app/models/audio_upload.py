@@ -0,0 +1,135 @@
+"""
+Audio Upload Model
+
+This module defines the state of a chunked, resumable recording upload. The
+browser appends chunks by byte offset while the candidate is still speaking;
+each chunk carries a client-chosen id so a retried request is acknowledged
+instead of being written twice. Speech segments that are already complete
+are transcribed as the upload grows and collected on the document.
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from mongoengine import (
+    StringField, DateTimeField, IntField, FloatField, DictField, ListField
+)
+
+# Import base document
+from .base import BaseDocument
+
+
+class AudioUpload(BaseDocument):
+    """
+    A recording being uploaded in chunks.
+    """
+    # Upload states
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (STATUS_OPEN, STATUS_COMPLETE, STATUS_FAILED)
+
+    meta = {
+        'collection': 'audio_uploads',
+        'indexes': [
+            {'fields': ['status', 'updated_at'], 'name': 'status_updated_at_idx'},
+            {'fields': ['assessment_id'], 'name': 'assessment_id_idx', 'sparse': True}
+        ],
+        'strict': False
+    }
+
+    # Target of the finished recording (optional for practice sessions)
+    assessment_id = StringField()
+    question_id = StringField()
+    user_id = StringField()
+
+    # The file on disk
+    file_path = StringField(required=True)
+    file_name = StringField()
+    file_type = StringField()
+    language = StringField(default='en-US')
+
+    # Upload state: ``size`` is the offset the next chunk must start at and
+    # ``chunks`` maps each accepted chunk id to its [offset, length]
+    status = StringField(choices=STATUS_CHOICES, default=STATUS_OPEN)
+    size = IntField(default=0)
+    chunks = DictField()
+    error = StringField()
+
+    # Incremental transcription: segments transcribed so far and the time
+    # (seconds) up to which the audio has been transcribed
+    segments = ListField(DictField())
+    transcribed_until = FloatField(default=0.0)
+
+    # Set once the upload is complete
+    recording_id = StringField()
+    job_id = StringField()
+    completed_at = DateTimeField()
+
+    def append_chunk(self, chunk_id, offset, length):
+        """
+        Atomically reserve ``length`` bytes at ``offset`` for a chunk.
+
+        The reservation only succeeds if the upload is open, ``offset`` is the
+        current end of the upload and ``chunk_id`` has not been seen before.
+
+        Args:
+            chunk_id: Client-chosen chunk id
+            offset: Byte offset the chunk starts at
+            length: Chunk size in bytes
+
+        Returns:
+            The updated AudioUpload, or None if the reservation was refused
+        """
+        doc = self._get_collection().find_one_and_update(
+            {'_id': self.id, 'status': self.STATUS_OPEN, 'size': offset,
+             f'chunks.{chunk_id}': {'$exists': False}},
+            {'$set': {f'chunks.{chunk_id}': [offset, length], 'updated_at': datetime.utcnow()},
+             '$inc': {'size': length}},
+            return_document=ReturnDocument.AFTER
+        )
+        return self._from_son(doc) if doc else None
+
+    def add_segments(self, segments, transcribed_until):
+        """
+        Append transcribed segments and advance ``transcribed_until``.
+
+        The update only applies if no other transcription pass has advanced
+        the upload in the meantime, so segments are never added twice.
+
+        Returns:
+            bool: True if the segments were stored
+        """
+        pushed = type(self).objects(id=self.id, transcribed_until=self.transcribed_until).update_one(
+            push_all__segments=segments,
+            set__transcribed_until=transcribed_until,
+            set__updated_at=datetime.utcnow()
+        )
+        return bool(pushed)
+
+    @property
+    def transcript(self):
+        """The transcript of the segments transcribed so far."""
+        return ' '.join(segment['text'] for segment in self.segments if segment.get('text'))
+
+    def to_dict(self):
+        """Convert the upload to a dictionary."""
+        return {
+            'id': str(self.id),
+            'assessment_id': self.assessment_id,
+            'question_id': self.question_id,
+            'status': self.status,
+            'offset': self.size,
+            'chunks': len(self.chunks or {}),
+            'transcribed_until': self.transcribed_until,
+            'transcript': self.transcript,
+            'recording_id': self.recording_id,
+            'job_id': self.job_id,
+            'error': self.error
+        }
+
+
+# Register the model after it's defined
+from . import registry
+registry.register('AudioUpload', AudioUpload)
+
+# Export the model
+__all__ = ['AudioUpload']
@@ -3,11 +3,15 @@ Base Model Module
 
 This module contains the base document class and custom query set for all models.
 """
+import base64
+import hashlib
+import logging
 from datetime import datetime
-from bson import ObjectId
-from mongoengine import Document, DateTimeField, StringField, BooleanField
+from bson import ObjectId, json_util
+from mongoengine import Document, DateTimeField, StringField, BooleanField, IntField
 from mongoengine.base import BaseField
-from mongoengine.queryset import QuerySet
+from mongoengine.queryset import QuerySet, Q
+from mongoengine.queryset.field_list import QueryFieldList
 from mongoengine.queryset.manager import queryset_manager
 
 # Import the database instance from extensions
@@ -16,9 +20,288 @@ from app.extensions import db
 # Import models registry
 from .registry import register_model
 
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(direction, value, id):
+    """Opaque page token for the position (``value``, ``id``)."""
+    raw = json_util.dumps([direction, value, id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a token made by :func:`encode_cursor`.
+    
+    Returns:
+        tuple: (direction, value, id)
+        
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, value, id = json_util.loads(raw)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {str(e)}') from e
+    if direction not in ('next', 'prev') or not isinstance(id, ObjectId):
+        raise ValueError('Invalid cursor')
+    return direction, value, id
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated query.
+    
+    Attributes:
+        items: Documents on the page, newest first
+        per_page: Page size
+        next_cursor: Token of the following (older) page, or None
+        prev_cursor: Token of the preceding (newer) page, or None
+        total: Approximate number of matching documents, if requested
+    """
+    
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __len__(self):
+        return len(self.items)
+
+
+def _position(item, order_field):
+    """(value, id) of a document, or of a raw ``as_pymongo()`` row."""
+    if isinstance(item, dict):
+        return item.get(order_field), item['_id'] if '_id' in item else item['id']
+    return getattr(item, order_field), item.id
+
+
+def keyset_paginate(queryset, cursor=None, per_page=20, order_field='created_at', count=None):
+    """
+    Page through ``queryset`` newest first on (``order_field``, ``_id``).
+    
+    Unlike ``skip()``, each page is an index range scan starting at the
+    previous page's last row, so deep pages cost the same as the first one.
+    Documents without ``order_field`` are not reached. An ``as_pymongo()``
+    queryset is paged as raw rows.
+    
+    Args:
+        queryset: Any mongoengine queryset
+        cursor: Token from a previous page's ``next_cursor`` or ``prev_cursor``;
+            an invalid token starts from the first page
+        per_page: Page size
+        order_field: Date (or other sortable) field to page on
+        count: None for no total, ``'estimated'`` or ``'cached'`` (see
+            :func:`approximate_count`)
+            
+    Returns:
+        KeysetPage
+    """
+    direction, value, last_id = 'next', None, None
+    if cursor:
+        try:
+            direction, value, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            logger.info(str(e))
+    
+    query = queryset
+    # The position is read from each row, so an only() projection must load it
+    loaded = queryset._loaded_fields
+    db_field = queryset._document._fields[order_field].db_field
+    if loaded.value is QueryFieldList.ONLY and loaded.fields and db_field not in loaded.fields:
+        query = query.only(order_field)
+        rows = query._row_class
+        if isinstance(rows, type) and issubclass(rows, Row):
+            query._row_class = row_class(query._document, rows.__slots__ + (order_field,))
+    if last_id is not None:
+        if direction == 'next':
+            query = query.filter(Q(**{f'{order_field}__lt': value}) |
+                                 (Q(**{order_field: value}) & Q(id__lt=last_id)))
+        else:
+            query = query.filter(Q(**{f'{order_field}__gt': value}) |
+                                 (Q(**{order_field: value}) & Q(id__gt=last_id)))
+    
+    sign = '-' if direction == 'next' else '+'
+    items = list(query.order_by(f'{sign}{order_field}', f'{sign}id').limit(per_page + 1))
+    more = len(items) > per_page
+    items = items[:per_page]
+    if direction == 'prev':
+        items.reverse()
+    
+    has_next = more if direction == 'next' else last_id is not None
+    has_prev = last_id is not None if direction == 'next' else more
+    next_cursor = prev_cursor = None
+    if items and has_next:
+        next_cursor = encode_cursor('next', *_position(items[-1], order_field))
+    if items and has_prev:
+        prev_cursor = encode_cursor('prev', *_position(items[0], order_field))
+    
+    total = approximate_count(queryset, count) if count else None
+    return KeysetPage(items, per_page, next_cursor, prev_cursor, total)
+
+
+def approximate_count(queryset, method='cached'):
+    """
+    Count ``queryset`` without a full count on every page view.
+    
+    An unfiltered query uses the collection's ``estimated_document_count``
+    (collection metadata). Otherwise, and with ``method='cached'``, the exact
+    count is kept in the app cache for ``LIST_COUNT_CACHE_SECONDS``.
+    
+    Args:
+        queryset: A mongoengine queryset
+        method: ``'estimated'`` or ``'cached'``
+        
+    Returns:
+        int: Number of matching documents
+    """
+    from flask import current_app
+    from app.extensions import cache
+    
+    query = queryset._query
+    collection = queryset._collection
+    # A model's own _cls filter still counts the whole collection
+    if method == 'estimated' and query == getattr(queryset, '_initial_query', {}):
+        return collection.estimated_document_count()
+    
+    digest = hashlib.sha1(json_util.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()
+    key = f'count:{collection.name}:{digest}'
+    try:
+        total = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Count cache unavailable: {str(e)}")
+        return queryset.count()
+    if total is None:
+        total = queryset.count()
+        try:
+            cache.set(key, total, timeout=current_app.config.get('LIST_COUNT_CACHE_SECONDS', 60))
+        except Exception as e:
+            logger.warning(f"Count cache unavailable: {str(e)}")
+    return total
+
+
+class Row:
+    """
+    Read-only row of a :meth:`BaseQuerySet.fast` query.
+    
+    Holds the raw values of the projected fields in ``__slots__``, under the
+    field names (``id`` for ``_id``). Values are not converted: references are
+    DBRefs or ObjectIds and embedded documents are dicts.
+    """
+    __slots__ = ()
+    
+    # (field name, database field) pairs, set on each generated class
+    _columns = ()
+    
+    def __init__(self, raw):
+        set_slot = object.__setattr__
+        for name, db_field in self._columns:
+            set_slot(self, name, raw.get(db_field))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is read-only')
+    
+    def to_dict(self):
+        """The row as a dictionary of field name to raw value."""
+        return {name: getattr(self, name) for name, _ in self._columns}
+    
+    def __repr__(self):
+        return f"<{self.__class__.__name__} id={getattr(self, 'id', None)}>"
+
+
+_row_classes = {}
+
+
+def row_class(document, names):
+    """
+    The :class:`Row` subclass for ``names`` of ``document`` (cached).
+    
+    Args:
+        document: Document class
+        names: Field names; ``id`` is always included
+        
+    Returns:
+        type: A Row subclass with one slot per field
+    """
+    names = ('id',) + tuple(name for name in names if name != 'id')
+    key = (document, names)
+    cls = _row_classes.get(key)
+    if cls is None:
+        fields = document._fields
+        columns = tuple((name, fields[name].db_field if name in fields else name) for name in names)
+        cls = _row_classes[key] = type(f'{document.__name__}Row', (Row,),
+                                       {'__slots__': names, '_columns': columns})
+    return cls
+
+
 class BaseQuerySet(QuerySet):
     """Custom QuerySet with additional methods."""
     
+    # Set by fast(): Row subclass, or dict for plain dictionaries
+    _row_class = None
+    
+    def _clone_into(self, new_qs):
+        new_qs = super()._clone_into(new_qs)
+        new_qs._row_class = self._row_class
+        return new_qs
+    
+    def _wrap(self, raw):
+        """Turn a raw ``fast()`` result into its row type."""
+        if self._row_class is None:
+            return raw
+        if self._row_class is dict:
+            names = self._document._reverse_db_field_map
+            return {names.get(key, key): value for key, value in raw.items() if key != '_cls'}
+        return self._row_class(raw)
+    
+    def __next__(self):
+        return self._wrap(super().__next__())
+    
+    def __getitem__(self, key):
+        # An index (and first()) reads the cursor directly instead of iterating
+        result = super().__getitem__(key)
+        return self._wrap(result) if isinstance(key, int) else result
+    
+    def fast(self, *fields, as_dict=False):
+        """
+        Read-only query mode for list pages.
+        
+        Rows are read with ``as_pymongo()`` and wrapped in lightweight
+        :class:`Row` objects (or plain dicts), so no MongoEngine documents are
+        constructed: no field conversion, validation or ``post_init`` signal
+        handlers. Rows have no methods or properties of the model; only the
+        projected fields can be read.
+        
+        Iterate the returned queryset; filtering, ordering, limits and
+        :meth:`keyset_paginate` work as usual.
+        
+        Args:
+            *fields: Field names to project (default: every declared field)
+            as_dict: Return dicts keyed by field name instead of Row objects
+            
+        Returns:
+            A cloned queryset yielding rows
+        """
+        names = fields or tuple(self._document._fields)
+        queryset = self.only(*names) if fields else self.clone()
+        queryset = queryset.as_pymongo()
+        queryset._row_class = dict if as_dict else row_class(self._document, names)
+        return queryset
+    
     def to_dict(self):
         """Convert query results to a list of dictionaries."""
         return [obj.to_dict() for obj in self]
@@ -34,10 +317,86 @@ class BaseQuerySet(QuerySet):
             Paginated query results
         """
         return self.skip((page - 1) * per_page).limit(per_page)
+    
+    def keyset_paginate(self, cursor=None, per_page=10, order_field='created_at', count=None):
+        """Keyset pagination on (``order_field``, ``_id``); see :func:`keyset_paginate`."""
+        return keyset_paginate(self, cursor=cursor, per_page=per_page, order_field=order_field, count=count)
+
+
+class AtomicUpdateMixin:
+    """
+    Atomic partial updates for documents.
+    
+    ``save()`` on a loaded document writes every field it considers changed
+    from the in-memory copy, so two workers saving the same document can
+    overwrite each other's changes. :meth:`atomic_update` sends only the
+    requested operators in one ``findAndModify``, optionally guarded by query
+    conditions and an expected ``version``.
+    """
+    
+    def atomic_update(self, set=None, inc=None, push=None, unset=None, conditions=None,
+                      expected_version=None):
+        """
+        Atomically apply ``$set``, ``$inc``, ``$push`` and ``$unset`` to this document.
+        
+        ``updated_at`` is set and ``version`` incremented when the model has
+        those fields. Pending in-memory changes to other fields are kept.
+        
+        Args:
+            set: Field name -> new value
+            inc: Field name -> amount to add
+            push: Field name -> item to append to a list field
+            unset: Names of fields to remove
+            conditions: Filters (mongoengine syntax) the stored document must
+                still match, e.g. ``{'status': 'draft'}``
+            expected_version: Only apply if ``version`` still has this value
+            
+        Returns:
+            bool: True if the update was applied, and the updated fields of
+            this instance hold the stored values; False if the document no
+            longer matches ``conditions`` or ``expected_version``
+        """
+        update = {}
+        for name, value in (set or {}).items():
+            update[f'set__{name}'] = value
+        for name, value in (inc or {}).items():
+            update[f'inc__{name}'] = value
+        for name, value in (push or {}).items():
+            update[f'push__{name}'] = value
+        for name in unset or ():
+            update[f'unset__{name}'] = 1
+        if not update:
+            return True
+        
+        if 'updated_at' in self._fields and 'updated_at' not in (set or {}):
+            update['set__updated_at'] = datetime.utcnow()
+        if 'version' in self._fields:
+            update['inc__version'] = 1
+        
+        query = Q(id=self.id) & Q(**(conditions or {}))
+        if expected_version is not None:
+            if 'version' not in self._fields:
+                raise ValueError(f'{self.__class__.__name__} has no version field')
+            version = Q(version=expected_version)
+            if not expected_version:
+                # Documents stored before versioning have no version yet
+                version |= Q(version__exists=False)
+            query &= version
+        
+        updated = type(self).objects(query).modify(new=True, **update)
+        if updated is None:
+            return False
+        
+        names = {key.split('__')[1] for key in update}
+        for name in names:
+            self._data[name] = updated._data.get(name)
+        self._changed_fields = [field for field in self._changed_fields
+                                if field.split('.')[0] not in names]
+        return True
 
 
 @register_model('BaseDocument')
-class BaseDocument(Document):
+class BaseDocument(AtomicUpdateMixin, Document):
     """
     Base document with common fields and methods.
     """
@@ -55,6 +414,9 @@ class BaseDocument(Document):
     is_deleted = BooleanField(default=False)
     deleted_at = DateTimeField()
     
+    # Incremented on every save and atomic update, for optimistic checks
+    version = IntField(default=0)
+    
     def save(self, *args, **kwargs):
         """
         Override save to update timestamps and handle soft delete.
@@ -72,6 +434,8 @@ class BaseDocument(Document):
             self.created_at = now
             if hasattr(self, 'created_by') and not self.created_by and hasattr(self, 'current_user_id'):
                 self.created_by = self.current_user_id
+        else:
+            self.version = (self.version or 0) + 1
         
         self.updated_at = now
         if hasattr(self, 'updated_by') and hasattr(self, 'current_user_id'):
@@ -120,25 +484,14 @@ class BaseDocument(Document):
         Returns:
             dict: Dictionary representation of the document
         """
-        exclude = exclude or []
-        data = self.to_mongo().to_dict()
-        
-        # Convert ObjectId to string
-        if '_id' in data:
-            data['id'] = str(data.pop('_id'))
-        
-        # Convert datetime objects to ISO format strings
-        for field_name, field_value in data.items():
-            if isinstance(field_value, datetime):
-                data[field_name] = field_value.isoformat()
-            elif isinstance(field_value, ObjectId):
-                data[field_name] = str(field_value)
-        
-        # Exclude specified fields
-        for field in exclude:
-            if field in data:
-                del data[field]
+        from .serializers import json_value
         
+        exclude = set(exclude or ())
+        data = {'id': str(self.id)} if self.id and 'id' not in exclude else {}
+        # One pass over the BSON values, nested documents included
+        for field_name, field_value in self.to_mongo().items():
+            if field_name != '_id' and field_name not in exclude:
+                data[field_name] = json_value(field_value)
         return data
     
     @classmethod
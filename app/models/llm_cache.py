@@ -0,0 +1,74 @@
+"""
+LLM Cache Model
+
+This module defines the persistent cache of LLM completions. Entries are keyed
+by a hash of (model, normalized prompt, parameters) and expire through a
+MongoDB TTL index on ``expires_at``.
+"""
+from datetime import datetime, timedelta
+from mongoengine import StringField, DateTimeField, IntField, DictField
+
+# Import base document
+from .base import BaseDocument
+
+
+class LLMCacheEntry(BaseDocument):
+    """
+    A cached LLM completion.
+    """
+    meta = {
+        'collection': 'llm_cache',
+        'indexes': [
+            {'fields': ['key'], 'name': 'key_idx', 'unique': True},
+            {'fields': ['model'], 'name': 'model_idx'},
+            # MongoDB removes entries once expires_at has passed
+            {'fields': ['expires_at'], 'name': 'expires_at_ttl_idx', 'expireAfterSeconds': 0}
+        ],
+        'strict': False
+    }
+
+    key = StringField(required=True)
+    model = StringField(required=True)
+    namespace = StringField()
+    response = StringField(required=True)
+    params = DictField()
+    hits = IntField(default=0)
+    expires_at = DateTimeField(required=True)
+
+    @classmethod
+    def lookup(cls, key):
+        """
+        Get a live entry's response and count the hit.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            str: The cached response, or None
+        """
+        entry = cls.objects(key=key, expires_at__gt=datetime.utcnow()).modify(inc__hits=1, new=True)
+        return entry.response if entry else None
+
+    @classmethod
+    def store(cls, key, model, response, ttl_seconds, namespace=None, params=None):
+        """Insert or replace an entry."""
+        now = datetime.utcnow()
+        cls.objects(key=key).update_one(
+            set__model=model,
+            set__namespace=namespace,
+            set__response=response,
+            set__params=params or {},
+            set__hits=0,
+            set__expires_at=now + timedelta(seconds=ttl_seconds),
+            set__updated_at=now,
+            set_on_insert__created_at=now,
+            upsert=True
+        )
+
+
+# Register the model after it's defined
+from . import registry
+registry.register('LLMCacheEntry', LLMCacheEntry)
+
+# Export the model
+__all__ = ['LLMCacheEntry']
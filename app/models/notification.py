@@ -112,6 +112,7 @@ class Notification(BaseDocument):
             # Compound indexes with explicit names
             [('user', 1), ('is_read', 1)],  # Will be auto-named
             [('user', 1), ('created_at', -1)],
+            [('user', 1), ('created_at', -1), ('id', -1)],  # keyset pagination
             [('created_at', -1)],
             [('priority', -1), ('created_at', -1)],
             [('is_read', 1), ('created_at', -1)],
@@ -217,6 +218,30 @@ class Notification(BaseDocument):
             List of notifications
         """
         return cls.objects(user=user).order_by('-created_at').limit(limit)
+    
+    @classmethod
+    def list_for_user(cls, user, cursor=None, per_page=20, unread_only=False, raw=False):
+        """
+        One page of a user's notifications, newest first.
+        
+        Args:
+            user: User to list notifications for
+            cursor: ``next_cursor``/``prev_cursor`` of a previous page
+            per_page: Page size
+            unread_only: Only list unread notifications
+            raw: Return projected ``as_pymongo()`` rows for
+                ``NotificationSerializer`` instead of documents
+            
+        Returns:
+            KeysetPage with the notifications and an approximate total
+        """
+        query = cls.objects(user=user)
+        if unread_only:
+            query = query.filter(is_read=False)
+        if raw:
+            from .serializers import NotificationSerializer
+            query = NotificationSerializer.query(query).as_pymongo()
+        return query.keyset_paginate(cursor=cursor, per_page=per_page, count='cached')
 
 # Export the model
 __all__ = ['Notification']
@@ -48,6 +48,14 @@ class ModelsRegistry:
                     from .assessment import Assessment
                     self._models[name] = Assessment
                     return Assessment
+                elif name == 'QuestionBucket':
+                    from .assessment import QuestionBucket
+                    self._models[name] = QuestionBucket
+                    return QuestionBucket
+                elif name == 'RecordingBucket':
+                    from .assessment import RecordingBucket
+                    self._models[name] = RecordingBucket
+                    return RecordingBucket
                 elif name == 'Question':
                     from .assessment import Question
                     self._models[name] = Question
@@ -56,6 +64,18 @@ class ModelsRegistry:
                     from .assessment import AudioRecording
                     self._models[name] = AudioRecording
                     return AudioRecording
+                elif name == 'AudioProcessingJob':
+                    from .audio_job import AudioProcessingJob
+                    self._models[name] = AudioProcessingJob
+                    return AudioProcessingJob
+                elif name == 'AudioUpload':
+                    from .audio_upload import AudioUpload
+                    self._models[name] = AudioUpload
+                    return AudioUpload
+                elif name == 'LLMCacheEntry':
+                    from .llm_cache import LLMCacheEntry
+                    self._models[name] = LLMCacheEntry
+                    return LLMCacheEntry
             except ImportError as e:
                 raise ValueError(f"Model {name} not found: {str(e)}") from e
     
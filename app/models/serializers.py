@@ -0,0 +1,225 @@
+"""
+Model Serializers
+
+Declarative JSON views of the models. A :class:`Serializer` names the fields
+of a model's ``summary`` view (list endpoints) and ``detail`` view (single
+documents); :meth:`Serializer.query` applies the matching ``.only()`` /
+``.exclude()`` projection to a queryset.
+
+Serialization works on raw BSON dicts. List endpoints use
+:meth:`Serializer.dump_many`, which reads the projected rows with
+``as_pymongo()`` and never constructs MongoEngine documents; a loaded
+document is serialized from ``to_mongo()``. Either way each value is
+converted once by :func:`json_value`.
+"""
+from datetime import datetime
+
+from bson import ObjectId, DBRef
+
+
+def _datetime(value):
+    return value.isoformat()
+
+
+def _dbref(value):
+    return str(value.id)
+
+
+# Conversions by exact type; JSON-native values are returned unchanged
+_CONVERTERS = {
+    ObjectId: str,
+    datetime: _datetime,
+    DBRef: _dbref
+}
+
+
+def json_value(value):
+    """
+    Convert a BSON value to plain JSON types.
+
+    ObjectIds become strings, references their target id and datetimes ISO
+    8601 strings; dicts and lists are converted recursively.
+    """
+    converter = _CONVERTERS.get(type(value))
+    if converter is not None:
+        return converter(value)
+    if isinstance(value, dict):
+        return {key: json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_value(item) for item in value]
+    return value
+
+
+class Serializer:
+    """
+    Field lists of one model's JSON views.
+
+    Subclasses set:
+
+    - ``model``: registry name of the model
+    - ``summary`` and ``detail``: field names of each view; ``None`` means
+      every field except ``exclude``
+    - ``exclude``: fields never serialized (e.g. secrets)
+    - ``computed``: output name -> (source fields, function of the raw row);
+      the source fields are loaded but only output if the view names them
+    """
+
+    VIEWS = ('summary', 'detail')
+
+    model = None
+    summary = ()
+    detail = None
+    exclude = ()
+    computed = {}
+
+    @classmethod
+    def _model(cls):
+        from . import get_model
+        return get_model(cls.model)
+
+    @classmethod
+    def fields(cls, view='summary'):
+        """
+        Field names output by ``view`` (``None`` for all but ``exclude``).
+
+        Raises:
+            ValueError: If the view is unknown
+        """
+        if view not in cls.VIEWS:
+            raise ValueError(f'Unknown view: {view}')
+        return getattr(cls, view)
+
+    @classmethod
+    def query(cls, queryset, view='summary'):
+        """Apply the projection of ``view`` to ``queryset``."""
+        fields = cls.fields(view)
+        if fields is None:
+            return queryset.exclude(*cls.exclude) if cls.exclude else queryset
+        loaded = list(fields)
+        for sources, _ in cls.computed.values():
+            loaded.extend(name for name in sources if name not in loaded)
+        return queryset.only(*loaded)
+
+    @classmethod
+    def dump_row(cls, row, view='summary'):
+        """
+        Serialize one raw document (``as_pymongo()`` row or ``to_mongo()``).
+
+        Args:
+            row: Dict keyed by database field names
+            view: ``'summary'`` or ``'detail'``
+
+        Returns:
+            dict: The JSON view, keyed by field names
+        """
+        fields = cls.fields(view)
+        model_fields = cls._model()._fields
+        data = {}
+        # Documents store their id as _id, embedded documents as id
+        row_id = row.get('_id', row.get('id'))
+        if row_id is not None:
+            data['id'] = str(row_id)
+
+        if fields is None:
+            names = {field.db_field: name for name, field in model_fields.items()}
+            for key, value in row.items():
+                name = names.get(key, key)
+                if name not in cls.exclude and key not in ('_id', '_cls') and name != 'id':
+                    data[name] = json_value(value)
+        else:
+            for name in fields:
+                field = model_fields.get(name)
+                data[name] = json_value(row.get(field.db_field if field else name))
+
+        for name, (_, compute) in cls.computed.items():
+            data[name] = json_value(compute(row))
+        return data
+
+    @classmethod
+    def dump(cls, document, view='detail'):
+        """Serialize a loaded document."""
+        return cls.dump_row(document.to_mongo(), view)
+
+    @classmethod
+    def dump_rows(cls, rows, view='summary'):
+        """Serialize raw rows."""
+        return [cls.dump_row(row, view) for row in rows]
+
+    @classmethod
+    def dump_many(cls, queryset, view='summary'):
+        """
+        Serialize a queryset without constructing documents.
+
+        The projection of ``view`` is applied and rows are read with
+        ``as_pymongo()``.
+        """
+        return cls.dump_rows(cls.query(queryset, view).as_pymongo(), view)
+
+
+def _minutes_between(row):
+    if row.get('started_at') and row.get('completed_at'):
+        return (row['completed_at'] - row['started_at']).total_seconds() / 60
+    return None
+
+
+_SCORE_FIELDS = ('pronunciation_score', 'structure_score', 'vocabulary_score', 'fluency_score',
+                 'comprehension_score', 'interaction_score', 'overall_score')
+
+
+class AssessmentSerializer(Serializer):
+    """Assessments; questions and recordings are serialized from their buckets."""
+
+    model = 'Assessment'
+    summary = (
+        'title', 'test_type', 'status', 'progress', 'created_by', 'assigned_to',
+        'scheduled_start_time', 'started_at', 'completed_at', 'expires_at', 'time_limit',
+        'question_count', 'recording_count', 'last_recording_at',
+        'overall_score', 'icao_level', 'is_practice', 'is_retake', 'created_at', 'updated_at'
+    )
+    detail = None
+    computed = {
+        'duration': (('started_at', 'completed_at'), _minutes_between),
+        'is_expired': (('expires_at',),
+                       lambda row: bool(row.get('expires_at')) and datetime.utcnow() > row['expires_at']),
+        'is_scored': (_SCORE_FIELDS, lambda row: all(row.get(name) is not None for name in _SCORE_FIELDS))
+    }
+
+
+class QuestionSerializer(Serializer):
+    """Assessment questions (without the correct answer)."""
+
+    model = 'Question'
+    summary = detail = (
+        'question_type', 'text', 'description', 'options', 'answer', 'score', 'feedback',
+        'audio_recording', 'audio_duration', 'created_at', 'updated_at'
+    )
+
+
+class UserSerializer(Serializer):
+    """Users, without credentials and sign-in addresses."""
+
+    model = 'User'
+    summary = ('name', 'first_name', 'last_name', 'email', 'status', 'is_active', 'email_verified',
+               'last_login', 'created_at')
+    detail = None
+    exclude = ('password_hash', 'reset_password_token', 'email_verification_token',
+               'current_sign_in_ip', 'last_sign_in_ip')
+
+
+class NotificationSerializer(Serializer):
+    """Notifications, in the shape of ``Notification.to_dict``."""
+
+    model = 'Notification'
+    summary = detail = (
+        'title', 'message', 'icon', 'is_read', 'action_url', 'action_label', 'priority',
+        'created_at', 'updated_at'
+    )
+    computed = {
+        'type': (('notification_type',), lambda row: row.get('notification_type'))
+    }
+
+
+__all__ = [
+    'json_value', 'Serializer', 'AssessmentSerializer', 'QuestionSerializer',
+    'UserSerializer', 'NotificationSerializer'
+]
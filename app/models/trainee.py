@@ -1,6 +1,7 @@
 from datetime import datetime
 from mongoengine import Document, StringField, DateTimeField, ReferenceField, ListField, EmbeddedDocument, EmbeddedDocumentField, EmailField, BooleanField
 from .user import User
+from .base import AtomicUpdateMixin, BaseQuerySet
 
 class TraineeProgress(EmbeddedDocument):
     """Tracks progress of a trainee in different areas"""
@@ -9,14 +10,16 @@ class TraineeProgress(EmbeddedDocument):
     notes = StringField()
     updated_at = DateTimeField(default=datetime.utcnow)
 
-class Trainee(Document):
+class Trainee(AtomicUpdateMixin, Document):
     """Trainee model for storing trainee information"""
     meta = {
         'collection': 'trainees',
+        'queryset_class': BaseQuerySet,
         'indexes': [
             'user',
             'status',
-            'training_program'
+            'training_program',
+            [('created_at', -1), ('id', -1)]  # keyset pagination
         ]
     }
     
@@ -67,6 +67,7 @@ class User(BaseDocument, UserMixin):
             [('status', 1), ('is_active', 1)],
             [('last_login', -1)],
             [('created_at', -1)],
+            [('created_at', -1), ('id', -1)],  # keyset pagination
             [('updated_at', -1)],
             
             # Text index for search
@@ -315,25 +316,27 @@ class User(BaseDocument, UserMixin):
     
     def record_login(self, ip_address):
         """Record a successful login."""
-        self.last_sign_in_ip = self.current_sign_in_ip
-        self.current_sign_in_ip = ip_address
-        self.last_login = datetime.utcnow()
-        self.sign_in_count += 1
-        self.login_attempts = 0
-        self.locked_until = None
-        self.save()
+        return self.atomic_update(
+            set={
+                'last_sign_in_ip': self.current_sign_in_ip,
+                'current_sign_in_ip': ip_address,
+                'last_login': datetime.utcnow(),
+                'login_attempts': 0
+            },
+            inc={'sign_in_count': 1},
+            unset=['locked_until']
+        )
     
     def record_failed_login(self):
         """Record a failed login attempt."""
         max_attempts = current_app.config.get('MAX_LOGIN_ATTEMPTS', 5)
         lockout_time = current_app.config.get('ACCOUNT_LOCKOUT_MINUTES', 15)
         
-        self.login_attempts += 1
+        # Concurrent failures each count: the counter is incremented in the database
+        self.atomic_update(inc={'login_attempts': 1})
         
         if self.login_attempts >= max_attempts:
-            self.locked_until = datetime.utcnow() + timedelta(minutes=lockout_time)
-        
-        self.save()
+            self.atomic_update(set={'locked_until': datetime.utcnow() + timedelta(minutes=lockout_time)})
     
     def is_locked(self):
         """Check if the account is locked due to too many failed login attempts."""
@@ -343,11 +346,12 @@ class User(BaseDocument, UserMixin):
         if self.locked_until > datetime.utcnow():
             return True
             
-        # Clear the lock if it's expired
-        self.login_attempts = 0
-        self.locked_until = None
-        self.save()
-        return False
+        # Clear the lock if it's expired, unless another request has just renewed it
+        if self.atomic_update(set={'login_attempts': 0}, unset=['locked_until'],
+                              conditions={'locked_until': self.locked_until}):
+            return False
+        self.reload('login_attempts', 'locked_until')
+        return bool(self.locked_until and self.locked_until > datetime.utcnow())
     
     def has_role(self, role_name):
         """Check if the user has the specified role."""
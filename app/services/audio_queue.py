@@ -0,0 +1,249 @@
+"""
+Audio Processing Queue
+
+Runs ``process_audio_file`` outside the web workers. Uploads enqueue an
+AudioProcessingJob document and return immediately; a pool of separate worker
+processes claims jobs from MongoDB, processes the audio and writes the results
+back onto the assessment's AudioRecording (in its RecordingBucket).
+
+Start the pool with ``python manage.py audio_worker``.
+"""
+import os
+import time
+import socket
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_recording(assessment_id, recording_id, file_path, language='en-US', transcript_segments=None):
+    """
+    Queue an uploaded recording for background processing.
+
+    Args:
+        assessment_id: ID of the assessment that owns the recording
+        recording_id: ID of the AudioRecording to fill in
+        file_path: Path to the saved audio file
+        language: Language code for transcription
+        transcript_segments: ``{'start', 'end', 'text'}`` segments already
+            transcribed (by a live upload), so the worker does not transcribe again
+
+    Returns:
+        The created AudioProcessingJob
+    """
+    from flask import current_app
+    from ..models import get_model
+    AudioProcessingJob = get_model('AudioProcessingJob')
+
+    job = AudioProcessingJob(
+        assessment_id=str(assessment_id),
+        recording_id=str(recording_id),
+        file_path=file_path,
+        language=language,
+        transcript_segments=transcript_segments or [],
+        max_attempts=current_app.config.get('AUDIO_JOB_MAX_ATTEMPTS', 3)
+    )
+    job.save()
+    return job
+
+
+def _update_recording(job, **fields):
+    """Apply ``fields`` to the job's recording in its bucket with a positional update."""
+    from ..models import get_model
+    RecordingBucket = get_model('RecordingBucket')
+
+    return RecordingBucket.update_item(job.assessment_id, job.recording_id, **fields)
+
+
+def _seed_transcript(file_path, segments, segmented):
+    """Cache a live upload's transcript under ``file_path`` so the analysis does not transcribe again."""
+    from ..utils.audio_cache import get_audio_cache, audio_digest
+    from ..utils.audio_processing import _transcription_params
+
+    cache = get_audio_cache()
+    # process_audio_file transcribes in en-US
+    params = _transcription_params('en-US')
+    if segmented:
+        key = cache.make_key(audio_digest(file_path), 'transcription_segments', params)
+        cache.set(key, [segment for segment in segments if segment.get('text')])
+    else:
+        key = cache.make_key(audio_digest(file_path), 'transcription', params)
+        cache.set(key, ' '.join(segment['text'] for segment in segments if segment.get('text')))
+
+
+def run_job(job):
+    """
+    Process a claimed job and persist the outcome.
+
+    Args:
+        job: A running AudioProcessingJob
+
+    Returns:
+        bool: True if the job succeeded
+    """
+    from flask import current_app
+    from ..models import get_model
+    from ..utils.audio_processing import AudioAnalysisPipeline, process_audio_file
+    from ..utils.audio_preview import generate_previews
+    from ..utils.audio_transcode import transcode_upload
+    from ..utils.feature_store import get_feature_store
+    TranscriptSegment = get_model('TranscriptSegment')
+
+    # Keep the heartbeat fresh while the (possibly long) analysis runs
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(15):
+            job.update(set__heartbeat_at=datetime.utcnow())
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+
+    try:
+        # Analyse the canonical 16 kHz mono copy; keep an Opus copy for archival
+        analysis_path, archive_path = transcode_upload(
+            job.file_path,
+            sample_rate=current_app.config.get('AUDIO_ANALYSIS_SAMPLE_RATE', 16000),
+            bitrate=current_app.config.get('AUDIO_ARCHIVE_BITRATE', '24k')
+        )
+        source_path = analysis_path or job.file_path
+        segmented = current_app.config.get('AUDIO_SEGMENTED_TRANSCRIPTION', True)
+        if job.transcript_segments:
+            _seed_transcript(source_path, job.transcript_segments, segmented)
+        
+        # One pipeline for analysis and previews, so the file is decoded once
+        pipeline = AudioAnalysisPipeline(source_path)
+        result = process_audio_file(
+            source_path,
+            segmented=segmented,
+            max_workers=current_app.config.get('AUDIO_SEGMENT_WORKERS', 4),
+            pipeline=pipeline
+        )
+        quality = result.get('quality_metrics') or {}
+        previews = generate_previews(pipeline, buckets=current_app.config.get('AUDIO_WAVEFORM_BUCKETS', 1000),
+                                     file_path=job.file_path)
+
+        recording_fields = {
+            'transcript': result.get('transcription', ''),
+            'transcript_segments': [TranscriptSegment(**segment) for segment in result.get('segments') or []],
+            'language': result.get('language', job.language),
+            'quality_metrics': quality,
+            'audio_features': result.get('audio_features') or {},
+            'analysis_path': analysis_path,
+            'archive_path': archive_path,
+            'waveform_path': previews['waveform_path'],
+            'spectrogram_path': previews['spectrogram_path'],
+            'is_processed': True,
+            'processed_at': datetime.utcnow(),
+            'processing_error': None
+        }
+        if quality.get('duration_seconds'):
+            recording_fields['duration'] = quality['duration_seconds']
+
+        _update_recording(job, **recording_fields)
+        if recording_fields['audio_features'] and current_app.config.get('FEATURE_STORE_ENABLED', True):
+            get_feature_store().add(job.recording_id, recording_fields['audio_features'],
+                                    recorded_at=job.created_at, group_id=job.assessment_id)
+        job.mark_done({
+            'word_count': result.get('word_count', 0),
+            'duration_seconds': quality.get('duration_seconds')
+        })
+        return True
+
+    except Exception as e:
+        logger.error(f"Error processing audio job {job.id}: {str(e)}")
+        error = str(e) or e.__class__.__name__
+        if job.attempts < job.max_attempts:
+            # Put it back for another worker to retry
+            job.update(set__status=job.STATUS_QUEUED, set__error=error, unset__worker=True)
+        else:
+            job.mark_failed(error)
+            _update_recording(job, is_processed=False, processing_error=error,
+                              processed_at=datetime.utcnow())
+        return False
+
+    finally:
+        stop.set()
+
+
+def _worker_main(config_name, poll_interval, stale_after):
+    """Entry point of a single worker process."""
+    # Each process opens its own MongoDB connection
+    from app import create_app
+    from ..models import get_model
+
+    app = create_app(config_name)
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    with app.app_context():
+        AudioProcessingJob = get_model('AudioProcessingJob')
+
+        # Load the speech recognition model before the first job, once per process
+        from ..utils.transcribers import get_transcriber
+        try:
+            get_transcriber().warm_up()
+        except Exception as e:
+            app.logger.error(f"Could not warm up transcriber: {str(e)}")
+
+        app.logger.info(f"Audio worker {worker_name} started")
+        last_sweep = 0.0
+
+        while True:
+            try:
+                if time.monotonic() - last_sweep > stale_after:
+                    AudioProcessingJob.requeue_stale(stale_after)
+                    last_sweep = time.monotonic()
+
+                job = AudioProcessingJob.claim_next(worker_name)
+                if job is None:
+                    time.sleep(poll_interval)
+                    continue
+
+                run_job(job)
+
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                app.logger.error(f"Audio worker {worker_name} error: {str(e)}")
+                time.sleep(poll_interval)
+
+
+def run_workers(num_workers=None, config_name=None, poll_interval=None, stale_after=None):
+    """
+    Start a pool of audio worker processes and wait for them.
+
+    Args:
+        num_workers: Number of processes (default: AUDIO_WORKERS or CPU count)
+        config_name: Configuration name passed to ``create_app``
+        poll_interval: Seconds to sleep when the queue is empty
+        stale_after: Seconds without heartbeat before a running job is requeued
+    """
+    from config import Config
+
+    num_workers = num_workers or Config.AUDIO_WORKERS
+    poll_interval = poll_interval or Config.AUDIO_JOB_POLL_INTERVAL
+    stale_after = stale_after or Config.AUDIO_JOB_STALE_SECONDS
+
+    # Spawn rather than fork so no MongoDB client is shared across processes
+    ctx = multiprocessing.get_context('spawn')
+    processes = [
+        ctx.Process(target=_worker_main, args=(config_name, poll_interval, stale_after),
+                    name=f"audio-worker-{i}")
+        for i in range(num_workers)
+    ]
+
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} audio worker processes")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
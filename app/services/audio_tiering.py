@@ -0,0 +1,156 @@
+"""
+Audio Storage Tiering
+
+Moves recordings of closed assessments to the compressed tier. For every
+recording of a ``completed`` or ``archived`` assessment that finished more
+than N days ago, the Opus/Ogg archival copy is (created if missing and)
+verified, then the original upload and the analysis copy are deleted and the
+recording is repointed at the archival file.
+
+Run it with ``python manage.py tier_recordings``.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Closed assessments whose recordings no longer need the original files
+TIERED_STATUSES = ('completed', 'archived')
+
+# Accept an archival copy whose duration is within this many seconds
+_DURATION_TOLERANCE = 0.5
+
+
+def _verified_archive(recording):
+    """Return the recording's archival copy, creating it if needed, or None if unusable."""
+    from ..utils.audio_probe import probe_audio
+    from ..utils.audio_transcode import derived_paths, write_archive_copy
+
+    file_path = recording.get('file_path')
+    archive_path = recording.get('archive_path') or derived_paths(file_path)[1]
+
+    if not os.path.exists(archive_path):
+        if not file_path or not os.path.exists(file_path):
+            return None
+        write_archive_copy(file_path, archive_path)
+
+    # Never delete an original unless the copy decodes to the same length
+    info = probe_audio(archive_path)
+    expected = recording.get('duration') or 0.0
+    if not info or info.get('duration') is None:
+        return None
+    if expected and abs(info['duration'] - expected) > _DURATION_TOLERANCE:
+        return None
+    return archive_path
+
+
+def tier_recordings(collection, bucket_collection, older_than_days=30, dry_run=False, batch_size=100):
+    """
+    Move recordings of old closed assessments to the compressed tier.
+
+    Args:
+        collection: The raw ``assessments`` collection
+        bucket_collection: The raw ``recording_buckets`` collection
+        older_than_days: Minimum age of the assessment's completion
+        dry_run: Only report what would be freed
+        batch_size: Number of updates per ``bulk_write``
+
+    Returns:
+        dict: Run statistics
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    closed = collection.distinct('_id', {
+        'status': {'$in': list(TIERED_STATUSES)},
+        '$or': [{'completed_at': {'$lt': cutoff}},
+                {'completed_at': None, 'updated_at': {'$lt': cutoff}}],
+        'recording_count': {'$ne': 0}
+    })
+    query = {
+        'assessment_id': {'$in': closed},
+        'recordings': {'$elemMatch': {'storage_tier': {'$ne': 'archive'}, 'file_path': {'$exists': True}}}
+    }
+    projection = {
+        'recordings.file_path': 1, 'recordings.archive_path': 1, 'recordings.analysis_path': 1,
+        'recordings.storage_tier': 1, 'recordings.duration': 1
+    }
+
+    stats = {'tiered': 0, 'failed': 0, 'bytes_freed': 0}
+    # (update, bucket _id, recording index, archive path, files to delete)
+    pending = []
+
+    def repointed(bucket_id, index, archive_path):
+        doc = bucket_collection.find_one({'_id': bucket_id}, {'recordings': {'$slice': [index, 1]}})
+        recordings = (doc or {}).get('recordings') or []
+        return bool(recordings) and recordings[0].get('file_path') == archive_path
+
+    def flush():
+        if not pending:
+            return
+        # Repoint the documents first so no recording references a deleted file
+        try:
+            result = bucket_collection.bulk_write([entry[0] for entry in pending], ordered=False)
+            all_matched = result.matched_count == len(pending)
+        except BulkWriteError as e:
+            logger.warning(f"Tiering batch partly failed: {str(e)}")
+            all_matched = False
+        for _, bucket_id, index, archive_path, obsolete in pending:
+            # A guard that did not match left the recording on its original files
+            if not all_matched and not repointed(bucket_id, index, archive_path):
+                stats['tiered'] -= 1
+                stats['failed'] += 1
+                continue
+            for path in obsolete:
+                try:
+                    stats['bytes_freed'] += os.path.getsize(path)
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not delete {path}: {str(e)}")
+        pending.clear()
+
+    for doc in bucket_collection.find(query, projection).batch_size(200):
+        for index, recording in enumerate(doc.get('recordings') or []):
+            file_path = recording.get('file_path')
+            if recording.get('storage_tier') == 'archive' or not file_path:
+                continue
+
+            obsolete = [path for path in (file_path, recording.get('analysis_path'))
+                        if path and os.path.exists(path)]
+            if dry_run:
+                stats['tiered'] += 1
+                stats['bytes_freed'] += sum(os.path.getsize(path) for path in obsolete)
+                continue
+
+            try:
+                archive_path = _verified_archive(recording)
+            except Exception as e:
+                archive_path = None
+                logger.warning(f"Could not archive {file_path}: {str(e)}")
+            if not archive_path:
+                stats['failed'] += 1
+                continue
+
+            obsolete = [path for path in obsolete if path != archive_path]
+            stats['tiered'] += 1
+
+            # Guard on file_path so a reshuffled array is never overwritten
+            update = UpdateOne(
+                {'_id': doc['_id'], f'recordings.{index}.file_path': file_path},
+                {'$set': {
+                    f'recordings.{index}.file_path': archive_path,
+                    f'recordings.{index}.archive_path': archive_path,
+                    f'recordings.{index}.file_type': 'audio/ogg',
+                    f'recordings.{index}.file_size': os.path.getsize(archive_path),
+                    f'recordings.{index}.storage_tier': 'archive'
+                }, '$unset': {f'recordings.{index}.analysis_path': ''}}
+            )
+            pending.append((update, doc['_id'], index, archive_path, obsolete))
+            if len(pending) >= batch_size:
+                flush()
+
+    flush()
+    logger.info(f"Tiering: {stats['tiered']} recordings archived, {stats['failed']} failed, "
+                f"{stats['bytes_freed'] / (1024 * 1024):.1f} MB freed")
+    return stats
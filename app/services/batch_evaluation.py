@@ -0,0 +1,355 @@
+"""
+Batch Evaluation
+
+Scores many assessments at once, e.g. after an exam day. Transcripts are
+packed into token-budgeted requests that each rate several candidates,
+requests run with bounded parallelism, every reply is validated against a
+strict JSON schema, and the six ``*_score`` fields, ``overall_score`` and
+``icao_level`` of all scored assessments are written with one ``bulk_write``.
+
+Candidates whose rating is missing or invalid in a packed reply are retried
+once on their own before being reported as failed. Transcripts too long for
+one request are chunked and scored map-reduce style by
+:mod:`app.services.transcript_chunking`.
+
+Run it with ``python manage.py evaluate_assessments``.
+"""
+import json
+import asyncio
+import logging
+from datetime import datetime
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+CRITERIA = ('pronunciation', 'structure', 'vocabulary', 'fluency', 'comprehension', 'interaction')
+
+# Prompt tokens per request, leaving room for the reply in an 8k context
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Completion tokens reserved per candidate in a packed reply
+_REPLY_TOKENS_PER_ITEM = 80
+
+SYSTEM_PROMPT = ("You are an ICAO language proficiency rater. Evaluate each candidate objectively "
+                 "and reply with JSON only.")
+
+
+class SchemaError(ValueError):
+    """Raised when a batch reply does not match the expected schema."""
+
+
+def _instructions():
+    from utils.openai_utils import ICAO_CRITERIA
+
+    lines = ["Rate each pilot's responses below on the ICAO language proficiency scale "
+             "(integer 1-6, where 6 is expert level) for each criterion:"]
+    lines += [f"- {name}: {ICAO_CRITERIA[name]}" for name in CRITERIA]
+    example = ', '.join(f'"{name}": <1-6>' for name in CRITERIA)
+    lines.append("Reply with exactly one JSON object and nothing else, containing one result per "
+                 f'candidate: {{"results": [{{"id": "<candidate id>", {example}}}]}}')
+    return '\n'.join(lines)
+
+
+def _candidate_block(item_id, transcript):
+    return f"\n\n### Candidate {item_id}\n{transcript}"
+
+
+def prompt_capacity(token_budget=DEFAULT_TOKEN_BUDGET, model='gpt-4'):
+    """Tokens left for candidate transcripts once the instructions are counted."""
+    from utils.tokens import count_tokens
+
+    return max(token_budget - count_tokens(SYSTEM_PROMPT + _instructions(), model), 1)
+
+
+def pack_batches(items, token_budget=DEFAULT_TOKEN_BUDGET, max_items=10, model='gpt-4'):
+    """
+    Greedily pack transcripts into requests that fit the prompt token budget.
+
+    A transcript that does not fit an empty request on its own is truncated
+    to the budget and sent alone.
+
+    Args:
+        items: List of (id, transcript) tuples
+        token_budget: Maximum prompt tokens per request
+        max_items: Maximum candidates per request
+        model: Model whose tokenizer to count with
+
+    Returns:
+        list: Lists of (id, transcript) tuples, one per request
+    """
+    from utils.tokens import count_tokens, truncate_tokens
+
+    available = prompt_capacity(token_budget, model)
+
+    batches, current, used = [], [], 0
+    for item_id, transcript in items:
+        size = count_tokens(_candidate_block(item_id, transcript), model)
+        if size > available:
+            logger.warning(f"Transcript of {item_id} exceeds the token budget and was truncated")
+            transcript = truncate_tokens(transcript, available - count_tokens(_candidate_block(item_id, ''), model), model)
+            size = available
+
+        if current and (used + size > available or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append((item_id, transcript))
+        used += size
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_messages(batch):
+    """Chat messages rating every candidate in ``batch``."""
+    prompt = _instructions() + ''.join(_candidate_block(item_id, transcript) for item_id, transcript in batch)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _extract_json(text):
+    """Decode the reply's JSON object, tolerating a surrounding code fence."""
+    text = (text or '').strip()
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise SchemaError('Reply contains no JSON object')
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise SchemaError(f'Reply is not valid JSON: {str(e)}') from e
+
+
+def validate_result(result):
+    """
+    Validate one candidate's rating.
+
+    Args:
+        result: Decoded result object
+
+    Returns:
+        dict: criterion -> score (float)
+
+    Raises:
+        SchemaError: If a key is missing or unknown, or a score is not a number from 1 to 6
+    """
+    if not isinstance(result, dict):
+        raise SchemaError('Result is not an object')
+
+    unknown = set(result) - set(CRITERIA) - {'id'}
+    if unknown:
+        raise SchemaError(f"Unknown keys: {', '.join(sorted(unknown))}")
+
+    scores = {}
+    for name in CRITERIA:
+        value = result.get(name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SchemaError(f'{name} is missing or not a number')
+        if not 1 <= value <= 6:
+            raise SchemaError(f'{name} is out of range: {value}')
+        scores[name] = float(value)
+    return scores
+
+
+def parse_batch_reply(text, expected_ids):
+    """
+    Parse a packed reply with a strict schema.
+
+    Args:
+        text: Completion text
+        expected_ids: Candidate ids the request contained
+
+    Returns:
+        tuple: (scores, errors) -- ``{id: {criterion: score}}`` for valid
+        results and ``{id: message}`` for missing, duplicated or invalid ones
+    """
+    expected = set(expected_ids)
+    try:
+        data = _extract_json(text)
+        if not isinstance(data, dict) or not isinstance(data.get('results'), list):
+            raise SchemaError('Reply has no "results" list')
+    except SchemaError as e:
+        return {}, {item_id: str(e) for item_id in expected}
+
+    scores, errors = {}, {}
+    for result in data['results']:
+        item_id = str(result.get('id')) if isinstance(result, dict) else None
+        if item_id not in expected:
+            continue
+        if item_id in scores or item_id in errors:
+            errors[item_id] = 'Duplicate result'
+            scores.pop(item_id, None)
+            continue
+        try:
+            scores[item_id] = validate_result(result)
+        except SchemaError as e:
+            errors[item_id] = str(e)
+
+    for item_id in expected - set(scores) - set(errors):
+        errors[item_id] = 'Missing from reply'
+    return scores, errors
+
+
+def summarize_scores(scores):
+    """
+    Derive ``overall_score`` and ``icao_level`` from the six criterion scores.
+
+    Returns:
+        dict: The ``*_score`` fields, ``overall_score`` and ``icao_level``
+    """
+    from ..models.assessment import Assessment
+
+    overall = round(sum(scores[name] for name in CRITERIA) / len(CRITERIA), 1)
+    fields = {f'{name}_score': scores[name] for name in CRITERIA}
+    fields['overall_score'] = overall
+    fields['icao_level'] = Assessment.determine_icao_level(overall)
+    return fields
+
+
+async def rate_batches(batches, model, concurrency):
+    """Rate all batches with at most ``concurrency`` requests in flight."""
+    from utils.openai_client import get_client
+
+    client = get_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def rate(batch):
+        async with semaphore:
+            try:
+                reply = await client.chat(build_messages(batch), model=model, temperature=0.0,
+                                          max_tokens=_REPLY_TOKENS_PER_ITEM * len(batch) + 50)
+            except Exception as e:
+                logger.warning(f"Batch of {len(batch)} failed: {str(e)}")
+                return {}, {item_id: str(e) or e.__class__.__name__ for item_id, _ in batch}
+        return parse_batch_reply(reply, [item_id for item_id, _ in batch])
+
+    return await asyncio.gather(*(rate(batch) for batch in batches))
+
+
+def load_transcripts(assessment_ids):
+    """
+    Load each assessment's transcribed recordings, labelled by stage.
+
+    Questions and recordings are read from their bucket collections, a few
+    fields at a time.
+
+    Returns:
+        list: (id, segments) tuples for assessments with a transcript, where
+        segments are (stage, transcript) tuples in recording order
+    """
+    from ..models import get_model
+    from .transcript_chunking import recording_segments
+
+    assessment_ids = list(assessment_ids)
+    sources = (
+        ('QuestionBucket', 'questions', {'questions.question_type': 1, 'questions.audio_recording': 1}),
+        ('RecordingBucket', 'recordings', {'recordings.id': 1, 'recordings.file_name': 1,
+                                           'recordings.transcript': 1})
+    )
+    docs = {}
+    for model_name, field, projection in sources:
+        buckets = get_model(model_name)._get_collection()
+        query = {'assessment_id': {'$in': assessment_ids}}
+        for bucket in buckets.find(query, dict(projection, assessment_id=1)).sort('_id', 1):
+            doc = docs.setdefault(bucket['assessment_id'], {'questions': [], 'recordings': []})
+            doc[field].extend(bucket.get(field) or [])
+
+    items = []
+    for assessment_id in assessment_ids:
+        segments = recording_segments(docs.get(assessment_id) or {})
+        if segments:
+            items.append((str(assessment_id), segments))
+    return items
+
+
+def join_segments(segments):
+    """The full transcript of (stage, transcript) segments, one recording per paragraph."""
+    return "\n\n".join(text for _, text in segments)
+
+
+def evaluate_assessments(collection, assessment_ids, model='gpt-4', token_budget=DEFAULT_TOKEN_BUDGET,
+                         max_items=10, concurrency=4, dry_run=False):
+    """
+    Score many assessments with packed requests and one ``bulk_write``.
+
+    Args:
+        collection: The raw ``assessments`` collection
+        assessment_ids: Assessment ObjectIds to score
+        model: Chat model
+        token_budget: Maximum prompt tokens per request
+        max_items: Maximum candidates per request
+        concurrency: Maximum requests in flight
+        dry_run: Score but do not write
+
+    Returns:
+        dict: Run statistics, plus ``scores`` (id -> written fields) and
+        ``errors`` (id -> message)
+    """
+    from utils.openai_client import run_sync
+    from utils.tokens import count_tokens
+    from .transcript_chunking import score_chunked
+
+    assessment_ids = list(assessment_ids)
+    loaded = load_transcripts(assessment_ids)
+    transcripts = {item_id: join_segments(segments) for item_id, segments in loaded}
+
+    # Sessions too long for one request are scored map-reduce style
+    capacity = prompt_capacity(token_budget, model)
+    oversized = [(item_id, segments) for item_id, segments in loaded
+                 if count_tokens(_candidate_block(item_id, transcripts[item_id]), model) > capacity]
+    long_ids = {item_id for item_id, _ in oversized}
+    items = [(item_id, transcripts[item_id]) for item_id, _ in loaded if item_id not in long_ids]
+    batches = pack_batches(items, token_budget=token_budget, max_items=max_items, model=model)
+
+    scores, errors = {}, {}
+    requests = len(batches)
+    if oversized:
+        chunked_scores, chunked_errors, chunk_requests = run_sync(
+            score_chunked(oversized, model, concurrency, token_budget))
+        scores.update(chunked_scores)
+        errors.update(chunked_errors)
+        requests += chunk_requests
+
+    for batch_scores, batch_errors in run_sync(rate_batches(batches, model, concurrency)):
+        scores.update(batch_scores)
+        errors.update(batch_errors)
+
+    # One more attempt, alone, for candidates a packed reply got wrong
+    packed = {item_id for batch in batches if len(batch) > 1 for item_id, _ in batch}
+    retry_ids = [item_id for item_id in errors if item_id in packed]
+    if retry_ids:
+        retries = pack_batches([(item_id, transcripts[item_id]) for item_id in retry_ids],
+                               token_budget=token_budget, max_items=1, model=model)
+        requests += len(retries)
+        for batch_scores, batch_errors in run_sync(rate_batches(retries, model, concurrency)):
+            scores.update(batch_scores)
+            for item_id in batch_scores:
+                errors.pop(item_id, None)
+            errors.update(batch_errors)
+
+    fields = {item_id: summarize_scores(item_scores) for item_id, item_scores in scores.items()}
+    if fields and not dry_run:
+        from bson import ObjectId
+
+        now = datetime.utcnow()
+        collection.bulk_write([
+            UpdateOne({'_id': ObjectId(item_id)}, {'$set': dict(update, updated_at=now)})
+            for item_id, update in fields.items()
+        ], ordered=False)
+
+    for item_id, message in errors.items():
+        logger.warning(f"Could not score assessment {item_id}: {message}")
+    logger.info(f"Batch evaluation: {len(fields)} scored, {len(errors)} failed, "
+                f"{len(assessment_ids) - len(loaded)} without transcripts, {len(oversized)} chunked, "
+                f"{requests} requests")
+
+    return {
+        'scored': len(fields),
+        'failed': len(errors),
+        'skipped': len(assessment_ids) - len(loaded),
+        'chunked': len(oversized),
+        'requests': requests,
+        'scores': fields,
+        'errors': errors
+    }
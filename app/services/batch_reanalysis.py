@@ -0,0 +1,194 @@
+"""
+Batch Re-analysis
+
+Re-runs audio quality metrics and feature extraction over every recording in
+the ``recording_buckets`` collection, e.g. after a rubric change. Recordings are
+fanned out over a ``ProcessPoolExecutor``; results are written back with
+unordered ``bulk_write`` batches and progress is checkpointed to a file so an
+interrupted run can be resumed. The checkpoint is removed once a run completes,
+so the next run re-analyzes every recording again.
+
+Run it with ``python manage.py reanalyze_recordings``.
+"""
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_recording(file_path):
+    """
+    Compute quality metrics and features for one file.
+
+    Runs inside a pool process, so it must stay importable at module level
+    and must not touch the database.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        tuple: (quality_metrics, audio_features, error)
+    """
+    from ..utils.audio_processing import AudioAnalysisPipeline
+
+    if not os.path.exists(file_path):
+        return {}, {}, 'File not found'
+
+    try:
+        pipeline = AudioAnalysisPipeline(file_path).load()
+        return pipeline.quality_metrics(), pipeline.features(), None
+    except Exception as e:
+        return {}, {}, str(e) or e.__class__.__name__
+
+
+def iter_recordings(collection, assessment_ids=None):
+    """
+    Yield the recordings to re-analyze straight from pymongo.
+
+    Args:
+        collection: The raw ``recording_buckets`` collection
+        assessment_ids: Optional list of assessment ObjectIds to restrict to
+
+    Yields:
+        tuple: (bucket_id, recording_index, file_path)
+    """
+    query = {'recordings.file_path': {'$exists': True}}
+    if assessment_ids:
+        query['assessment_id'] = {'$in': list(assessment_ids)}
+
+    cursor = collection.find(query, {'recordings.file_path': 1}).batch_size(500)
+    for doc in cursor:
+        for index, recording in enumerate(doc.get('recordings') or []):
+            file_path = recording.get('file_path')
+            if file_path:
+                yield doc['_id'], index, file_path
+
+
+class Checkpoint:
+    """Append-only record of recordings that have already been written back."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    @staticmethod
+    def key(bucket_id, index):
+        return f"{bucket_id}:{index}"
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def extend(self, keys):
+        """Persist a batch of completed keys."""
+        if not keys:
+            return
+        self.done.update(keys)
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write('\n'.join(keys) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Forget all completed keys and remove the file."""
+        self.done.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def reanalyze_recordings(collection, workers=None, checkpoint_path=None, batch_size=100,
+                         assessment_ids=None, max_in_flight=None):
+    """
+    Re-analyze all recordings and bulk-write the results.
+
+    Args:
+        collection: The raw ``recording_buckets`` collection
+        workers: Pool size (default: number of available cores)
+        checkpoint_path: File used to skip recordings already processed by an
+            interrupted run; removed when this run completes
+        batch_size: Number of updates per ``bulk_write``
+        assessment_ids: Optional list of assessment ObjectIds to restrict to
+        max_in_flight: Maximum number of submitted but unfinished files
+
+    Returns:
+        dict: Run statistics
+    """
+    if not workers:
+        # Respect CPU affinity/cgroup limits where the platform exposes them
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    max_in_flight = max_in_flight or workers * 4
+    checkpoint = Checkpoint(checkpoint_path)
+
+    stats = {'processed': 0, 'failed': 0, 'skipped': 0, 'audio_seconds': 0.0}
+    pending_ops, pending_keys = [], []
+    started = time.monotonic()
+
+    def flush():
+        if pending_ops:
+            collection.bulk_write(pending_ops, ordered=False)
+            checkpoint.extend(pending_keys)
+            pending_ops.clear()
+            pending_keys.clear()
+
+    def report():
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(
+            f"Re-analysis: {stats['processed']} done, {stats['failed']} failed, "
+            f"{stats['skipped']} skipped - {stats['processed'] / elapsed:.2f} files/s, "
+            f"{stats['audio_seconds'] / elapsed:.1f} audio-s/s"
+        )
+
+    def collect(future, target):
+        bucket_id, index, file_path = target
+        quality, features, error = future.result()
+        if error:
+            stats['failed'] += 1
+            logger.warning(f"Could not re-analyze {file_path}: {error}")
+            update = {f'recordings.{index}.processing_error': error}
+        else:
+            stats['processed'] += 1
+            stats['audio_seconds'] += quality.get('duration_seconds', 0.0)
+            update = {
+                f'recordings.{index}.quality_metrics': quality,
+                f'recordings.{index}.audio_features': features
+            }
+        # Guard on file_path so a reshuffled array is never overwritten
+        pending_ops.append(UpdateOne(
+            {'_id': bucket_id, f'recordings.{index}.file_path': file_path},
+            {'$set': update}
+        ))
+        pending_keys.append(Checkpoint.key(bucket_id, index))
+        if len(pending_ops) >= batch_size:
+            flush()
+            report()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        for target in iter_recordings(collection, assessment_ids):
+            if Checkpoint.key(target[0], target[1]) in checkpoint:
+                stats['skipped'] += 1
+                continue
+
+            in_flight[pool.submit(analyze_recording, target[2])] = target
+
+            # Bound memory by draining before submitting more work
+            if len(in_flight) >= max_in_flight:
+                future = next(as_completed(in_flight))
+                collect(future, in_flight.pop(future))
+
+        for future in as_completed(list(in_flight)):
+            collect(future, in_flight.pop(future))
+
+    flush()
+    report()
+    checkpoint.clear()
+
+    stats['elapsed_seconds'] = time.monotonic() - started
+    stats['workers'] = workers
+    return stats
@@ -0,0 +1,223 @@
+"""
+Assessment Bucket Migration
+
+Questions and recordings used to be embedded in the assessment document, so
+every ``assessment.save()`` rewrote the whole growing array and list views
+loaded every transcript. They now live in the ``question_buckets`` and
+``recording_buckets`` collections (see :class:`app.models.assessment.AssessmentBucket`),
+and the assessment only keeps ``question_count``, ``recording_count`` and
+``last_recording_at``.
+
+:func:`migrate_assessments` moves the embedded arrays of existing documents
+into buckets. It can be re-run safely: items whose id is already in a bucket
+are skipped, and the arrays are only removed once their items are stored.
+
+:func:`benchmark` measures save and load cost against the number of
+recordings for both layouts, on scratch collections.
+
+Run them with ``python manage.py migrate_assessment_buckets`` and
+``python manage.py benchmark_assessment_buckets``.
+"""
+import time
+import uuid
+import hashlib
+import logging
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def _item_id(field, assessment_id, index):
+    """
+    The id of an embedded item stored without one.
+
+    Derived from the assessment and the item's position so an interrupted run
+    gives the item the same id again and does not store it twice.
+    """
+    digest = hashlib.sha1(f'{field}:{assessment_id}:{index}'.encode()).digest()
+    return ObjectId(assessment_id.binary[:4] + digest[:8])
+
+
+def _bucket_documents(model, assessment_id, items, existing_ids, now):
+    """Raw bucket documents holding the ``items`` not stored yet."""
+    field = model.ITEMS_FIELD
+    pending = []
+    for index, item in enumerate(items):
+        # Embedded questions of old documents have no id yet
+        if 'id' not in item:
+            item['id'] = _item_id(field, assessment_id, index)
+        if item['id'] not in existing_ids:
+            pending.append(item)
+
+    documents = []
+    for start in range(0, len(pending), model.BUCKET_SIZE):
+        chunk = pending[start:start + model.BUCKET_SIZE]
+        document = {'assessment_id': assessment_id, 'count': len(chunk), field: chunk,
+                    'created_at': now, 'updated_at': now}
+        if model._meta.get('allow_inheritance'):
+            document['_cls'] = model._class_name
+        documents.append(document)
+    return documents
+
+
+def migrate_assessments(dry_run=False, batch_size=100):
+    """
+    Move embedded questions and recordings into their bucket collections.
+
+    Args:
+        dry_run: Only count what would be moved
+        batch_size: Assessments per round of bulk writes
+
+    Returns:
+        dict: Run statistics
+    """
+    from ..models import get_model
+
+    Assessment = get_model('Assessment')
+    models = {'questions': get_model('QuestionBucket'), 'recordings': get_model('RecordingBucket')}
+    collection = Assessment._get_collection()
+    buckets = {field: model._get_collection() for field, model in models.items()}
+
+    stats = {'assessments': 0, 'questions': 0, 'recordings': 0, 'buckets': 0}
+    bucket_ops = {field: [] for field in models}
+    assessment_ops = []
+
+    def flush():
+        # Store the items before the arrays are removed from the assessments
+        for field, ops in bucket_ops.items():
+            if ops:
+                buckets[field].bulk_write(ops, ordered=False)
+                ops.clear()
+        if assessment_ops:
+            collection.bulk_write(assessment_ops, ordered=False)
+            assessment_ops.clear()
+
+    query = {'$or': [{'questions': {'$exists': True}}, {'recordings': {'$exists': True}}]}
+    for doc in collection.find(query, {'questions': 1, 'recordings': 1}).batch_size(batch_size):
+        now = datetime.utcnow()
+        counts = {}
+        for field, model in models.items():
+            items = doc.get(field) or []
+            existing = set(buckets[field].distinct(f'{field}.id', {'assessment_id': doc['_id']}))
+            documents = _bucket_documents(model, doc['_id'], items, existing, now)
+            moved = sum(document['count'] for document in documents)
+            counts[field] = len(existing) + moved
+            stats[field] += moved
+            stats['buckets'] += len(documents)
+            bucket_ops[field].extend(InsertOne(document) for document in documents)
+
+        recorded = [r.get('created_at') for r in doc.get('recordings') or [] if r.get('created_at')]
+        update = {'question_count': counts['questions'], 'recording_count': counts['recordings']}
+        if recorded:
+            update['last_recording_at'] = max(recorded)
+        assessment_ops.append(UpdateOne(
+            {'_id': doc['_id']},
+            {'$set': update, '$unset': {'questions': '', 'recordings': ''}}
+        ))
+        stats['assessments'] += 1
+
+        if dry_run:
+            for ops in bucket_ops.values():
+                ops.clear()
+            assessment_ops.clear()
+        elif len(assessment_ops) >= batch_size:
+            flush()
+
+    if not dry_run:
+        flush()
+    logger.info(f"Bucket migration: {stats['assessments']} assessments, {stats['questions']} questions and "
+                f"{stats['recordings']} recordings moved into {stats['buckets']} buckets")
+    return stats
+
+
+def _sample_recording(words):
+    text = ' '.join(['roger'] * words)
+    return {
+        'id': ObjectId(), 'file_path': f'/uploads/audio/{uuid.uuid4()}.webm', 'file_name': 'recording.webm',
+        'duration': 60.0, 'transcript': text,
+        'transcript_segments': [{'start': 0.0, 'end': 60.0, 'text': text}],
+        'quality_metrics': {'rms': 0.1}, 'created_at': datetime.utcnow()
+    }
+
+
+def _elapsed_ms(operation, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def benchmark(counts=(10, 50, 100, 250, 500), transcript_words=300, repeat=5):
+    """
+    Compare embedded and bucketed recordings at growing recording counts.
+
+    For each count, an assessment with that many recordings is built in both
+    layouts in scratch collections (dropped afterwards). Measured per layout:
+    adding one more recording (the embedded layout rewrites the array as
+    ``save()`` did, the bucketed layout pushes), loading the assessment as a
+    list view does, and loading every recording.
+
+    Args:
+        counts: Recording counts to measure at
+        transcript_words: Transcript length of each sample recording
+        repeat: Timed repetitions per measurement
+
+    Returns:
+        list: One dict per count with timings in milliseconds and the
+        assessment document size in bytes for both layouts
+    """
+    from ..models import get_model
+
+    RecordingBucket = get_model('RecordingBucket')
+    database = get_model('Assessment')._get_collection().database
+    suffix = uuid.uuid4().hex[:8]
+    embedded = database[f'bench_embedded_{suffix}']
+    summaries = database[f'bench_summary_{suffix}']
+    buckets = database[f'bench_buckets_{suffix}']
+    buckets.create_index([('assessment_id', 1), ('count', 1)])
+
+    report = []
+    try:
+        for count in counts:
+            recordings = [_sample_recording(transcript_words) for _ in range(count)]
+            assessment_id = ObjectId()
+
+            embedded.insert_one({'_id': assessment_id, 'title': 'Benchmark', 'recordings': recordings})
+            summaries.insert_one({'_id': assessment_id, 'title': 'Benchmark', 'recording_count': count})
+            for start in range(0, count, RecordingBucket.BUCKET_SIZE):
+                chunk = recordings[start:start + RecordingBucket.BUCKET_SIZE]
+                buckets.insert_one({'assessment_id': assessment_id, 'count': len(chunk), 'recordings': chunk})
+
+            def embedded_save():
+                # What save() sent after recordings.append(): the whole array
+                embedded.update_one({'_id': assessment_id},
+                                    {'$set': {'recordings': recordings + [_sample_recording(transcript_words)]}})
+
+            def bucket_append():
+                buckets.update_one({'assessment_id': assessment_id, 'count': {'$lt': RecordingBucket.BUCKET_SIZE}},
+                                   {'$push': {'recordings': _sample_recording(transcript_words)},
+                                    '$inc': {'count': 1}}, upsert=True)
+                summaries.update_one({'_id': assessment_id}, {'$inc': {'recording_count': 1}})
+
+            def bucket_load():
+                return [r for b in buckets.find({'assessment_id': assessment_id}).sort('_id', 1)
+                        for r in b['recordings']]
+
+            report.append({
+                'recordings': count,
+                'embedded_save_ms': _elapsed_ms(embedded_save, repeat),
+                'bucket_append_ms': _elapsed_ms(bucket_append, repeat),
+                'embedded_load_ms': _elapsed_ms(lambda: embedded.find_one({'_id': assessment_id}), repeat),
+                'summary_load_ms': _elapsed_ms(lambda: summaries.find_one({'_id': assessment_id}), repeat),
+                'bucket_load_ms': _elapsed_ms(bucket_load, repeat),
+                'embedded_bytes': len(bson.encode(embedded.find_one({'_id': assessment_id}))),
+                'summary_bytes': len(bson.encode(summaries.find_one({'_id': assessment_id})))
+            })
+    finally:
+        for collection in (embedded, summaries, buckets):
+            collection.drop()
+    return report
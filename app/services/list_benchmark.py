@@ -0,0 +1,72 @@
+"""
+List Query Benchmark
+
+Measures how many rows per second a list page can read in each query mode:
+full MongoEngine documents (``User.__init__`` and ``Assessment.__init__``
+connect a ``post_init`` handler per instance), documents projected with
+``.only()``, raw ``as_pymongo()`` dicts, and :meth:`BaseQuerySet.fast` rows
+and dicts.
+
+Run it with ``python manage.py benchmark_list_queries``.
+"""
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields each list page reads, as in the admin templates
+LIST_FIELDS = {
+    'User': ('user_id', 'name', 'email', 'status', 'last_login', 'created_at'),
+    'Assessment': ('title', 'status', 'overall_score', 'icao_level', 'question_count', 'created_at'),
+    'Notification': ('title', 'message', 'is_read', 'priority', 'created_at')
+}
+
+
+def _rows_per_second(make_query, repeat):
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows += len(list(make_query()))
+    elapsed = time.perf_counter() - started
+    return rows / elapsed if elapsed else float('inf'), rows // repeat
+
+
+def benchmark(models=None, limit=500, repeat=5):
+    """
+    Compare read throughput of the query modes on existing data.
+
+    Args:
+        models: Model names (default: those in ``LIST_FIELDS``)
+        limit: Rows read per query
+        repeat: Queries per mode
+
+    Returns:
+        dict: Model name -> ``rows`` read per query and rows/sec per mode,
+        plus ``speedup`` of fast rows over full documents
+    """
+    from ..models import get_model
+
+    report = {}
+    for name in models or list(LIST_FIELDS):
+        model = get_model(name)
+        fields = LIST_FIELDS.get(name, ())
+        query = model.objects.order_by('-created_at').limit(limit)
+        modes = {
+            'documents': lambda: query.clone(),
+            'documents_only': lambda: query.only(*fields),
+            'as_pymongo': lambda: query.only(*fields).as_pymongo(),
+            'fast_rows': lambda: query.fast(*fields),
+            'fast_dicts': lambda: query.fast(*fields, as_dict=True)
+        }
+
+        result = {}
+        for mode, make_query in modes.items():
+            try:
+                result[mode], result['rows'] = _rows_per_second(make_query, repeat)
+            except Exception as e:
+                logger.warning(f"Benchmark of {name} {mode} failed: {str(e)}")
+                result[mode] = None
+        if result.get('documents') and result.get('fast_rows'):
+            result['speedup'] = result['fast_rows'] / result['documents']
+        report[name] = result
+    return report
@@ -0,0 +1,360 @@
+"""
+Live Recording Upload
+
+A chunked, resumable upload protocol for answers that are still being
+recorded. The browser opens an upload, then sends each ``MediaRecorder``
+chunk as it is produced:
+
+1. ``POST /api/recording-uploads`` opens an upload and returns its id
+2. ``PUT /api/recording-uploads/<id>/chunks/<chunk_id>`` with an
+   ``Upload-Offset`` header appends the request body at that byte offset
+3. ``GET /api/recording-uploads/<id>`` returns the current offset, so an
+   interrupted client can resume from where the server stopped
+4. ``POST /api/recording-uploads/<id>/complete`` closes the upload
+
+Chunks are appended to the file on disk by offset. A chunk whose id was
+already accepted is acknowledged without being written again, so retries
+are safe; a chunk at the wrong offset is refused with the current one.
+
+After every chunk a background thread decodes what has arrived so far and
+transcribes the speech segments that are already complete (followed by a
+pause). When the upload is closed only the final segment is left, so the
+transcript is ready almost as soon as the candidate stops speaking. The
+finished recording is then queued for the usual background analysis, which
+reuses the live transcript instead of transcribing again.
+"""
+import os
+import re
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Client chunk ids are used as document keys
+CHUNK_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Longest pause within one speech segment, as in ``speech_segments``
+_MAX_GAP_SECONDS = 0.5
+
+# Extra audio required after a segment before it is treated as complete
+_TAIL_GUARD_SECONDS = 0.25
+
+# Audio decoded before ``transcribed_until``, so a pause there is still seen as one
+_DECODE_MARGIN_SECONDS = 1.0
+
+
+class UploadConflict(ValueError):
+    """Raised when a chunk does not start at the upload's current offset."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def _get_upload_model():
+    from ..models import get_model
+    return get_model('AudioUpload')
+
+
+def create_upload(file_name='recording.webm', file_type=None, assessment_id=None, question_id=None,
+                  user_id=None, language='en-US'):
+    """
+    Open a chunked upload backed by an empty file.
+
+    Args:
+        file_name: Original file name (its extension tells the decoder the container)
+        file_type: MIME type reported by the browser
+        assessment_id: Assessment the finished recording belongs to, if any
+        question_id: Question the recording answers, if any
+        user_id: Uploading user
+        language: Language code for transcription
+
+    Returns:
+        The created AudioUpload
+    """
+    from flask import current_app
+    from werkzeug.utils import secure_filename
+
+    AudioUpload = _get_upload_model()
+    file_name = secure_filename(file_name or '') or 'recording.webm'
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], 'audio', f"{uuid.uuid4()}_{file_name}")
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    open(filepath, 'wb').close()
+
+    upload = AudioUpload(
+        assessment_id=str(assessment_id) if assessment_id else None,
+        question_id=str(question_id) if question_id else None,
+        user_id=str(user_id) if user_id else None,
+        file_path=filepath,
+        file_name=file_name,
+        file_type=file_type,
+        language=language
+    )
+    upload.save()
+    return upload
+
+
+def append_chunk(upload, chunk_id, offset, data):
+    """
+    Append one chunk at ``offset``.
+
+    Args:
+        upload: An open AudioUpload
+        chunk_id: Client-chosen id, unique within the upload
+        offset: Byte offset the chunk starts at
+        data: Chunk bytes
+
+    Returns:
+        tuple: (upload, duplicate) -- the updated upload, and True if the
+        chunk had already been accepted and nothing was written
+
+    Raises:
+        ValueError: If the chunk id is invalid, the chunk is empty or the
+            upload would exceed ``MAX_CONTENT_LENGTH``
+        UploadConflict: If the upload is closed, or ``offset`` is not its
+            current end and the chunk id is unknown
+    """
+    from flask import current_app
+
+    if not CHUNK_ID_PATTERN.match(chunk_id or ''):
+        raise ValueError('Invalid chunk id')
+    if not data:
+        raise ValueError('Empty chunk')
+    max_size = current_app.config.get('MAX_CONTENT_LENGTH')
+    if max_size and offset + len(data) > max_size:
+        raise ValueError('Recording is too large')
+
+    # A retried chunk is acknowledged, not written twice
+    if chunk_id in (upload.chunks or {}):
+        if upload.chunks[chunk_id] != [offset, len(data)]:
+            raise UploadConflict(f'Chunk {chunk_id} was already uploaded at a different offset', upload.size)
+        return upload, True
+
+    reserved = upload.append_chunk(chunk_id, offset, len(data))
+    if reserved is None:
+        upload.reload()
+        if chunk_id in (upload.chunks or {}):
+            # A concurrent retry of the same chunk won the reservation
+            return upload, True
+        if upload.status != upload.STATUS_OPEN:
+            raise UploadConflict(f'Upload is {upload.status}', upload.size)
+        raise UploadConflict(f'Expected offset {upload.size}', upload.size)
+
+    try:
+        # Position-addressed write: chunks land at their offset whatever the arrival order
+        with open(reserved.file_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+    except OSError as e:
+        logger.error(f"Error writing chunk {chunk_id} of upload {reserved.id}: {str(e)}")
+        reserved.update(set__status=reserved.STATUS_FAILED, set__error='Could not write chunk')
+        raise
+
+    return reserved, False
+
+
+def transcribe_completed(upload, final=False):
+    """
+    Transcribe the speech segments of an upload that are not transcribed yet.
+
+    Only segments followed by a pause are complete while the candidate is
+    still speaking; with ``final`` every remaining segment is transcribed.
+    A segment the recognizer fails on ends the pass: ``transcribed_until``
+    stops at its start, so the next pass retries it.
+
+    Each pass decodes and segments only the audio from shortly before
+    ``transcribed_until``, so its cost follows the new audio rather than
+    the length of the whole recording.
+
+    Args:
+        upload: An AudioUpload
+        final: The upload is closed and no more audio will arrive
+
+    Returns:
+        int: Number of segments added, or None if a segment could not be
+        transcribed
+    """
+    from flask import current_app
+    from ..utils.audio_processing import AudioAnalysisPipeline
+    from ..utils.transcribers import get_transcriber
+
+    for _ in range(3):
+        if not upload.size:
+            return 0
+        offset = max(0.0, (upload.transcribed_until or 0.0) - _DECODE_MARGIN_SECONDS)
+        pipeline = AudioAnalysisPipeline(upload.file_path, offset=offset,
+                                         sample_rate=current_app.config.get('AUDIO_ANALYSIS_SAMPLE_RATE', 16000))
+        try:
+            pipeline.load()
+        except Exception as e:
+            # A container cut mid-frame may not decode yet; the next chunk will
+            logger.debug(f"Upload {upload.id} not decodable yet: {str(e)}")
+            return None if final else 0
+
+        # Sample indices are relative to the decoded part; ``base`` is its start
+        rate = pipeline.sample_rate
+        base = int(round(offset * rate))
+        done = max(0, int(upload.transcribed_until * rate) - base)
+        horizon = pipeline.num_samples if final else \
+            pipeline.num_samples - int((_MAX_GAP_SECONDS + _TAIL_GUARD_SECONDS) * rate)
+
+        # Boundaries can shift slightly as audio arrives: clip rather than skip
+        bounds = [(max(start, done), end)
+                  for start, end in pipeline.speech_segments(max_gap=_MAX_GAP_SECONDS)
+                  if end > done and end <= horizon]
+        if not bounds:
+            if final and horizon > done:
+                upload.add_segments([], (base + horizon) / rate)
+            return 0
+
+        transcriber = get_transcriber()
+        segments = []
+        until, failed = bounds[-1][1], False
+        for start, end in bounds:
+            try:
+                text = pipeline.transcribe(upload.language or 'en-US', start, end, transcriber=transcriber,
+                                           raise_errors=True)
+            except Exception:
+                until, failed = start, True
+                break
+            if text:
+                segments.append({'start': round((base + start) / rate, 3), 'end': round((base + end) / rate, 3),
+                                 'text': text})
+
+        if upload.add_segments(segments, (base + until) / rate):
+            return None if failed else len(segments)
+        # Another pass got there first; start again from where it stopped
+        upload.reload()
+    return 0
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_running = set()
+_rerun = set()
+
+
+def _transcribe_in_background(app, upload_id):
+    with app.app_context():
+        AudioUpload = _get_upload_model()
+        while True:
+            try:
+                upload = AudioUpload.objects(id=upload_id, status=AudioUpload.STATUS_OPEN).first()
+                if upload is not None:
+                    transcribe_completed(upload)
+            except Exception as e:
+                logger.error(f"Live transcription of upload {upload_id} failed: {str(e)}")
+            with _executor_lock:
+                # Chunks that arrived during the pass get one more pass
+                if upload_id not in _rerun:
+                    _running.discard(upload_id)
+                    return
+                _rerun.discard(upload_id)
+
+
+def schedule_transcription(upload):
+    """
+    Transcribe newly completed segments of ``upload`` in a background thread.
+
+    At most one pass per upload runs at a time; requests made while a pass is
+    running are coalesced into a single follow-up pass.
+    """
+    global _executor
+    from flask import current_app
+
+    if not current_app.config.get('LIVE_TRANSCRIPTION_ENABLED', True):
+        return
+
+    upload_id = str(upload.id)
+    with _executor_lock:
+        if upload_id in _running:
+            _rerun.add(upload_id)
+            return
+        _running.add(upload_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=current_app.config.get('LIVE_TRANSCRIPTION_WORKERS', 2),
+                                           thread_name_prefix='live-transcription')
+    _executor.submit(_transcribe_in_background, current_app._get_current_object(), upload_id)
+
+
+def complete_upload(upload, size=None):
+    """
+    Close an upload, finish its transcript and queue the recording.
+
+    Completing an already completed upload returns it unchanged.
+
+    Args:
+        upload: An AudioUpload
+        size: Total bytes the client sent, checked against the upload
+
+    Returns:
+        The completed AudioUpload
+
+    Raises:
+        UploadConflict: If ``size`` does not match or the upload failed
+    """
+    from ..models import get_model
+    from ..utils.audio_probe import probe_audio
+    from .audio_queue import enqueue_recording
+    Assessment = get_model('Assessment')
+    AudioRecording = get_model('AudioRecording')
+    TranscriptSegment = get_model('TranscriptSegment')
+
+    if upload.status == upload.STATUS_COMPLETE:
+        return upload
+    if size is not None and size != upload.size:
+        raise UploadConflict(f'Expected {upload.size} bytes, got {size}', upload.size)
+
+    # Claim completion so concurrent requests finalize once
+    AudioUpload = type(upload)
+    claimed = AudioUpload.objects(id=upload.id, status=AudioUpload.STATUS_OPEN, size=upload.size).modify(
+        set__status=AudioUpload.STATUS_COMPLETE,
+        set__completed_at=datetime.utcnow(),
+        new=True
+    )
+    if claimed is None:
+        upload.reload()
+        if upload.status == upload.STATUS_COMPLETE:
+            return upload
+        raise UploadConflict(f'Upload is {upload.status}', upload.size)
+    upload = claimed
+
+    # Only the last segment is usually left by now
+    transcribed = transcribe_completed(upload, final=True) is not None
+    upload.reload()
+
+    if not upload.assessment_id:
+        return upload
+
+    assessment = Assessment.objects(id=upload.assessment_id).first()
+    if assessment is None:
+        return upload
+
+    info = probe_audio(upload.file_path) or {}
+    recording = AudioRecording(
+        file_path=upload.file_path,
+        file_name=upload.file_name,
+        file_type=upload.file_type,
+        file_size=upload.size,
+        duration=info.get('duration') or upload.transcribed_until or 0.0,
+        sample_rate=info.get('sample_rate'),
+        channels=info.get('channels') or 1,
+        transcript=upload.transcript,
+        transcript_segments=[TranscriptSegment(**segment) for segment in upload.segments],
+        language=upload.language,
+        is_processed=False
+    )
+
+    assessment.append_recording(recording)
+    if assessment.get_question(upload.question_id) is not None:
+        assessment.link_recording(upload.question_id, recording.id)
+
+    # A transcript with a gap is not reused: the worker transcribes the whole file
+    job = enqueue_recording(assessment.id, recording.id, upload.file_path, language=upload.language,
+                            transcript_segments=upload.segments if transcribed else None)
+    upload.update(set__recording_id=str(recording.id), set__job_id=str(job.id))
+    upload.reload()
+    return upload
@@ -0,0 +1,190 @@
+"""
+Transcript Chunking
+
+Splits a long assessment transcript into chunks that fit a prompt token
+budget so it can be scored map-reduce style: every chunk is rated on its own
+(concurrently, with the batch evaluation schema) and the chunk ratings are
+reduced into the six ICAO criterion scores.
+
+Chunks follow the structure of the session. Each recording is labelled with
+the stage of the question it answers (``picture_description``, ``scenario``,
+...). Consecutive recordings of the same stage share a chunk while they fit.
+A recording longer than the budget is split at sentence boundaries.
+
+The reduce step, :func:`aggregate_scores`, is a pure function: each
+criterion is the mean of the chunk scores weighted by chunk token count,
+rounded half up to one decimal. The same chunk ratings always give the same
+result, and it can be tested without the API.
+"""
+import re
+import math
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Chunk = namedtuple('Chunk', ['stage', 'text', 'tokens'])
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def recording_segments(doc):
+    """
+    Label each transcribed recording of an assessment with its stage.
+
+    Args:
+        doc: Raw ``recordings`` and ``questions`` of one assessment
+
+    Returns:
+        list: (stage, transcript) tuples in recording order
+    """
+    stages = {q.get('audio_recording'): q.get('question_type')
+              for q in doc.get('questions') or [] if q.get('audio_recording')}
+    segments = []
+    for index, recording in enumerate(doc.get('recordings') or []):
+        if not recording.get('transcript'):
+            continue
+        stage = stages.get(str(recording.get('id'))) or stages.get(recording.get('file_name'))
+        segments.append((stage or f'recording {index + 1}', recording['transcript']))
+    return segments
+
+
+def _split_text(text, token_budget, model):
+    """Split one over-long transcript into pieces of at most ``token_budget`` tokens."""
+    from utils.tokens import count_tokens, truncate_tokens
+
+    pieces, current = [], ''
+    for sentence in _SENTENCE_END.split(text.strip()):
+        candidate = f'{current} {sentence}'.strip()
+        if count_tokens(candidate, model) <= token_budget:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        # A single sentence over the budget is cut at token boundaries
+        while count_tokens(sentence, model) > token_budget:
+            head = truncate_tokens(sentence, token_budget, model)
+            pieces.append(head)
+            sentence = sentence[len(head):].strip()
+        current = sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_segments(segments, token_budget, model='gpt-4'):
+    """
+    Group (stage, transcript) segments into chunks within a token budget.
+
+    Args:
+        segments: (stage, transcript) tuples in session order
+        token_budget: Maximum tokens of chunk text
+        model: Model whose tokenizer to count with
+
+    Returns:
+        list: :class:`Chunk` tuples in session order
+    """
+    from utils.tokens import count_tokens
+
+    chunks = []
+    for stage, text in segments:
+        for piece in _split_text(text, token_budget, model):
+            tokens = count_tokens(piece, model)
+            last = chunks[-1] if chunks else None
+            if last and last.stage == stage:
+                merged = f'{last.text}\n\n{piece}'
+                merged_tokens = count_tokens(merged, model)
+                if merged_tokens <= token_budget:
+                    chunks[-1] = Chunk(stage, merged, merged_tokens)
+                    continue
+            chunks.append(Chunk(stage, piece, tokens))
+    return chunks
+
+
+def _round_half_up(value, digits=1):
+    factor = 10 ** digits
+    return math.floor(value * factor + 0.5) / factor
+
+
+def aggregate_scores(chunk_scores):
+    """
+    Reduce per-chunk ratings to one score per criterion.
+
+    Each criterion is the token-weighted mean of the chunk scores, rounded
+    half up to one decimal. Chunks that could not be rated are left out.
+
+    Args:
+        chunk_scores: (tokens, {criterion: score}) tuples, in session order
+
+    Returns:
+        dict: criterion -> score, or None if no chunk was rated
+    """
+    from .batch_evaluation import CRITERIA
+
+    rated = [(max(tokens, 1), scores) for tokens, scores in chunk_scores if scores]
+    if not rated:
+        return None
+    total = sum(weight for weight, _ in rated)
+    return {
+        name: _round_half_up(sum(weight * scores[name] for weight, scores in rated) / total)
+        for name in CRITERIA
+    }
+
+
+def chunk_items(item_id, chunks):
+    """
+    Turn one assessment's chunks into single-candidate batch items.
+
+    Returns:
+        list: (chunk id, labelled text) tuples; chunk ids are ``<item_id>.<n>``
+    """
+    return [
+        (f'{item_id}.{n}', f'[Part {n + 1} of {len(chunks)}, stage: {chunk.stage}]\n{chunk.text}')
+        for n, chunk in enumerate(chunks)
+    ]
+
+
+async def score_chunked(items, model, concurrency, token_budget):
+    """
+    Map-reduce score assessments too long for one request.
+
+    All chunks of all assessments are rated concurrently, then each
+    assessment's chunk ratings are reduced with :func:`aggregate_scores`.
+
+    Args:
+        items: (id, segments) tuples
+        model: Chat model
+        concurrency: Maximum requests in flight
+        token_budget: Maximum prompt tokens per request
+
+    Returns:
+        tuple: (scores, errors, requests) -- ``{id: {criterion: score}}``,
+        ``{id: message}`` and the number of requests made
+    """
+    from .batch_evaluation import rate_batches, prompt_capacity
+
+    # Leave room for the part/stage label and candidate header
+    capacity = max(prompt_capacity(token_budget, model) - 32, 1)
+    chunked = {item_id: chunk_segments(segments, capacity, model) for item_id, segments in items}
+
+    batches = [[entry] for item_id, chunks in chunked.items() for entry in chunk_items(item_id, chunks)]
+    chunk_results, chunk_errors = {}, {}
+    for batch_scores, batch_errors in await rate_batches(batches, model, concurrency):
+        chunk_results.update(batch_scores)
+        chunk_errors.update(batch_errors)
+
+    scores, errors = {}, {}
+    for item_id, chunks in chunked.items():
+        ratings = [(chunk.tokens, chunk_results.get(f'{item_id}.{n}')) for n, chunk in enumerate(chunks)]
+        failed = [chunk_id for chunk_id, _ in chunk_items(item_id, chunks) if chunk_id not in chunk_results]
+        # Scoring part of a session would silently change the result, so all chunks must be rated
+        if failed:
+            errors[item_id] = (f"{len(failed)} of {len(chunks)} chunks could not be rated: "
+                               f"{chunk_errors.get(failed[0], 'no result')}")
+            continue
+        aggregated = aggregate_scores(ratings)
+        if aggregated is None:
+            errors[item_id] = 'Empty transcript'
+        else:
+            scores[item_id] = aggregated
+    return scores, errors, len(batches)
@@ -0,0 +1,71 @@
+"""
+Test configuration
+
+Run the suite from the project root with ``python -m pytest app/tests``.
+Tests that need the application use the ``app`` fixture, which runs it on an
+in-memory mongomock database.
+"""
+import uuid
+
+import mongomock
+import pytest
+
+# Blueprint of development-only test routes, not a test module
+collect_ignore = ['test_email.py']
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The application in testing mode, with uploads under a temporary folder."""
+    import config
+    config.TestingConfig.MONGODB_SETTINGS = {
+        'db': 'ep_simulator_test',
+        'host': 'mongodb://localhost',
+        'mongo_client_class': mongomock.MongoClient
+    }
+    from app import create_app
+
+    app = create_app('testing')
+    app.config.update(
+        UPLOAD_FOLDER=str(tmp_path_factory.mktemp('uploads')),
+        LIVE_TRANSCRIPTION_ENABLED=False,
+        # The test client carries no session identifier
+        SESSION_PROTECTION=None
+    )
+    return app
+
+
+@pytest.fixture
+def app_context(app):
+    """An application context for calling services directly (requests push their own)."""
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user with the given role names."""
+    from app.models import get_model
+    User = get_model('User')
+    Role = get_model('Role')
+
+    def make(*roles):
+        user = User(email=f'{uuid.uuid4().hex}@example.com', name='Test User', user_id=uuid.uuid4().hex,
+                    roles=[Role.objects.get(name=name) for name in roles])
+        user.set_password('password123')
+        user.save()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def client_for(app):
+    """A test client signed in as the given user."""
+    from flask_login import FlaskLoginClient
+
+    def client(user):
+        app.test_client_class = FlaskLoginClient
+        return app.test_client(user=user)
+
+    return client
@@ -0,0 +1,45 @@
+"""
+Tests for the cursor-paginated admin lists
+"""
+import re
+from html import unescape
+
+from flask import url_for
+
+
+def listed_emails(html, admin):
+    """The test users' emails on a rendered page, leaving out the signed-in admin in the header."""
+    return set(re.findall(r'[0-9a-f]{32}@example\.com', html)) - {admin.email}
+
+
+def page_links(html):
+    """The previous and next page URLs of a rendered list, None where disabled."""
+    links = {'&laquo;': None, '&raquo;': None}
+    for href, label in re.findall(r'<a class="page-link" href="([^"]+)">(&laquo;|&raquo;)</a>', html):
+        links[label] = unescape(href)
+    return links['&laquo;'], links['&raquo;']
+
+
+def test_user_list_pages_by_cursor(app, client_for, make_user):
+    admin = make_user('admin')
+    for _ in range(8):
+        make_user('candidate')
+    client = client_for(admin)
+    with app.test_request_context():
+        list_url = url_for('admin.users.list_users')
+
+    first = client.get(list_url).get_data(as_text=True)
+    prev_url, next_url = page_links(first)
+    assert prev_url is None
+    assert 'cursor=' in next_url
+    # Active users are shown as active
+    assert 'text-success' in first and 'text-danger' not in first
+
+    second = client.get(next_url).get_data(as_text=True)
+    prev_url, _ = page_links(second)
+    assert 'cursor=' in prev_url
+    first_emails, second_emails = listed_emails(first, admin), listed_emails(second, admin)
+    assert first_emails and second_emails
+    assert not first_emails & second_emails
+
+    assert listed_emails(client.get(prev_url).get_data(as_text=True), admin) == first_emails
@@ -0,0 +1,40 @@
+"""
+Tests for the background audio job queue
+"""
+from datetime import datetime, timedelta
+
+from app.models import get_model
+
+
+def stale_job(assessment, recording, attempts):
+    AudioProcessingJob = get_model('AudioProcessingJob')
+    job = AudioProcessingJob(assessment_id=str(assessment.id), recording_id=str(recording.id),
+                             file_path=recording.file_path, status=AudioProcessingJob.STATUS_RUNNING,
+                             attempts=attempts, worker='gone:1',
+                             heartbeat_at=datetime.utcnow() - timedelta(minutes=10))
+    job.save()
+    return job
+
+
+def test_stale_jobs_are_requeued_or_failed(app_context, make_user):
+    AudioProcessingJob = get_model('AudioProcessingJob')
+    assessment = get_model('Assessment')(title='Queue test', created_by=make_user('candidate'))
+    assessment.save()
+    retried = assessment.add_recording('/tmp/first.wav', 'first.wav', 10.0)
+    exhausted = assessment.add_recording('/tmp/second.wav', 'second.wav', 10.0)
+    requeued_job = stale_job(assessment, retried, attempts=1)
+    failed_job = stale_job(assessment, exhausted, attempts=3)
+
+    assert AudioProcessingJob.requeue_stale(60) == 1
+
+    requeued_job.reload()
+    assert requeued_job.status == AudioProcessingJob.STATUS_QUEUED
+    assert requeued_job.worker is None
+    failed_job.reload()
+    assert failed_job.status == AudioProcessingJob.STATUS_FAILED
+    assert failed_job.error == 'Worker stopped responding'
+    # The recording no longer looks like it is still being processed
+    recording = assessment.get_recording(exhausted.id)
+    assert recording.is_processed is False
+    assert recording.processing_error == 'Worker stopped responding'
+    assert assessment.get_recording(retried.id).processing_error is None
@@ -0,0 +1,49 @@
+"""
+Tests for segmented transcription and its cache
+"""
+import numpy as np
+import soundfile as sf
+
+from app.utils import audio_processing
+from app.utils.audio_cache import AudioCache
+from app.utils.transcribers import Transcriber
+
+
+class CountingTranscriber(Transcriber):
+    """Numbers the segments it transcribes, failing on the ``fail``-th call (0-based)."""
+
+    name = 'counting'
+    max_concurrency = 1
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.calls = 0
+
+    def transcribe(self, samples, sample_rate, language='en-US'):
+        self.calls += 1
+        if self.calls - 1 == self.fail:
+            raise RuntimeError('Recognizer unavailable')
+        return f'segment {self.calls}'
+
+
+def test_segments_with_failures_are_not_cached(tmp_path, monkeypatch):
+    rate = 16000
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(rate) / rate)
+    silence = np.zeros(rate)
+    path = str(tmp_path / 'answer.wav')
+    sf.write(path, np.concatenate([tone, silence, tone, silence, tone]).astype(np.float32), rate)
+    cache = AudioCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(audio_processing, 'get_audio_cache', lambda: cache)
+
+    monkeypatch.setattr(audio_processing, 'get_transcriber', lambda: CountingTranscriber(fail=1))
+    assert len(audio_processing.transcribe_audio_segments(path)) == 2
+
+    # The next run transcribes again instead of being served the gap
+    transcriber = CountingTranscriber()
+    monkeypatch.setattr(audio_processing, 'get_transcriber', lambda: transcriber)
+    assert [s['text'] for s in audio_processing.transcribe_audio_segments(path)] == \
+        ['segment 1', 'segment 2', 'segment 3']
+
+    # A complete list is cached
+    monkeypatch.setattr(audio_processing, 'get_transcriber', lambda: CountingTranscriber(fail=0))
+    assert len(audio_processing.transcribe_audio_segments(path)) == 3
@@ -0,0 +1,81 @@
+"""
+Tests for moving recordings of closed assessments to the archive tier
+"""
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from app.services import audio_tiering
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def add_recording(db, tmp_path, name):
+    """A closed assessment with one recording, its original and analysis files on disk."""
+    files = {}
+    for kind in ('file', 'analysis'):
+        path = tmp_path / f'{name}.{kind}.wav'
+        path.write_bytes(b'\0' * 1000)
+        files[kind] = str(path)
+    (tmp_path / f'{name}.ogg').write_bytes(b'\0' * 100)
+    assessment_id = db.assessments.insert_one({
+        'status': 'completed', 'completed_at': datetime.utcnow() - timedelta(days=60), 'recording_count': 1
+    }).inserted_id
+    db.recording_buckets.insert_one({'assessment_id': assessment_id, 'recordings': [
+        {'file_path': files['file'], 'analysis_path': files['analysis'], 'storage_tier': 'original'}
+    ]})
+    return files
+
+
+@pytest.fixture(autouse=True)
+def archive(monkeypatch):
+    monkeypatch.setattr(audio_tiering, '_verified_archive',
+                        lambda recording: recording['file_path'].replace('.file.wav', '.ogg'))
+
+
+def test_recordings_are_repointed_in_their_bucket(db, tmp_path):
+    files = add_recording(db, tmp_path, 'one')
+
+    stats = audio_tiering.tier_recordings(db.assessments, db.recording_buckets)
+
+    assert stats == {'tiered': 1, 'failed': 0, 'bytes_freed': 2000}
+    recording = db.recording_buckets.find_one()['recordings'][0]
+    assert recording['file_path'] == str(tmp_path / 'one.ogg')
+    assert recording['storage_tier'] == 'archive'
+    assert 'analysis_path' not in recording
+    assert not any((tmp_path / path).exists() for path in files.values())
+
+
+def test_files_are_kept_when_the_guard_does_not_match(db, tmp_path, monkeypatch):
+    kept = add_recording(db, tmp_path, 'moved')
+    removed = add_recording(db, tmp_path, 'tiered')
+    archive = audio_tiering._verified_archive
+
+    def verified_archive(recording):
+        # The recording is replaced while its archival copy is being made
+        if recording['file_path'] == kept['file']:
+            db.recording_buckets.update_one({'recordings.file_path': kept['file']},
+                                            {'$set': {'recordings.0.file_path': str(tmp_path / 'new.wav')}})
+        return archive(recording)
+
+    monkeypatch.setattr(audio_tiering, '_verified_archive', verified_archive)
+
+    stats = audio_tiering.tier_recordings(db.assessments, db.recording_buckets)
+
+    assert stats == {'tiered': 1, 'failed': 1, 'bytes_freed': 2000}
+    assert all((tmp_path / path).exists() for path in kept.values())
+    assert not any((tmp_path / path).exists() for path in removed.values())
+
+
+def test_dry_run_changes_nothing(db, tmp_path):
+    files = add_recording(db, tmp_path, 'one')
+
+    stats = audio_tiering.tier_recordings(db.assessments, db.recording_buckets, dry_run=True)
+
+    assert stats == {'tiered': 1, 'failed': 0, 'bytes_freed': 2000}
+    assert db.recording_buckets.find_one()['recordings'][0]['file_path'] == files['file']
+    assert all((tmp_path / path).exists() for path in files.values())
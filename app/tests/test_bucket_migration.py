@@ -0,0 +1,26 @@
+"""
+Tests for moving embedded questions and recordings into bucket collections
+"""
+from app.models import get_model
+from app.services.bucket_migration import migrate_assessments
+
+
+def test_interrupted_migration_does_not_duplicate_items(app_context):
+    Assessment = get_model('Assessment')
+    QuestionBucket = get_model('QuestionBucket')
+    collection = Assessment._get_collection()
+    # Old documents stored their questions without an id
+    questions = [{'text': f'Question {n}'} for n in range(3)]
+    assessment_id = collection.insert_one({'title': 'Embedded', 'questions': questions}).inserted_id
+
+    assert migrate_assessments()['questions'] == 3
+    # Interrupted after the buckets were written but before the arrays were removed
+    collection.update_one({'_id': assessment_id}, {'$set': {'questions': questions}})
+    stats = migrate_assessments()
+
+    assert stats['questions'] == 0
+    assert QuestionBucket.objects(assessment_id=assessment_id).count() == 1
+    stored = QuestionBucket._get_collection().find_one({'assessment_id': assessment_id})['questions']
+    assert [question['text'] for question in stored] == ['Question 0', 'Question 1', 'Question 2']
+    assert len({question['id'] for question in stored}) == 3
+    assert collection.find_one({'_id': assessment_id})['question_count'] == 3
@@ -0,0 +1,81 @@
+"""
+Tests for the structured evaluation reply validator
+"""
+import json
+
+import pytest
+
+from utils.evaluation_parser import (
+    CRITERIA, RECORDED_OUTPUTS, EvaluationParseError, fuzz, parse_evaluation
+)
+
+VALID = RECORDED_OUTPUTS[:4]
+
+# Malformed recorded replies and the error each must be rejected with
+MALFORMED = [
+    (RECORDED_OUTPUTS[4], 'not valid JSON'),
+    (RECORDED_OUTPUTS[5], 'pronunciation score is not an integer'),
+    (RECORDED_OUTPUTS[6], 'vocabulary score is out of range: 7'),
+    (RECORDED_OUTPUTS[7], 'structure is missing'),
+    (RECORDED_OUTPUTS[8], 'no JSON object')
+]
+
+
+def reply(**overrides):
+    criteria = {name: {'score': 4, 'justification': 'Consistent with level 4.'} for name in CRITERIA}
+    for name, result in overrides.items():
+        criteria[name] = result
+    return json.dumps({'criteria': criteria, 'summary': ' Operational. '})
+
+
+@pytest.mark.parametrize('text', VALID)
+def test_recorded_replies_are_accepted(text):
+    result = parse_evaluation(text, CRITERIA)
+    assert set(result['scores']) == set(CRITERIA)
+    assert all(result['justifications'].values())
+
+
+def test_recorded_scores_are_kept():
+    result = parse_evaluation(RECORDED_OUTPUTS[1], CRITERIA)
+    assert result['scores'] == dict(zip(CRITERIA, (3.0, 4.0, 3.0, 4.0, 4.0, 3.0)))
+    assert result['summary'] == 'Operational level overall.'
+
+
+@pytest.mark.parametrize('text, error', MALFORMED)
+def test_malformed_recorded_replies_are_rejected(text, error):
+    with pytest.raises(EvaluationParseError, match=error):
+        parse_evaluation(text, CRITERIA)
+
+
+def test_whole_number_floats_are_accepted():
+    result = parse_evaluation(reply(fluency={'score': 5.0, 'justification': 'Fluent.'}), CRITERIA)
+    assert result['scores']['fluency'] == 5.0
+    assert result['summary'] == 'Operational.'
+
+
+@pytest.mark.parametrize('result, error', [
+    ({'score': 4.5, 'justification': 'Between levels.'}, 'not an integer'),
+    ({'score': True, 'justification': 'Boolean.'}, 'not an integer'),
+    ({'score': 0, 'justification': 'Too low.'}, 'out of range'),
+    ({'score': 4, 'justification': '  '}, 'justification is missing'),
+    ({'score': 4, 'justification': 'Fine.', 'confidence': 0.9}, 'Unknown keys in fluency')
+])
+def test_invalid_criterion_results_are_rejected(result, error):
+    with pytest.raises(EvaluationParseError, match=error):
+        parse_evaluation(reply(fluency=result), CRITERIA)
+
+
+def test_unknown_criteria_and_keys_are_rejected():
+    with pytest.raises(EvaluationParseError, match='Unknown criteria: accent'):
+        parse_evaluation(reply(accent={'score': 4, 'justification': 'Mild.'}), CRITERIA)
+    with pytest.raises(EvaluationParseError, match='Unknown keys: level'):
+        parse_evaluation(json.dumps(dict(json.loads(reply()), level=4)), CRITERIA)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_fuzzed_recorded_outputs_parse_or_reject(seed):
+    counts = fuzz(list(RECORDED_OUTPUTS), iterations=3000, seed=seed)
+    assert counts['accepted'] + counts['rejected'] == 3000
+    # Mutations that miss the contract are still accepted; most are rejected
+    assert counts['accepted'] > 0
+    assert counts['rejected'] > counts['accepted']
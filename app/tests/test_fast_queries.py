@@ -0,0 +1,33 @@
+"""
+Tests for read-only fast() queries
+"""
+from app.models import get_model
+from app.models.base import Row
+
+
+def test_index_and_first_return_rows(app_context, make_user):
+    user = make_user('candidate')
+    users = get_model('User').objects(id=user.id)
+
+    row = users.fast('name', 'email').first()
+    assert isinstance(row, Row)
+    assert (row.id, row.name, row.email) == (user.id, user.name, user.email)
+    assert isinstance(users.fast('name')[0], Row)
+    assert users.fast('name', as_dict=True)[0] == {'id': user.id, 'name': user.name}
+
+
+def test_keyset_pages_rows_without_the_order_field(app_context, make_user):
+    User = get_model('User')
+    ids = {make_user('examiner').id for _ in range(5)}
+    users = User.objects(id__in=list(ids))
+
+    for fast in (users.fast('name'), users.fast('name', as_dict=True)):
+        seen = []
+        page = fast.keyset_paginate(per_page=2)
+        while True:
+            seen.extend(row['id'] if isinstance(row, dict) else row.id for row in page)
+            if not page.has_next:
+                break
+            page = fast.keyset_paginate(cursor=page.next_cursor, per_page=2)
+        assert len(seen) == 5
+        assert set(seen) == ids
@@ -0,0 +1,143 @@
+"""
+Tests for the async OpenAI client against the local stub server
+"""
+import json
+import time
+import asyncio
+import urllib.request
+
+import openai
+import pytest
+
+from utils.openai_client import AsyncOpenAIClient, CircuitBreaker, CircuitOpenError
+from utils.openai_stub import EVALUATION, serve
+
+CHAT = '/v1/chat/completions'
+MESSAGES = [{'role': 'user', 'content': 'Evaluate this answer.'}]
+
+
+@pytest.fixture
+def stub():
+    """Start stub servers on free ports; yields a factory taking ``serve()`` options."""
+    servers = []
+
+    def start(**options):
+        server, state = serve(port=0, **options)
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}/v1', state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(base_url, **options):
+    options.setdefault('backoff_base', 0.01)
+    options.setdefault('timeout', 5.0)
+    return AsyncOpenAIClient(api_key='test', base_url=base_url, **options)
+
+
+def stats(base_url):
+    with urllib.request.urlopen(f'{base_url}/stats') as response:
+        return json.load(response)
+
+
+def test_retries_then_succeeds(stub):
+    base_url, _ = stub(fail_first=2)
+    client = make_client(base_url, max_retries=3)
+
+    assert asyncio.run(client.chat(MESSAGES)) == EVALUATION
+    assert stats(base_url)[CHAT] == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_then_half_opens(stub):
+    base_url, state = stub(fail_first=100)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    client = make_client(base_url, max_retries=1, breaker=breaker)
+
+    async def scenario():
+        with pytest.raises(openai.InternalServerError):
+            await client.chat(MESSAGES)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # Rejected without reaching the server
+        with pytest.raises(CircuitOpenError):
+            await client.chat(MESSAGES, temperature=0.5)
+        assert stats(base_url)[CHAT] == 2
+
+        await asyncio.sleep(0.25)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        # A failed trial re-opens the circuit, so its retry is rejected
+        with pytest.raises(CircuitOpenError):
+            await client.chat(MESSAGES, temperature=0.6)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert stats(base_url)[CHAT] == 3
+
+        await asyncio.sleep(0.25)
+        state.fail_remaining = 0
+        assert await client.chat(MESSAGES, temperature=0.7) == EVALUATION
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_trial_without_outcome_is_released(stub, tmp_path):
+    base_url, _ = stub()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    client = make_client(base_url, breaker=breaker)
+
+    async def scenario():
+        # The trial fails before reaching the API, saying nothing about its health
+        with pytest.raises(FileNotFoundError):
+            await client.transcribe(str(tmp_path / 'missing.wav'))
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        # A cancelled trial
+        task = asyncio.ensure_future(client.chat(MESSAGES))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # A stream closed before its end
+        stream = client.stream_chat(MESSAGES)
+        await stream.__anext__()
+        await stream.aclose()
+
+        # The next call is let through as the trial and closes the circuit
+        assert await client.chat(MESSAGES) == EVALUATION
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_identical_prompts_are_coalesced(stub):
+    base_url, _ = stub(latency=0.2)
+    client = make_client(base_url)
+
+    async def scenario():
+        return await asyncio.gather(*(client.chat(MESSAGES) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [EVALUATION] * 5
+    assert stats(base_url)[CHAT] == 1
+    assert client.single_flight.coalesced == 4
+
+
+def test_semaphore_bounds_concurrent_calls(stub):
+    base_url, state = stub(latency=0.1)
+    client = make_client(base_url, max_concurrency=2)
+
+    async def scenario():
+        prompts = [[{'role': 'user', 'content': f'Evaluate answer {i}.'}] for i in range(6)]
+        return await asyncio.gather(*(client.chat(messages) for messages in prompts))
+
+    started = time.monotonic()
+    assert asyncio.run(scenario()) == [EVALUATION] * 6
+    assert stats(base_url)[CHAT] == 6
+    assert state.peak_in_flight == 2
+    # Three rounds of two requests
+    assert time.monotonic() - started >= 0.3
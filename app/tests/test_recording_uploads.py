@@ -0,0 +1,145 @@
+"""
+Tests for live recording uploads
+"""
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.models import get_model
+from app.services import live_upload
+
+
+@pytest.fixture
+def assessment(make_user):
+    """An assessment created by one candidate and assigned to another."""
+    Assessment = get_model('Assessment')
+    assessment = Assessment(title='Upload test', created_by=make_user('candidate'),
+                            assigned_to=make_user('candidate'))
+    assessment.save()
+    return assessment
+
+
+def open_upload(client, assessment_id):
+    return client.post('/api/recording-uploads', json={'assessmentId': str(assessment_id), 'questionId': 'q1'})
+
+
+@pytest.mark.parametrize('owner', ['created_by', 'assigned_to'])
+def test_candidate_opens_upload_for_own_assessment(client_for, assessment, owner):
+    user = getattr(assessment, owner).fetch()
+
+    response = open_upload(client_for(user), assessment.id)
+
+    assert response.status_code == 201
+    assert response.json['assessment_id'] == str(assessment.id)
+    assert get_model('AudioUpload').objects.get(id=response.json['id']).user_id == str(user.id)
+
+
+def test_other_candidate_is_refused(client_for, make_user, assessment):
+    response = open_upload(client_for(make_user('candidate')), assessment.id)
+
+    assert response.status_code == 403
+    assert response.json['success'] is False
+
+
+@pytest.mark.parametrize('role', ['admin', 'examiner'])
+def test_staff_open_uploads_for_any_assessment(client_for, make_user, assessment, role):
+    assert open_upload(client_for(make_user(role)), assessment.id).status_code == 201
+
+
+def test_unknown_assessment(client_for, make_user):
+    client = client_for(make_user('candidate'))
+    assert open_upload(client, '0' * 24).status_code == 404
+    assert open_upload(client, 'not-an-id').status_code == 404
+
+
+class FailingTranscriber:
+    """Transcribes every segment except the ``fail``-th one (0-based)."""
+
+    max_concurrency = 1
+
+    def __init__(self, fail):
+        self.fail = fail
+        self.calls = 0
+
+    def transcribe(self, samples, sample_rate, language='en-US'):
+        self.calls += 1
+        if self.calls - 1 == self.fail:
+            raise RuntimeError('Recognizer unavailable')
+        return f'segment {self.calls}'
+
+
+def write_speech(path, rate=16000):
+    """Three one-second tones separated by one second of silence."""
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(rate) / rate)
+    silence = np.zeros(rate)
+    sf.write(path, np.concatenate([tone, silence, tone, silence, tone]).astype(np.float32), rate)
+
+
+def test_failed_segment_is_retried_and_not_skipped(app_context, make_user, monkeypatch):
+    upload = live_upload.create_upload(file_name='answer.wav', user_id=make_user('candidate').id)
+    write_speech(upload.file_path)
+    upload.update(set__size=1)
+    upload.reload()
+    transcriber = FailingTranscriber(fail=1)
+    monkeypatch.setattr('app.utils.transcribers.get_transcriber', lambda: transcriber)
+
+    assert live_upload.transcribe_completed(upload, final=True) is None
+    upload.reload()
+    assert [segment['text'] for segment in upload.segments] == ['segment 1']
+    # Stops at the failed segment instead of moving past it
+    assert upload.transcribed_until == pytest.approx(2.0, abs=0.1)
+
+    assert live_upload.transcribe_completed(upload, final=True) == 2
+    upload.reload()
+    assert [segment['text'] for segment in upload.segments] == ['segment 1', 'segment 3', 'segment 4']
+
+
+@pytest.mark.parametrize('fail, reused', [(None, True), (1, False)])
+def test_only_complete_transcripts_are_handed_to_the_job(app_context, assessment, monkeypatch, fail, reused):
+    upload = live_upload.create_upload(file_name='answer.wav', assessment_id=assessment.id,
+                                       user_id=assessment.created_by.id)
+    write_speech(upload.file_path)
+    upload.update(set__size=1)
+    upload.reload()
+    monkeypatch.setattr('app.utils.transcribers.get_transcriber', lambda: FailingTranscriber(fail=fail))
+
+    upload = live_upload.complete_upload(upload)
+
+    job = get_model('AudioProcessingJob').objects.get(id=upload.job_id)
+    if reused:
+        assert [segment['text'] for segment in job.transcript_segments] == ['segment 1', 'segment 2', 'segment 3']
+    else:
+        # The worker transcribes the whole file instead of seeding a transcript with a gap
+        assert job.transcript_segments == []
+
+
+def test_each_pass_decodes_only_new_audio(app_context, make_user, monkeypatch):
+    from app.utils import audio_processing
+
+    rate = 16000
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(rate) / rate)
+    silence = np.zeros(rate)
+    upload = live_upload.create_upload(file_name='answer.wav', user_id=make_user('candidate').id)
+    upload.update(set__size=1)
+    upload.reload()
+    monkeypatch.setattr('app.utils.transcribers.get_transcriber', lambda: FailingTranscriber(fail=None))
+    offsets = []
+    decode_audio = audio_processing.decode_audio
+    monkeypatch.setattr(audio_processing, 'decode_audio',
+                        lambda *args, **kwargs: offsets.append(kwargs['offset']) or decode_audio(*args, **kwargs))
+
+    # The first answer has been spoken and followed by a pause
+    opening = [silence, silence, tone, silence, silence]
+    sf.write(upload.file_path, np.concatenate(opening).astype(np.float32), rate)
+    assert live_upload.transcribe_completed(upload) == 1
+    upload.reload()
+
+    sf.write(upload.file_path, np.concatenate(opening + [tone, silence, tone]).astype(np.float32), rate)
+    assert live_upload.transcribe_completed(upload, final=True) == 2
+    upload.reload()
+
+    assert offsets[0] == 0.0
+    # The second pass starts shortly before the end of the first answer
+    assert offsets[1] == pytest.approx(3.0 - live_upload._DECODE_MARGIN_SECONDS, abs=0.1)
+    # Times stay relative to the start of the recording
+    assert [round(segment['start']) for segment in upload.segments] == [2, 5, 7]
@@ -0,0 +1,99 @@
+"""
+Tests for map-reduce scoring of chunked transcripts
+"""
+import asyncio
+
+from app.services import batch_evaluation
+from app.services.batch_evaluation import CRITERIA
+from app.services.transcript_chunking import Chunk, aggregate_scores, chunk_segments, score_chunked
+from utils.tokens import count_tokens
+
+
+def uniform(score):
+    return {name: score for name in CRITERIA}
+
+
+def test_aggregate_is_token_weighted_mean():
+    scores = aggregate_scores([(100, uniform(3)), (300, uniform(5))])
+    assert scores == uniform(4.5)
+
+
+def test_aggregate_rounds_half_up():
+    # (3 * 4 + 1 * 5) / 4 = 4.25, which round() would make 4.2
+    assert aggregate_scores([(300, uniform(4)), (100, uniform(5))]) == uniform(4.3)
+    # 2.45 is stored just below 2.45 in binary, and is still rounded up
+    assert aggregate_scores([(1, uniform(2.45))]) == uniform(2.5)
+
+
+def test_aggregate_leaves_out_unrated_chunks():
+    assert aggregate_scores([(100, uniform(4)), (500, None), (100, {})]) == uniform(4.0)
+    assert aggregate_scores([(100, None)]) is None
+
+
+def test_aggregate_is_deterministic_per_criterion():
+    first = dict(uniform(4), fluency=3)
+    second = dict(uniform(5), fluency=3)
+    scores = aggregate_scores([(200, first), (200, second)])
+    assert scores['fluency'] == 3.0
+    assert scores['pronunciation'] == 4.5
+    assert aggregate_scores([(200, first), (200, second)]) == scores
+
+
+def test_chunks_split_at_sentences_within_budget():
+    sentences = [f'Tower, flight {n} requests a climb to flight level three five zero.' for n in range(12)]
+    budget = count_tokens(' '.join(sentences[:3])) + 1
+
+    chunks = chunk_segments([('scenario', ' '.join(sentences))], budget)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.stage == 'scenario'
+        assert chunk.tokens == count_tokens(chunk.text) <= budget
+        assert chunk.text.endswith('.')
+    assert ' '.join(chunk.text.replace('\n\n', ' ') for chunk in chunks) == ' '.join(sentences)
+
+
+def test_sentence_over_budget_is_cut_at_tokens():
+    sentence = ' '.join(['roger'] * 200) + '.'
+
+    chunks = chunk_segments([('interview', sentence)], 50)
+
+    assert all(chunk.tokens <= 50 for chunk in chunks)
+    # Cuts may fall inside a word; no text is lost
+    assert ''.join(''.join(chunk.text.split()) for chunk in chunks) == ''.join(sentence.split())
+
+
+def test_chunks_follow_stages():
+    segments = [('picture_description', 'I see an aircraft.'), ('picture_description', 'It is landing.'),
+                ('scenario', 'Mayday, mayday.')]
+
+    chunks = chunk_segments(segments, 100)
+
+    assert [chunk.stage for chunk in chunks] == ['picture_description', 'scenario']
+    assert chunks[0].text == 'I see an aircraft.\n\nIt is landing.'
+
+
+def test_every_chunk_must_be_rated(monkeypatch):
+    async def rate_batches(batches, model, concurrency):
+        results = []
+        for batch in batches:
+            chunk_id = batch[0][0]
+            if chunk_id == 'partial.1':
+                results.append(({}, {chunk_id: 'Invalid reply'}))
+            else:
+                results.append(({chunk_id: uniform(4)}, {}))
+        return results
+
+    monkeypatch.setattr(batch_evaluation, 'rate_batches', rate_batches)
+    monkeypatch.setattr('app.services.transcript_chunking.chunk_segments',
+                        lambda segments, capacity, model: [Chunk(stage, text, 10) for stage, text in segments])
+    items = [
+        ('complete', [('scenario', 'One.'), ('interview', 'Two.')]),
+        ('partial', [('scenario', 'One.'), ('interview', 'Two.'), ('scenario', 'Three.')])
+    ]
+
+    scores, errors, requests = asyncio.run(score_chunked(items, 'gpt-4', concurrency=2, token_budget=4000))
+
+    assert requests == 5
+    assert scores == {'complete': uniform(4.0)}
+    assert errors['partial'] == '1 of 3 chunks could not be rated: Invalid reply'
@@ -44,11 +44,18 @@ from .file_utils import (
 
 # Import audio processing utilities
 from .audio_processing import (
+    AudioAnalysisPipeline,
     process_audio_file,
     extract_audio_features,
     transcribe_audio,
+    transcribe_audio_segments,
     analyze_pronunciation
 )
+from .audio_cache import get_audio_cache
+from .transcribers import Transcriber, get_transcriber
+from .audio_probe import probe_audio
+from .wer import align_words, word_error_rate, score_batch
+from .feature_store import get_feature_store
 
 def format_date(value, format='%Y-%m-%d'):
     """Format a date to the given format.
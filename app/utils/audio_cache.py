@@ -0,0 +1,265 @@
+"""
+Audio Result Cache
+
+Content-addressed cache for audio analysis results. Entries are keyed by the
+SHA-256 of the audio bytes plus the analysis parameters, so re-uploads,
+retries and admin re-evaluations of the same recording are served without
+decoding the file or calling a remote recognizer.
+
+Entries are stored as small JSON files on disk. The cache is bounded by total
+size and evicts least-recently-used entries (by file mtime, refreshed on every
+hit).
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Read audio files in 1MB chunks when hashing
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    """Hash a file's bytes; memoized on (path, size, mtime) so one upload is read once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_digest(audio_path: str) -> str:
+    """
+    Get the SHA-256 hex digest of an audio file's bytes.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        str: Hex digest
+    """
+    stat = os.stat(audio_path)
+    return _file_digest(os.path.abspath(audio_path), stat.st_size, stat.st_mtime_ns)
+
+
+class AudioCache:
+    """
+    Size-bounded LRU cache of JSON-serializable results on disk.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, enabled: bool = True):
+        """
+        Args:
+            cache_dir: Directory holding the cache entries
+            max_bytes: Maximum total size of all entries
+            enabled: When False every lookup is a miss and nothing is stored
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(digest: str, namespace: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Combine an audio digest, a result namespace and analysis parameters into a key."""
+        payload = json.dumps({'ns': namespace, 'params': params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{digest}:{payload}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up an entry.
+
+        Args:
+            key: Cache key from :meth:`make_key`
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Refresh recency for LRU eviction
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store an entry, evicting old entries if the cache grows past its limit.
+
+        Args:
+            key: Cache key from :meth:`make_key`
+            value: JSON-serializable value
+        """
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps(value).encode('utf-8')
+
+            # Write atomically so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                if self._size is None:
+                    self._size = self._scan_size()
+                else:
+                    self._size += len(data)
+                over_limit = self._size > self.max_bytes
+
+            if over_limit:
+                self.evict()
+
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write audio cache entry: {str(e)}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       should_store: Callable[[Any], bool] = bool) -> Any:
+        """
+        Return a cached value or compute and store it.
+
+        Args:
+            key: Cache key from :meth:`make_key`
+            compute: Callable producing the value on a miss
+            should_store: Predicate deciding whether a computed value is cached
+                (by default empty results are not, so failures are retried)
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = compute()
+        if should_store(value):
+            self.set(key, value)
+        return value
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """
+        Delete least-recently-used entries until the cache is under its limit.
+
+        Args:
+            target_ratio: Fraction of ``max_bytes`` to shrink down to
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * target_ratio)
+            removed = 0
+
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+
+            self._size = total
+            return removed
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size_bytes': self._size if self._size is not None else self._scan_size(),
+                'max_bytes': self.max_bytes,
+                'enabled': self.enabled
+            }
+
+
+_caches: Dict[str, AudioCache] = {}
+
+
+def get_audio_cache() -> AudioCache:
+    """
+    Get the process-wide audio cache configured for the current app.
+
+    Falls back to the static ``Config`` values outside an application
+    context (e.g. in batch worker processes).
+
+    Returns:
+        AudioCache
+    """
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        config = current_app.config
+    else:
+        from config import Config
+        config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+    cache_dir = config.get('AUDIO_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'ep_audio_cache')
+    cache = _caches.get(cache_dir)
+    if cache is None:
+        cache = _caches[cache_dir] = AudioCache(
+            cache_dir,
+            max_bytes=config.get('AUDIO_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+            enabled=config.get('AUDIO_CACHE_ENABLED', True)
+        )
+    return cache
@@ -0,0 +1,177 @@
+"""
+Audio Preview Generation
+
+Precomputes what the review pages need to display a recording without
+downloading it: a downsampled waveform peak file and a small spectrogram
+image. Both are written next to the uploaded file at ingest time and served
+as immutable static assets.
+
+The peak file uses the audiowaveform ``.dat`` (version 1) layout, so it can be
+read directly by waveform-data.js / peaks.js: a 20-byte little-endian header
+(version, flags, sample rate, samples per pixel, length) followed by
+interleaved min/max pairs as int8 or int16.
+"""
+import os
+import struct
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Default number of peak buckets across the whole recording
+DEFAULT_BUCKETS = 1000
+
+# Spectrogram thumbnail size in pixels
+SPECTROGRAM_SIZE = (600, 160)
+
+_PEAKS_SUFFIX = '.peaks.dat'
+_SPECTROGRAM_SUFFIX = '.spectrogram.png'
+
+_DAT_VERSION = 1
+_DAT_FLAG_8BIT = 0x1
+
+
+def preview_paths(file_path: str) -> Tuple[str, str]:
+    """
+    Get the peak file and spectrogram paths cached next to an upload.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        tuple: (peaks_path, spectrogram_path)
+    """
+    return file_path + _PEAKS_SUFFIX, file_path + _SPECTROGRAM_SUFFIX
+
+
+def _is_fresh(path: str, source: str) -> bool:
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compute_peaks(samples: np.ndarray, buckets: int = DEFAULT_BUCKETS, bits: int = 8) -> np.ndarray:
+    """
+    Downsample audio to per-bucket minimum/maximum values.
+
+    Args:
+        samples: Mono samples, float in [-1, 1] or int16
+        buckets: Number of output buckets
+        bits: 8 or 16 bit output resolution
+
+    Returns:
+        Array of shape (buckets, 2) holding (min, max) pairs as int8/int16
+    """
+    dtype, scale = (np.int8, 127) if bits == 8 else (np.int16, 32767)
+    if len(samples) == 0:
+        return np.zeros((0, 2), dtype=dtype)
+
+    buckets = max(1, min(buckets, len(samples)))
+    samples_per_bucket = int(np.ceil(len(samples) / buckets))
+    buckets = int(np.ceil(len(samples) / samples_per_bucket))
+
+    # Pad by repeating the last sample so it never widens the final bucket
+    padded = np.empty(buckets * samples_per_bucket, dtype=samples.dtype)
+    padded[:len(samples)] = samples
+    padded[len(samples):] = samples[-1]
+    frames = padded.reshape(buckets, samples_per_bucket)
+
+    full_scale = 32768.0 if np.issubdtype(samples.dtype, np.integer) else 1.0
+    peaks = np.stack([frames.min(axis=1), frames.max(axis=1)], axis=1).astype(np.float32)
+    return np.clip(np.round(peaks / full_scale * scale), -scale, scale).astype(dtype)
+
+
+def encode_peaks(peaks: np.ndarray, sample_rate: int, samples_per_pixel: int) -> bytes:
+    """
+    Serialize peaks in the audiowaveform ``.dat`` format.
+
+    Args:
+        peaks: Array from :func:`compute_peaks`
+        sample_rate: Sample rate of the source audio
+        samples_per_pixel: Source samples per bucket
+
+    Returns:
+        The file contents
+    """
+    flags = _DAT_FLAG_8BIT if peaks.dtype == np.int8 else 0
+    header = struct.pack('<iIiiI', _DAT_VERSION, flags, int(sample_rate), int(samples_per_pixel), len(peaks))
+    return header + np.ascontiguousarray(peaks, dtype=peaks.dtype.newbyteorder('<')).tobytes()
+
+
+def render_spectrogram(mel: np.ndarray, path: str, size: Tuple[int, int] = SPECTROGRAM_SIZE) -> None:
+    """
+    Render a mel spectrogram to a small PNG.
+
+    Args:
+        mel: Mel power spectrogram (n_mels x frames)
+        path: Output PNG path
+        size: (width, height) in pixels
+    """
+    import librosa
+    from matplotlib import colormaps
+    from PIL import Image
+
+    db = librosa.power_to_db(mel, ref=np.max) if mel.size else np.zeros((1, 1))
+    # Map -80..0 dB to 0..1, low frequencies at the bottom
+    levels = np.clip((db + 80.0) / 80.0, 0.0, 1.0)[::-1]
+    rgb = (colormaps['magma'](levels)[..., :3] * 255).astype(np.uint8)
+
+    image = Image.fromarray(rgb, mode='RGB').resize(size, Image.BILINEAR)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, format='PNG', optimize=True)
+    os.replace(tmp_path, path)
+
+
+def generate_previews(pipeline, buckets: int = DEFAULT_BUCKETS, bits: int = 8,
+                      force: bool = False, file_path: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Write the waveform peaks and spectrogram for a recording next to its file.
+
+    Files that are already newer than the audio are kept, so the stage is
+    cheap to re-run.
+
+    Args:
+        pipeline: AudioAnalysisPipeline for the recording's file
+        buckets: Number of waveform buckets
+        bits: Peak resolution, 8 or 16
+        force: Regenerate even if up-to-date previews exist
+        file_path: Upload the previews belong to, when the pipeline decodes
+            a derived copy of it (default: the pipeline's own file)
+
+    Returns:
+        Dict with ``waveform_path`` and ``spectrogram_path`` (None for any
+        preview that could not be generated)
+    """
+    source = pipeline.audio_path
+    peaks_path, spectrogram_path = preview_paths(file_path or source)
+    result = {'waveform_path': None, 'spectrogram_path': None}
+
+    try:
+        if force or not _is_fresh(peaks_path, source):
+            # Work on the raw (possibly memory-mapped int16) buffer; no float copy needed
+            raw = pipeline.raw
+            peaks = compute_peaks(raw, buckets=buckets, bits=bits)
+            samples_per_pixel = int(np.ceil(len(raw) / len(peaks))) if len(peaks) else 0
+            _write_atomic(peaks_path, encode_peaks(peaks, pipeline.sample_rate, samples_per_pixel))
+        result['waveform_path'] = peaks_path
+    except Exception as e:
+        logger.error(f"Error generating waveform peaks for {source}: {str(e)}")
+
+    try:
+        if force or not _is_fresh(spectrogram_path, source):
+            render_spectrogram(pipeline.mel, spectrogram_path)
+        result['spectrogram_path'] = spectrogram_path
+    except Exception as e:
+        logger.error(f"Error rendering spectrogram for {source}: {str(e)}")
+
+    return result
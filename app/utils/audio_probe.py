@@ -0,0 +1,372 @@
+"""
+Audio Metadata Probe
+
+Reads duration, sample rate and channel count from audio container headers
+(WAV, MP3, OGG Vorbis/Opus, M4A and FLAC) without decoding any samples. Only
+a few kilobytes at the start (and, for OGG, the end) of the file are read,
+so probing is cheap enough to run on every upload and in listing views.
+"""
+import os
+import struct
+import logging
+from typing import BinaryIO, Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Bytes read from the tail of an OGG file to find the last page
+_OGG_TAIL_BYTES = 64 * 1024
+
+# MP3 frame header lookup tables, indexed by MPEG version (1, 2, 2.5)
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),   # MPEG 1
+    2: (22050, 24000, 16000),   # MPEG 2
+    0: (11025, 12000, 8000)     # MPEG 2.5
+}
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+
+# MP4 atoms that contain other atoms on the way to the audio sample entry
+_MP4_CONTAINERS = {b'moov', b'mdia', b'minf', b'stbl'}
+
+
+def _info(fmt: str, duration: Optional[float], sample_rate: Optional[int],
+          channels: Optional[int]) -> Dict[str, Any]:
+    return {
+        'format': fmt,
+        'duration': round(float(duration), 3) if duration is not None else None,
+        'sample_rate': int(sample_rate) if sample_rate else None,
+        'channels': int(channels) if channels else None
+    }
+
+
+def _skip_id3(f: BinaryIO) -> int:
+    """Seek past a leading ID3v2 tag and return the offset of the audio data."""
+    f.seek(0)
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        if header[5] & 0x10:
+            size += 10  # footer present
+        offset = 10 + size
+    else:
+        offset = 0
+    f.seek(offset)
+    return offset
+
+
+def parse_wav_header(header: bytes) -> Optional[Dict[str, int]]:
+    """
+    Locate the format and data chunks of a RIFF/WAVE byte string.
+
+    Args:
+        header: The file contents, or at least everything up to the data chunk
+
+    Returns:
+        Dict with ``format``, ``channels``, ``sample_rate``, ``block_align``,
+        ``bits``, ``data_offset`` and ``data_size`` (None when unknown, as in
+        a stream), or None if the bytes are not a WAV file
+    """
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    info = {}
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = int.from_bytes(header[offset + 4:offset + 8], 'little')
+        body = offset + 8
+
+        if chunk_id == b'fmt ':
+            fmt, channels, sample_rate, _, block_align, bits = struct.unpack_from('<HHIIHH', header, body)
+            if fmt == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The real format tag is the start of the sub-format GUID
+                fmt = int.from_bytes(header[body + 24:body + 26], 'little')
+            info.update(format=fmt, channels=channels, sample_rate=sample_rate,
+                        block_align=block_align, bits=bits)
+        elif chunk_id == b'data':
+            # Streamed WAVs (e.g. from an ffmpeg pipe) leave the size unset
+            unknown = chunk_size in (0, 0xFFFFFFFF)
+            info.update(data_offset=body, data_size=None if unknown else chunk_size)
+            return info if 'format' in info else None
+
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _probe_wav(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    f.seek(0)
+    info = parse_wav_header(f.read(64 * 1024))
+    if not info or not info['sample_rate'] or not info['block_align']:
+        return None
+
+    available = file_size - info['data_offset']
+    data_size = available if info['data_size'] is None else min(info['data_size'], available)
+    frames = data_size // info['block_align']
+    return _info('wav', frames / float(info['sample_rate']), info['sample_rate'], info['channels'])
+
+
+def _probe_flac(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    _skip_id3(f)
+    if f.read(4) != b'fLaC':
+        return None
+
+    # STREAMINFO is always the first metadata block
+    block_header = f.read(4)
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+        return None
+    streaminfo = f.read(34)
+    if len(streaminfo) < 18:
+        return None
+
+    packed = int.from_bytes(streaminfo[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / float(sample_rate) if sample_rate and total_samples else None
+    return _info('flac', duration, sample_rate, channels)
+
+
+def _probe_ogg(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    f.seek(0)
+    head = f.read(4096)
+    if head[:4] != b'OggS' or len(head) < 28:
+        return None
+
+    # The first page holds exactly one packet: the codec identification header
+    packet = head[27 + head[26]:]
+    if packet.startswith(b'\x01vorbis') and len(packet) >= 16:
+        codec = 'vorbis'
+        channels = packet[11]
+        sample_rate = struct.unpack_from('<I', packet, 12)[0]
+        pre_skip = 0
+        granule_rate = sample_rate
+    elif packet.startswith(b'OpusHead') and len(packet) >= 16:
+        codec = 'opus'
+        channels = packet[9]
+        pre_skip = struct.unpack_from('<H', packet, 10)[0]
+        sample_rate = struct.unpack_from('<I', packet, 12)[0] or 48000
+        # Opus granule positions always count 48 kHz samples
+        granule_rate = 48000
+    else:
+        return None
+
+    # The granule position of the last page is the total sample count
+    f.seek(max(0, file_size - _OGG_TAIL_BYTES))
+    tail = f.read(_OGG_TAIL_BYTES)
+    duration = None
+    index = tail.rfind(b'OggS')
+    while index != -1:
+        if index + 14 <= len(tail):
+            granule = struct.unpack_from('<q', tail, index + 6)[0]
+            if granule > 0:
+                duration = max(granule - pre_skip, 0) / float(granule_rate)
+                break
+        index = tail.rfind(b'OggS', 0, index)
+
+    info = _info('ogg', duration, sample_rate, channels)
+    info['codec'] = codec
+    return info
+
+
+def _parse_mp3_frame(header: bytes) -> Optional[Dict[str, int]]:
+    """Decode a 4-byte MPEG audio frame header."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x3
+    layer_bits = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    mpeg1 = version_bits == 3
+    bitrate = _MP3_BITRATES[(1 if mpeg1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (header[2] >> 1) & 0x1
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if (layer == 2 or mpeg1) else 576
+        frame_length = (samples_per_frame // 8) * bitrate // sample_rate + padding
+
+    return {
+        'mpeg1': mpeg1,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if (header[3] >> 6) == 3 else 2,
+        'samples_per_frame': samples_per_frame,
+        'frame_length': frame_length
+    }
+
+
+def _probe_mp3(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    start = _skip_id3(f)
+    data = f.read(64 * 1024)
+
+    # Find the first frame whose successor is where the header says it is
+    frame, offset = None, data.find(b'\xff')
+    while offset != -1 and offset + 4 <= len(data):
+        candidate = _parse_mp3_frame(data[offset:offset + 4])
+        if candidate:
+            following = offset + candidate['frame_length']
+            if following + 4 > len(data) or _parse_mp3_frame(data[following:following + 4]):
+                frame = candidate
+                break
+        offset = data.find(b'\xff', offset + 1)
+    if frame is None:
+        return None
+
+    # A Xing/Info or VBRI header in the first frame gives the exact frame count
+    frames = None
+    side_info = (32 if frame['channels'] == 2 else 17) if frame['mpeg1'] else (17 if frame['channels'] == 2 else 9)
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack_from('>I', data, xing + 4)[0]
+        if flags & 0x1:
+            frames = struct.unpack_from('>I', data, xing + 8)[0]
+    elif data[offset + 36:offset + 40] == b'VBRI':
+        frames = struct.unpack_from('>I', data, offset + 50)[0]
+
+    if frames:
+        duration = frames * frame['samples_per_frame'] / float(frame['sample_rate'])
+    else:
+        # Constant bitrate: estimate from the audio payload size
+        audio_bytes = file_size - start - offset
+        f.seek(max(0, file_size - 128))
+        if f.read(3) == b'TAG':
+            audio_bytes -= 128
+        duration = audio_bytes * 8 / float(frame['bitrate'])
+
+    return _info('mp3', duration, frame['sample_rate'], frame['channels'])
+
+
+def _iter_atoms(f: BinaryIO, start: int, end: int):
+    """Yield (type, body_offset, body_size) for the MP4 atoms in [start, end)."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield kind, offset + header_size, size - header_size
+        offset += size
+
+
+def _probe_m4a(f: BinaryIO, file_size: int) -> Optional[Dict[str, Any]]:
+    f.seek(0)
+    head = f.read(12)
+    if head[4:8] != b'ftyp':
+        return None
+
+    tracks, movie = [], {}
+
+    def walk(start, end, track):
+        for kind, body, size in _iter_atoms(f, start, end):
+            if kind == b'trak':
+                tracks.append({})
+                walk(body, body + size, tracks[-1])
+            elif kind in _MP4_CONTAINERS:
+                walk(body, body + size, track)
+            elif kind in (b'mvhd', b'mdhd'):
+                f.seek(body)
+                version = f.read(4)[0]
+                fields = f.read(28 if version == 1 else 16)
+                timescale, duration = (struct.unpack_from('>IQ', fields, 16) if version == 1
+                                       else struct.unpack_from('>II', fields, 8))
+                target = movie if kind == b'mvhd' else track
+                if timescale and target is not None:
+                    target.update(timescale=timescale, duration=duration / float(timescale))
+            elif track is None:
+                continue
+            elif kind == b'hdlr':
+                f.seek(body + 8)
+                track['is_audio'] = f.read(4) == b'soun'
+            elif kind == b'stsd':
+                # First sample entry; the AudioSampleEntry fields start 16 bytes in
+                f.seek(body + 8)
+                entry = f.read(36)
+                if len(entry) >= 36:
+                    track['codec'] = entry[4:8].decode('latin-1').strip()
+                    track['channels'] = struct.unpack_from('>H', entry, 24)[0]
+                    track['sample_rate'] = struct.unpack_from('>I', entry, 32)[0] >> 16
+
+    walk(0, file_size, None)
+    audio = next((track for track in tracks if track.get('is_audio')), None)
+    if audio is None:
+        return None
+
+    duration = audio.get('duration', movie.get('duration'))
+    sample_rate = audio.get('sample_rate') or audio.get('timescale')
+    info = _info('m4a', duration, sample_rate, audio.get('channels'))
+    if audio.get('codec'):
+        info['codec'] = audio['codec']
+    return info
+
+
+_PROBES: Dict[str, Callable[[BinaryIO, int], Optional[Dict[str, Any]]]] = {
+    'wav': _probe_wav,
+    'flac': _probe_flac,
+    'ogg': _probe_ogg,
+    'opus': _probe_ogg,
+    'm4a': _probe_m4a,
+    'mp4': _probe_m4a,
+    # Last, since frame sync detection is the least strict check
+    'mp3': _probe_mp3
+}
+
+
+def probe_audio(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read audio metadata from container headers without decoding samples.
+
+    The parser matching the file extension is tried first, then the others,
+    so misnamed uploads are still recognised.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        Dict with ``format``, ``duration`` (seconds), ``sample_rate`` and
+        ``channels`` (any of which may be None if the header omits it), or
+        None if the file is not a recognised audio container
+    """
+    extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+    probes = [_PROBES[extension]] if extension in _PROBES else []
+    probes += [probe for probe in dict.fromkeys(_PROBES.values()) if probe not in probes]
+
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            for probe in probes:
+                try:
+                    info = probe(f, file_size)
+                except (struct.error, IndexError, ValueError, ZeroDivisionError):
+                    info = None
+                if info:
+                    return info
+    except OSError as e:
+        logger.error(f"Error probing audio file {file_path}: {str(e)}")
+        return None
+
+    return None
@@ -2,50 +2,522 @@
 Audio Processing Utilities
 
 This module contains functions for processing audio files, including:
-- Transcribing speech to text
+- Transcribing speech to text (with the backend chosen in :mod:`.transcribers`)
 - Analyzing audio quality
 - Extracting features
+
+All analyses are derived from :class:`AudioAnalysisPipeline`, which decodes a
+recording once and shares the buffer and spectrogram between them. Decoding
+happens entirely in memory (:func:`decode_audio`); no temporary files are
+written.
 """
+import io
 import os
-import tempfile
+import wave
 import logging
-from pydub import AudioSegment
+import ffmpeg
+import soundfile as sf
 import speech_recognition as sr
 import librosa
 import numpy as np
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Dict, Any, BinaryIO, List, Optional, Tuple, Union
+
+from .audio_cache import get_audio_cache, audio_digest
+from .audio_probe import parse_wav_header
+from .transcribers import Transcriber, get_transcriber
+from .wer import align_words
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def convert_to_wav(audio_path: str) -> str:
+# Source accepted by the decoder: a path, raw bytes or a binary file object
+AudioSource = Union[str, bytes, BinaryIO]
+
+# PCM WAV files larger than this are memory-mapped instead of read into memory
+MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+
+
+def _pcm_from_wav_bytes(data: bytes) -> Tuple[np.ndarray, int]:
+    """Interpret in-memory WAV bytes as a mono sample array without copying PCM16."""
+    info = parse_wav_header(data)
+    if info is None:
+        raise ValueError("Not a WAV stream")
+    
+    end = len(data) if info['data_size'] is None else info['data_offset'] + info['data_size']
+    dtype = _wav_dtype(info)
+    if dtype is None:
+        raise ValueError(f"Unsupported WAV encoding (format {info['format']}, {info['bits']} bits)")
+    
+    itemsize = np.dtype(dtype).itemsize * info['channels']
+    end -= (end - info['data_offset']) % itemsize
+    samples = np.frombuffer(data, dtype=dtype, offset=info['data_offset'],
+                            count=(end - info['data_offset']) // np.dtype(dtype).itemsize)
+    if info['channels'] > 1:
+        samples = samples.reshape(-1, info['channels']).mean(axis=1, dtype=np.float32)
+    return samples, info['sample_rate']
+
+
+def _wav_dtype(info: Dict[str, int]) -> Optional[str]:
+    """Map a WAV format/bit depth to a little-endian NumPy dtype."""
+    if info['format'] == _WAVE_FORMAT_PCM and info['bits'] == 16:
+        return '<i2'
+    if info['format'] == _WAVE_FORMAT_IEEE_FLOAT and info['bits'] == 32:
+        return '<f4'
+    return None
+
+
+def _mmap_wav(path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Memory-map the data chunk of a large mono PCM16 WAV file.
+    
+    Returns:
+        (int16 memmap, sample_rate), or None if the file is not eligible
     """
-    Convert an audio file to WAV format if it's not already.
+    with open(path, 'rb') as f:
+        info = parse_wav_header(f.read(64 * 1024))
+    if not info or info['channels'] != 1 or _wav_dtype(info) != '<i2':
+        return None
+    
+    available = os.path.getsize(path) - info['data_offset']
+    size = available if info['data_size'] is None else min(info['data_size'], available)
+    count = size // 2
+    if count <= 0:
+        return None
+    return np.memmap(path, dtype='<i2', mode='r', offset=info['data_offset'], shape=(count,)), info['sample_rate']
+
+
+def _decode_with_ffmpeg(source: AudioSource, sample_rate: Optional[int],
+                        offset: float = 0.0) -> Tuple[np.ndarray, int]:
+    """Decode any container ffmpeg understands through pipes, never via temp files."""
+    output_args = {'format': 'wav', 'acodec': 'pcm_f32le', 'ac': 1}
+    if sample_rate:
+        output_args['ar'] = sample_rate
+    input_args = {'ss': offset} if offset else {}
+    
+    if isinstance(source, str):
+        stream, data = ffmpeg.input(source, **input_args), None
+    else:
+        stream, data = ffmpeg.input('pipe:0', **input_args), source
+    
+    try:
+        out, _ = (stream.output('pipe:1', **output_args)
+                  .run(input=data, capture_stdout=True, capture_stderr=True))
+    except ffmpeg.Error as e:
+        message = e.stderr.decode('utf-8', 'replace').strip() if e.stderr else str(e)
+        raise ValueError(f"ffmpeg could not decode audio: {message}") from e
+    
+    # The WAV header on stdout carries the native sample rate
+    return _pcm_from_wav_bytes(out)
+
+
+def decode_audio(source: AudioSource, sample_rate: Optional[int] = None,
+                 mmap_threshold: int = MMAP_THRESHOLD_BYTES, offset: float = 0.0) -> Tuple[np.ndarray, int]:
+    """
+    Decode audio into a mono in-memory PCM buffer.
+    
+    Nothing is written to disk. Large mono PCM16 WAV files on disk are
+    memory-mapped (returned as an int16 array) instead of being read; every
+    other input is decoded with libsndfile, or with ffmpeg through pipes for
+    containers it does not support (MP3 on old libsndfile, M4A, WebM).
     
     Args:
-        audio_path: Path to the input audio file
+        source: Path, raw bytes or binary file object
+        sample_rate: Target sample rate, or None to keep the native rate
+        mmap_threshold: File size above which eligible WAVs are memory-mapped
+        offset: Start decoding this many seconds into the audio; only the
+            rest is decoded
         
     Returns:
-        Path to the converted WAV file
+        tuple: (samples, sample_rate) where samples are float32 in [-1, 1]
+        or, for memory-mapped WAVs, raw int16
     """
-    if audio_path.lower().endswith('.wav'):
-        return audio_path
-        
+    if hasattr(source, 'read'):
+        source = source.read()
+    
+    if isinstance(source, str) and not sample_rate and os.path.getsize(source) > mmap_threshold:
+        mapped = _mmap_wav(source)
+        if mapped is not None:
+            samples, rate = mapped
+            return samples[int(offset * rate):], rate
+    
     try:
-        # Create a temporary file for the WAV output
-        temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_wav.close()
-        
-        # Convert to WAV using pydub
-        audio = AudioSegment.from_file(audio_path)
-        audio.export(temp_wav.name, format='wav')
-        
-        return temp_wav.name
+        with sf.SoundFile(source if isinstance(source, str) else io.BytesIO(source)) as audio:
+            rate = audio.samplerate
+            if offset:
+                audio.seek(min(int(offset * rate), audio.frames))
+            data = audio.read(dtype='float32', always_2d=True)
+        samples = data.mean(axis=1, dtype=np.float32) if data.shape[1] > 1 else data[:, 0]
+    except RuntimeError:
+        # libsndfile raises LibsndfileError (a RuntimeError) for unsupported containers
+        samples, rate = _decode_with_ffmpeg(source, sample_rate, offset)
+    else:
+        if sample_rate and rate != sample_rate:
+            samples = librosa.resample(samples, orig_sr=rate, target_sr=sample_rate)
+            rate = sample_rate
+    
+    return samples, int(rate)
+
+
+def to_wav_bytes(source: AudioSource, sample_rate: Optional[int] = None) -> bytes:
+    """
+    Convert audio to an in-memory 16-bit mono WAV file.
+    
+    Args:
+        source: Path, raw bytes or binary file object
+        sample_rate: Target sample rate, or None to keep the native rate
         
-    except Exception as e:
-        logger.error(f"Error converting audio to WAV: {str(e)}")
-        raise
+    Returns:
+        The WAV file contents
+    """
+    pipeline = AudioAnalysisPipeline(source, sample_rate=sample_rate)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(pipeline.sample_rate)
+        wav.writeframes(pipeline.pcm16())
+    return buffer.getvalue()
+
+class AudioAnalysisPipeline:
+    """
+    Decode an audio file once and derive every analysis from the shared state.
+
+    The recording is loaded into a single mono float32 buffer and one STFT
+    magnitude spectrogram is computed lazily from it.  Quality metrics, the
+    MFCC/chroma/rolloff feature set and the recognizer input are all derived
+    from that buffer, so a full ``process_audio_file`` run decodes the file
+    exactly once instead of once per analysis step.
+    """
+
+    # Bump when the analysis code changes so cached results are recomputed
+    version = 1
+    
+    # STFT parameters shared by every spectral feature
+    n_fft = 2048
+    hop_length = 512
+    n_mfcc = 13
+
+    def __init__(self, audio_path: AudioSource, sample_rate: Optional[int] = None, offset: float = 0.0):
+        """
+        Args:
+            audio_path: Path to the audio file, or its bytes / a binary file object
+            sample_rate: Target sample rate, or None to keep the native rate
+            offset: Decode from this many seconds into the audio; sample
+                indices are then relative to that point
+        """
+        self.audio_path = audio_path
+        self.target_sample_rate = sample_rate
+        self.offset = offset
+        self._raw = None
+        self._sample_rate = None
+        # Segments the last transcribe_segments() call could not transcribe
+        self.failed_segments = 0
+
+    def analysis_params(self) -> Dict[str, Any]:
+        """Parameters that affect quality metrics and features (part of the cache key)."""
+        return {
+            'version': self.version,
+            'sample_rate': self.target_sample_rate,
+            'n_fft': self.n_fft,
+            'hop_length': self.hop_length,
+            'n_mfcc': self.n_mfcc
+        }
+
+    def load(self) -> 'AudioAnalysisPipeline':
+        """Decode the source into the shared in-memory buffer (idempotent)."""
+        if self._raw is None:
+            self._raw, self._sample_rate = decode_audio(self.audio_path, sample_rate=self.target_sample_rate,
+                                                        offset=self.offset)
+        return self
+
+    @cached_property
+    def samples(self) -> np.ndarray:
+        """Mono float32 samples in the range [-1, 1]."""
+        raw = self.load()._raw
+        if raw.dtype == np.int16:
+            # Memory-mapped PCM16; only materialized when a spectral feature needs it
+            return raw.astype(np.float32) / 32768.0
+        return np.ascontiguousarray(raw, dtype=np.float32)
+
+    @property
+    def raw(self) -> np.ndarray:
+        """The decoded buffer: float32 samples, or int16 for memory-mapped WAVs."""
+        return self.load()._raw
+
+    @property
+    def num_samples(self) -> int:
+        """Number of decoded samples."""
+        return len(self.load()._raw)
+
+    @property
+    def sample_rate(self) -> int:
+        """Sample rate of the decoded buffer in Hz."""
+        return self.load()._sample_rate
+
+    @cached_property
+    def duration(self) -> float:
+        """Duration of the decoded buffer in seconds."""
+        return self.num_samples / float(self.sample_rate) if self.sample_rate else 0.0
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        """STFT magnitude spectrogram, computed once."""
+        return np.abs(librosa.stft(self.samples, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        """STFT power spectrogram derived from :attr:`magnitude`."""
+        return self.magnitude ** 2
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        """Mel power spectrogram derived from :attr:`power`."""
+        return librosa.feature.melspectrogram(S=self.power, sr=self.sample_rate)
+
+    @cached_property
+    def mfcc(self) -> np.ndarray:
+        """MFCCs computed from the shared mel spectrogram."""
+        return librosa.feature.mfcc(S=librosa.power_to_db(self.mel), sr=self.sample_rate, n_mfcc=self.n_mfcc)
+
+    @cached_property
+    def spectral_centroid(self) -> np.ndarray:
+        """Spectral centroid per frame."""
+        return librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sample_rate, n_fft=self.n_fft)
+
+    @cached_property
+    def spectral_bandwidth(self) -> np.ndarray:
+        """Spectral bandwidth per frame."""
+        return librosa.feature.spectral_bandwidth(S=self.magnitude, sr=self.sample_rate, n_fft=self.n_fft)
+
+    @cached_property
+    def spectral_rolloff(self) -> np.ndarray:
+        """Spectral rolloff per frame."""
+        return librosa.feature.spectral_rolloff(S=self.magnitude, sr=self.sample_rate, n_fft=self.n_fft)
+
+    @cached_property
+    def chroma(self) -> np.ndarray:
+        """Chromagram derived from :attr:`power`."""
+        return librosa.feature.chroma_stft(S=self.power, sr=self.sample_rate, n_fft=self.n_fft)
+
+    @cached_property
+    def zero_crossing_rate(self) -> float:
+        """Mean zero crossing rate (noisiness)."""
+        return float(np.mean(librosa.feature.zero_crossing_rate(
+            self.samples, frame_length=self.n_fft, hop_length=self.hop_length)))
+
+    @cached_property
+    def rms(self) -> float:
+        """Root Mean Square (loudness) of the whole buffer."""
+        return float(np.sqrt(np.mean(self.samples.astype(np.float64) ** 2))) if len(self.samples) else 0.0
+
+    @cached_property
+    def non_silent_intervals(self) -> np.ndarray:
+        """Sample intervals that are not silence (``librosa.effects.split``)."""
+        return librosa.effects.split(self.samples, top_db=30)
+
+    def pcm16(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        Return (a slice of) the shared buffer as 16-bit little-endian PCM bytes.
+
+        Args:
+            start: First sample index
+            end: Sample index after the last sample, or None for the end
+        """
+        raw = self.load()._raw
+        if raw.dtype == np.int16:
+            # Already PCM16: slice straight out of the (memory-mapped) buffer
+            return np.asarray(raw[start:end], dtype='<i2').tobytes()
+        clipped = np.clip(raw[start:end], -1.0, 1.0)
+        return (clipped * 32767).astype('<i2').tobytes()
+
+    def recognizer_audio(self, start: int = 0, end: Optional[int] = None) -> sr.AudioData:
+        """Build the speech recognizer input from (a slice of) the shared buffer."""
+        return sr.AudioData(self.pcm16(start, end), self.sample_rate, 2)
+
+    def speech_segments(self, max_gap: float = 0.5, min_length: float = 0.3,
+                        max_length: float = 30.0) -> List[Tuple[int, int]]:
+        """
+        Split the buffer into speech segments at silence boundaries.
+
+        Non-silent intervals from :attr:`non_silent_intervals` that are closer
+        than ``max_gap`` are merged, segments longer than ``max_length`` are cut
+        into equal pieces and fragments shorter than ``min_length`` dropped.
+
+        Args:
+            max_gap: Longest pause (seconds) that does not end a segment
+            min_length: Shortest segment (seconds) worth transcribing
+            max_length: Longest segment (seconds) sent to the recognizer
+
+        Returns:
+            List of (start_sample, end_sample) pairs
+        """
+        rate = self.sample_rate
+        merged = []
+        for start, end in self.non_silent_intervals:
+            if merged and start - merged[-1][1] <= max_gap * rate:
+                merged[-1][1] = end
+            else:
+                merged.append([int(start), int(end)])
+
+        max_samples = int(max_length * rate)
+        segments = []
+        for start, end in merged:
+            if end - start < min_length * rate:
+                continue
+            pieces = max(1, int(np.ceil((end - start) / max_samples)))
+            bounds = np.linspace(start, end, pieces + 1).astype(int)
+            segments.extend(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        return segments
+
+    def transcribe(self, language: str = 'en-US', start: int = 0, end: Optional[int] = None,
+                   transcriber: Optional[Transcriber] = None, raise_errors: bool = False) -> str:
+        """
+        Transcribe (a slice of) the decoded buffer to text.
+
+        Args:
+            language: Language code for transcription (default: 'en-US')
+            start: First sample index
+            end: Sample index after the last sample, or None for the end
+            transcriber: Backend to use (default: the configured one)
+            raise_errors: Raise recognizer errors instead of returning ""
+
+        Returns:
+            Transcribed text, or an empty string on failure
+        """
+        try:
+            transcriber = transcriber or get_transcriber()
+            return transcriber.transcribe(self.raw[start:end], self.sample_rate, language=language)
+        except Exception as e:
+            logger.error(f"Error in transcription: {str(e)}")
+            if raise_errors:
+                raise
+            return ""
+
+    def transcribe_segments(self, language: str = 'en-US', max_workers: int = 4,
+                            **segment_options) -> List[Dict[str, Any]]:
+        """
+        Transcribe speech segments concurrently and keep their timestamps.
+
+        Each segment is sent to the recognizer on its own, with at most
+        ``max_workers`` requests in flight, so long answers stay below request
+        size limits and latency is bounded by the slowest segment rather than
+        the full answer length.
+
+        Args:
+            language: Language code for transcription (default: 'en-US')
+            max_workers: Maximum number of concurrent recognizer requests
+            **segment_options: Passed to :meth:`speech_segments`
+
+        Returns:
+            List of ``{'start', 'end', 'text'}`` dicts in playback order,
+            with times in seconds. Segments the recognizer failed on are left
+            out and counted in ``failed_segments``.
+        """
+        self.failed_segments = 0
+        segments = self.speech_segments(**segment_options)
+        if not segments:
+            return []
+
+        rate = float(self.sample_rate)
+        transcriber = get_transcriber()
+
+        def transcribe_segment(bounds):
+            try:
+                return self.transcribe(language, *bounds, transcriber=transcriber, raise_errors=True)
+            except Exception:
+                return None
+
+        # Local engines decode one segment at a time; network backends overlap requests
+        workers = max(1, min(max_workers, transcriber.max_concurrency))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            texts = list(pool.map(transcribe_segment, segments))
+        self.failed_segments = sum(text is None for text in texts)
+
+        return [
+            {'start': round(start / rate, 3), 'end': round(end / rate, 3), 'text': text}
+            for (start, end), text in zip(segments, texts)
+            if text
+        ]
+
+    def quality_metrics(self) -> Dict[str, Any]:
+        """
+        Compute audio quality metrics from the shared state.
+
+        Returns:
+            Dictionary containing audio quality metrics
+        """
+        try:
+            duration = self.duration
+            speech_duration = sum(end - start for start, end in self.non_silent_intervals) / self.sample_rate
+            silence_duration = duration - speech_duration
+
+            return {
+                'duration_seconds': float(duration),
+                'sample_rate': int(self.sample_rate),
+                'rms': self.rms,
+                'spectral_centroid_mean': float(np.mean(self.spectral_centroid)),
+                'spectral_bandwidth_mean': float(np.mean(self.spectral_bandwidth)),
+                'zero_crossing_rate': self.zero_crossing_rate,
+                'silence_duration_seconds': float(silence_duration),
+                'speech_duration_seconds': float(duration - silence_duration)
+            }
+
+        except Exception as e:
+            logger.error(f"Error analyzing audio quality: {str(e)}")
+            return {}
+
+    def features(self) -> Dict[str, Any]:
+        """
+        Compute the audio feature set from the shared state.
+
+        Returns:
+            Dictionary containing audio features
+        """
+        try:
+            features = {}
+
+            # Basic features
+            features['duration'] = float(self.duration)
+            features['sample_rate'] = int(self.sample_rate)
+
+            # Temporal features
+            features['rms_energy'] = self.rms
+            features['zero_crossing_rate'] = self.zero_crossing_rate
+
+            # Spectral features
+            features['spectral_centroid_mean'] = float(np.mean(self.spectral_centroid))
+            features['spectral_centroid_std'] = float(np.std(self.spectral_centroid))
+            features['spectral_bandwidth_mean'] = float(np.mean(self.spectral_bandwidth))
+            features['spectral_rolloff_mean'] = float(np.mean(self.spectral_rolloff))
+
+            # MFCCs (Mel-frequency cepstral coefficients)
+            for i, mfcc in enumerate(self.mfcc):
+                features[f'mfcc_{i+1}_mean'] = float(np.mean(mfcc))
+                features[f'mfcc_{i+1}_std'] = float(np.std(mfcc))
+
+            # Chroma features
+            features['chroma_mean'] = float(np.mean(self.chroma))
+            features['chroma_std'] = float(np.std(self.chroma))
+
+            # Mel spectrogram
+            features['mel_spectrogram_mean'] = float(np.mean(self.mel))
+
+            return features
+
+        except Exception as e:
+            logger.error(f"Error extracting audio features: {str(e)}")
+            return {}
+
+
+def _transcription_params(language: str) -> Dict[str, Any]:
+    """Cache key parameters of the configured transcription backend."""
+    return get_transcriber().cache_params(language)
 
 def transcribe_audio(audio_path: str, language: str = 'en-US') -> str:
     """
@@ -59,35 +531,38 @@ def transcribe_audio(audio_path: str, language: str = 'en-US') -> str:
         Transcribed text
     """
     try:
-        # Convert to WAV if needed
-        wav_path = convert_to_wav(audio_path)
-        
-        # Initialize recognizer
-        recognizer = sr.Recognizer()
-        
-        # Read audio file
-        with sr.AudioFile(wav_path) as source:
-            audio_data = recognizer.record(source)
-            
-            try:
-                # Use Google Web Speech API for transcription
-                text = recognizer.recognize_google(audio_data, language=language)
-                return text
-                
-            except sr.UnknownValueError:
-                logger.warning("Google Speech Recognition could not understand audio")
-                return ""
-            except sr.RequestError as e:
-                logger.error(f"Could not request results from Google Speech Recognition service; {e}")
-                return ""
-                
+        cache = get_audio_cache()
+        key = cache.make_key(audio_digest(audio_path), 'transcription', _transcription_params(language))
+        return cache.get_or_compute(
+            key, lambda: AudioAnalysisPipeline(audio_path).transcribe(language=language))
     except Exception as e:
         logger.error(f"Error in transcription: {str(e)}")
         return ""
-    finally:
-        # Clean up temporary WAV file if it was created
-        if 'wav_path' in locals() and wav_path != audio_path and os.path.exists(wav_path):
-            os.unlink(wav_path)
+
+def transcribe_audio_segments(audio_path: str, language: str = 'en-US',
+                              max_workers: int = 4) -> List[Dict[str, Any]]:
+    """
+    Transcribe an audio file segment by segment with timestamps.
+    
+    Args:
+        audio_path: Path to the audio file
+        language: Language code for transcription (default: 'en-US')
+        max_workers: Maximum number of concurrent recognizer requests
+        
+    Returns:
+        List of ``{'start', 'end', 'text'}`` dicts (times in seconds)
+    """
+    try:
+        cache = get_audio_cache()
+        key = cache.make_key(audio_digest(audio_path), 'transcription_segments', _transcription_params(language))
+        pipeline = AudioAnalysisPipeline(audio_path)
+        # A list with failed segments has gaps; return it but never cache it
+        return cache.get_or_compute(
+            key, lambda: pipeline.transcribe_segments(language=language, max_workers=max_workers),
+            should_store=lambda segments: bool(segments) and not pipeline.failed_segments)
+    except Exception as e:
+        logger.error(f"Error in segmented transcription: {str(e)}")
+        return []
 
 def analyze_audio_quality(audio_path: str) -> Dict[str, Any]:
     """
@@ -100,35 +575,10 @@ def analyze_audio_quality(audio_path: str) -> Dict[str, Any]:
         Dictionary containing audio quality metrics
     """
     try:
-        # Load audio file
-        y, sr = librosa.load(audio_path, sr=None)
-        
-        # Calculate metrics
-        duration = librosa.get_duration(y=y, sr=sr)
-        rms = np.sqrt(np.mean(y**2))  # Root Mean Square (loudness)
-        
-        # Spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
-        
-        # Zero crossing rate (noisiness)
-        zero_crossings = np.mean(librosa.feature.zero_crossing_rate(y))
-        
-        # Silence detection
-        non_silent_ranges = librosa.effects.split(y, top_db=30)
-        silence_duration = duration - sum(end - start for start, end in non_silent_ranges) / sr
-        
-        return {
-            'duration_seconds': float(duration),
-            'sample_rate': int(sr),
-            'rms': float(rms),
-            'spectral_centroid_mean': float(np.mean(spectral_centroids)),
-            'spectral_bandwidth_mean': float(np.mean(spectral_bandwidth)),
-            'zero_crossing_rate': float(zero_crossings),
-            'silence_duration_seconds': float(silence_duration),
-            'speech_duration_seconds': float(duration - silence_duration)
-        }
-        
+        pipeline = AudioAnalysisPipeline(audio_path)
+        cache = get_audio_cache()
+        key = cache.make_key(audio_digest(audio_path), 'quality_metrics', pipeline.analysis_params())
+        return cache.get_or_compute(key, pipeline.quality_metrics)
     except Exception as e:
         logger.error(f"Error analyzing audio quality: {str(e)}")
         return {}
@@ -144,48 +594,10 @@ def extract_audio_features(audio_path: str) -> Dict[str, Any]:
         Dictionary containing audio features
     """
     try:
-        # Load audio file
-        y, sr = librosa.load(audio_path, sr=None)
-        
-        # Calculate various audio features
-        features = {}
-        
-        # Basic features
-        features['duration'] = float(librosa.get_duration(y=y, sr=sr))
-        features['sample_rate'] = int(sr)
-        
-        # Temporal features
-        features['rms_energy'] = float(np.sqrt(np.mean(y**2)))
-        features['zero_crossing_rate'] = float(np.mean(librosa.feature.zero_crossing_rate(y)))
-        
-        # Spectral features
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-        features['spectral_centroid_mean'] = float(np.mean(spectral_centroid))
-        features['spectral_centroid_std'] = float(np.std(spectral_centroid))
-        
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
-        features['spectral_bandwidth_mean'] = float(np.mean(spectral_bandwidth))
-        
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
-        features['spectral_rolloff_mean'] = float(np.mean(spectral_rolloff))
-        
-        # MFCCs (Mel-frequency cepstral coefficients)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        for i, mfcc in enumerate(mfccs):
-            features[f'mfcc_{i+1}_mean'] = float(np.mean(mfcc))
-            features[f'mfcc_{i+1}_std'] = float(np.std(mfcc))
-        
-        # Chroma features
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-        features['chroma_mean'] = float(np.mean(chroma))
-        features['chroma_std'] = float(np.std(chroma))
-        
-        # Mel spectrogram
-        mel_spec = librosa.feature.melspectrogram(y=y, sr=sr)
-        features['mel_spectrogram_mean'] = float(np.mean(mel_spec))
-        
-        return features
-        
+        pipeline = AudioAnalysisPipeline(audio_path)
+        cache = get_audio_cache()
+        key = cache.make_key(audio_digest(audio_path), 'audio_features', pipeline.analysis_params())
+        return cache.get_or_compute(key, pipeline.features)
     except Exception as e:
         logger.error(f"Error extracting audio features: {str(e)}")
         return {}
@@ -206,54 +618,116 @@ def analyze_pronunciation(audio_path: str, reference_text: str, language: str =
         # Transcribe the audio
         transcription = transcribe_audio(audio_path, language=language)
         
-        # Simple word error rate calculation
-        ref_words = set(reference_text.lower().split())
-        trans_words = set(transcription.lower().split())
-        
-        # Calculate word error rate (simplified)
-        correct_words = ref_words.intersection(trans_words)
-        total_words = len(ref_words.union(trans_words))
-        wer = 1 - (len(correct_words) / total_words) if total_words > 0 else 1.0
+        # Word-level edit-distance alignment against the reference
+        scores = align_words(reference_text, transcription)
+        alignment = scores['alignment']
+        wer = min(scores['wer'], 1.0)
         
         # Basic pronunciation score (0-100 scale)
         pronunciation_score = max(0, 100 * (1 - wer))
         
         return {
             'transcription': transcription,
-            'word_error_rate': float(wer),
+            'word_error_rate': float(scores['wer']),
             'pronunciation_score': float(pronunciation_score),
-            'correct_words': list(correct_words),
-            'missing_words': list(ref_words - trans_words),
-            'extra_words': list(trans_words - ref_words)
+            'substitutions': scores['substitutions'],
+            'insertions': scores['insertions'],
+            'deletions': scores['deletions'],
+            'alignment': alignment,
+            'correct_words': [ref for ref, hyp in alignment if ref == hyp],
+            'missing_words': [ref for ref, hyp in alignment if ref is not None and ref != hyp],
+            'extra_words': [hyp for ref, hyp in alignment if hyp is not None and ref != hyp]
         }
         
     except Exception as e:
         logger.error(f"Error analyzing pronunciation: {str(e)}")
         return {}
 
-def process_audio_file(audio_path: str) -> Dict[str, Any]:
+def process_audio_file(audio_path: str, segmented: bool = False, max_workers: int = 4,
+                       pipeline: Optional[AudioAnalysisPipeline] = None) -> Dict[str, Any]:
     """
     Process an audio file and return analysis results.
     
     Args:
         audio_path: Path to the audio file
+        segmented: Transcribe silence-delimited segments concurrently instead
+            of sending the whole file in one request
+        max_workers: Maximum concurrent recognizer requests in segmented mode
+        pipeline: Existing pipeline for ``audio_path`` to share decoded state
+            with later ingest stages
         
     Returns:
-        Dictionary containing transcription and analysis results
+        Dictionary containing transcription and analysis results; in
+        segmented mode it also contains the timestamped ``segments``
     """
-    # Transcribe the audio
-    transcription = transcribe_audio(audio_path)
+    # Decode once and derive every analysis from the shared buffer
+    pipeline = pipeline or AudioAnalysisPipeline(audio_path)
+    language = 'en-US'  # Default language, can be made configurable
+    
+    # Serve whatever is already cached before touching the decoder
+    cache = get_audio_cache()
+    try:
+        digest = audio_digest(audio_path)
+    except OSError as e:
+        logger.error(f"Error reading audio file: {str(e)}")
+        digest = None
+    
+    transcript_name = 'segments' if segmented else 'transcription'
+    transcript_namespace = 'transcription_segments' if segmented else 'transcription'
     
-    # Analyze audio quality
-    quality_metrics = analyze_audio_quality(audio_path)
+    keys = {}
+    if digest:
+        keys = {
+            transcript_name: cache.make_key(digest, transcript_namespace, _transcription_params(language)),
+            'quality_metrics': cache.make_key(digest, 'quality_metrics', pipeline.analysis_params()),
+            'audio_features': cache.make_key(digest, 'audio_features', pipeline.analysis_params())
+        }
+    cached = {name: cache.get(key) for name, key in keys.items()}
+    
+    transcript = cached.get(transcript_name)
+    quality_metrics = cached.get('quality_metrics')
+    audio_features = cached.get('audio_features')
+    
+    if transcript is None or quality_metrics is None or audio_features is None:
+        try:
+            pipeline.load()
+        except Exception as e:
+            logger.error(f"Error decoding audio file: {str(e)}")
+        else:
+            computed = {}
+            if transcript is None:
+                if segmented:
+                    transcript = pipeline.transcribe_segments(language=language, max_workers=max_workers)
+                else:
+                    transcript = pipeline.transcribe(language=language)
+                # A transcript missing failed segments is returned but not cached
+                if not (segmented and pipeline.failed_segments):
+                    computed[transcript_name] = transcript
+            if quality_metrics is None:
+                quality_metrics = computed['quality_metrics'] = pipeline.quality_metrics()
+            if audio_features is None:
+                audio_features = computed['audio_features'] = pipeline.features()
+            
+            for name, value in computed.items():
+                if value and name in keys:
+                    cache.set(keys[name], value)
     
-    # Extract audio features
-    audio_features = extract_audio_features(audio_path)
+    segments = None
+    if segmented:
+        segments = transcript or []
+        transcription = ' '.join(segment['text'] for segment in segments)
+    else:
+        transcription = transcript or ""
+    quality_metrics = quality_metrics or {}
+    audio_features = audio_features or {}
     
-    return {
+    result = {
         'transcription': transcription,
         'quality_metrics': quality_metrics,
         'audio_features': audio_features,
         'word_count': len(transcription.split()) if transcription else 0,
-        'language': 'en-US'  # Default language, can be made configurable
+        'language': language
     }
+    if segmented:
+        result['segments'] = segments
+    return result
@@ -0,0 +1,147 @@
+"""
+Audio Transcoding
+
+Produces the two derived copies of every upload at ingest:
+
+- an analysis copy in one canonical format (16 kHz mono 16-bit PCM WAV) that
+  all transcription and feature extraction runs on, whatever the browser
+  uploaded;
+- a compressed archival copy (Opus in Ogg) used for storage and playback.
+
+Once an assessment is closed, :mod:`app.services.audio_tiering` drops the
+original and the analysis copy and keeps only the archival one.
+"""
+import os
+import wave
+import logging
+from typing import Optional, Tuple
+
+import ffmpeg
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Canonical analysis format
+ANALYSIS_SAMPLE_RATE = 16000
+
+# Opus bitrate for archived speech; 24 kbit/s mono is transparent for voice
+ARCHIVE_BITRATE = '24k'
+
+_ANALYSIS_SUFFIX = '.analysis.wav'
+_ARCHIVE_SUFFIX = '.archive.ogg'
+
+
+def derived_paths(file_path: str) -> Tuple[str, str]:
+    """
+    Get the analysis and archival copy paths for an upload.
+
+    Args:
+        file_path: Path to the uploaded audio file
+
+    Returns:
+        tuple: (analysis_path, archive_path), next to the upload
+    """
+    stem = os.path.splitext(file_path)[0]
+    return stem + _ANALYSIS_SUFFIX, stem + _ARCHIVE_SUFFIX
+
+
+def write_analysis_copy(source_path: str, dest_path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE) -> str:
+    """
+    Write the canonical mono 16-bit PCM WAV analysis copy.
+
+    Args:
+        source_path: Path to the uploaded audio file
+        dest_path: Output WAV path
+        sample_rate: Output sample rate
+
+    Returns:
+        str: ``dest_path``
+    """
+    from .audio_processing import decode_audio
+
+    samples, rate = decode_audio(source_path, sample_rate=sample_rate)
+    if samples.dtype != np.int16:
+        samples = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    with wave.open(tmp_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def write_archive_copy(source_path: str, dest_path: str, bitrate: str = ARCHIVE_BITRATE) -> str:
+    """
+    Write the compressed Opus/Ogg archival copy.
+
+    Args:
+        source_path: Path to the uploaded audio file
+        dest_path: Output Ogg path
+        bitrate: Opus target bitrate, e.g. ``'24k'``
+
+    Returns:
+        str: ``dest_path``
+
+    Raises:
+        ValueError: If ffmpeg cannot transcode the file
+    """
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        (ffmpeg
+         .input(source_path)
+         .output(tmp_path, format='ogg', acodec='libopus', ac=1,
+                 audio_bitrate=bitrate, application='voip', vn=None)
+         .overwrite_output()
+         .run(capture_stdout=True, capture_stderr=True))
+    except ffmpeg.Error as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        message = e.stderr.decode('utf-8', 'replace').strip() if e.stderr else str(e)
+        raise ValueError(f"ffmpeg could not archive audio: {message}") from e
+
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def _is_fresh(path: str, source_mtime: float) -> bool:
+    return os.path.exists(path) and os.path.getmtime(path) >= source_mtime
+
+
+def transcode_upload(file_path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE,
+                     bitrate: str = ARCHIVE_BITRATE) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Create (or reuse) both derived copies of an upload.
+
+    Each copy is best-effort: a failure is logged and reported as None so
+    processing can continue on the original file.
+
+    Args:
+        file_path: Path to the uploaded audio file
+        sample_rate: Analysis copy sample rate
+        bitrate: Archival copy bitrate
+
+    Returns:
+        tuple: (analysis_path, archive_path), either of which may be None
+    """
+    analysis_path, archive_path = derived_paths(file_path)
+    source_mtime = os.path.getmtime(file_path)
+
+    # Retried jobs keep copies that are already newer than the upload
+    try:
+        if not _is_fresh(analysis_path, source_mtime):
+            write_analysis_copy(file_path, analysis_path, sample_rate=sample_rate)
+    except Exception as e:
+        logger.error(f"Error writing analysis copy of {file_path}: {str(e)}")
+        analysis_path = None
+
+    try:
+        if not _is_fresh(archive_path, source_mtime):
+            write_archive_copy(file_path, archive_path, bitrate=bitrate)
+    except Exception as e:
+        logger.error(f"Error writing archival copy of {file_path}: {str(e)}")
+        archive_path = None
+
+    return analysis_path, archive_path
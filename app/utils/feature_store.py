@@ -0,0 +1,400 @@
+"""
+Audio Feature Store
+
+Keeps the vectors produced by ``extract_audio_features`` in a compact
+columnar layout instead of scattering them over MongoDB documents. Vectors are
+partitioned by month; each partition is a float32 ``features.npy`` matrix
+(one row per recording, one column per entry of :data:`FEATURE_NAMES`) opened
+as a memory map, plus parallel ``ids.npy``/``groups.npy`` arrays holding the
+recording and assessment ids.
+
+Cohort statistics, nearest-neighbour search and examiner calibration then run
+as vectorized NumPy operations over the matrix.
+"""
+import os
+import json
+import fcntl
+import logging
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column order of the feature matrix; matches AudioAnalysisPipeline.features()
+FEATURE_NAMES = (
+    ['duration', 'sample_rate', 'rms_energy', 'zero_crossing_rate',
+     'spectral_centroid_mean', 'spectral_centroid_std',
+     'spectral_bandwidth_mean', 'spectral_rolloff_mean'] +
+    [f'mfcc_{i}_{stat}' for i in range(1, 14) for stat in ('mean', 'std')] +
+    ['chroma_mean', 'chroma_std', 'mel_spectrogram_mean']
+)
+
+# ObjectId strings are 24 hex characters
+_ID_DTYPE = '<U24'
+
+_INITIAL_CAPACITY = 1024
+
+
+class FeatureStore:
+    """
+    Month-partitioned, memory-mapped matrix of audio feature vectors.
+    """
+
+    def __init__(self, root_dir: str, feature_names: Optional[List[str]] = None):
+        """
+        Args:
+            root_dir: Directory holding one sub-directory per month
+            feature_names: Column order (default: :data:`FEATURE_NAMES`)
+        """
+        self.root_dir = root_dir
+        self.feature_names = list(feature_names or FEATURE_NAMES)
+        self._columns = {name: i for i, name in enumerate(self.feature_names)}
+
+    # Partition layout
+
+    @staticmethod
+    def month_of(when: Optional[datetime]) -> str:
+        """Partition key for a timestamp."""
+        return (when or datetime.utcnow()).strftime('%Y-%m')
+
+    def _dir(self, month: str) -> str:
+        return os.path.join(self.root_dir, month)
+
+    def months(self) -> List[str]:
+        """List the stored partitions, oldest first."""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(name for name in os.listdir(self.root_dir)
+                      if os.path.exists(os.path.join(self.root_dir, name, 'meta.json')))
+
+    def _read_meta(self, month: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._dir(month), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, month: str, meta: Dict[str, Any]) -> None:
+        directory = self._dir(month)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+    @contextmanager
+    def _locked(self, month: str):
+        """Serialize writers to a partition across processes."""
+        directory = self._dir(month)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield directory
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open(self, month: str, mode: str = 'r'):
+        """Open a partition's arrays as memory maps."""
+        directory = self._dir(month)
+        features = np.load(os.path.join(directory, 'features.npy'), mmap_mode=mode)
+        ids = np.load(os.path.join(directory, 'ids.npy'), mmap_mode=mode)
+        groups = np.load(os.path.join(directory, 'groups.npy'), mmap_mode=mode)
+        return features, ids, groups
+
+    def _create(self, directory: str, capacity: int, old=None) -> None:
+        """Allocate (or grow) a partition, copying ``old`` arrays if given."""
+        shapes = {
+            'features.npy': ((capacity, len(self.feature_names)), np.float32),
+            'ids.npy': ((capacity,), _ID_DTYPE),
+            'groups.npy': ((capacity,), _ID_DTYPE)
+        }
+        for index, (name, (shape, dtype)) in enumerate(shapes.items()):
+            tmp_path = os.path.join(directory, f"{name}.tmp")
+            array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+            if old is not None:
+                array[:len(old[index])] = old[index]
+            array.flush()
+            del array
+            os.replace(tmp_path, os.path.join(directory, name))
+
+    # Writing
+
+    def vectorize(self, features: Dict[str, Any]) -> np.ndarray:
+        """Convert a feature dict to a row in column order (missing values are NaN)."""
+        row = np.full(len(self.feature_names), np.nan, dtype=np.float32)
+        for name, value in features.items():
+            column = self._columns.get(name)
+            if column is not None and value is not None:
+                row[column] = value
+        return row
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any], Optional[datetime], Optional[str]]]) -> int:
+        """
+        Store many feature vectors, replacing earlier rows for the same id.
+
+        Args:
+            items: Iterable of (record_id, features, recorded_at, group_id)
+
+        Returns:
+            int: Number of rows written
+        """
+        by_month = {}
+        for record_id, features, when, group in items:
+            if features:
+                by_month.setdefault(self.month_of(when), []).append(
+                    (str(record_id), self.vectorize(features), str(group or '')))
+
+        written = 0
+        for month, rows in by_month.items():
+            with self._locked(month) as directory:
+                meta = self._read_meta(month)
+                if meta is None:
+                    meta = {'count': 0, 'capacity': max(_INITIAL_CAPACITY, len(rows)),
+                            'feature_names': self.feature_names}
+                    self._create(directory, meta['capacity'])
+
+                count = meta['count']
+                features, ids, groups = self._open(month, mode='r')
+                existing = {record_id: i for i, record_id in enumerate(ids[:count])}
+                new_ids = {record_id for record_id, _, _ in rows if record_id not in existing}
+
+                if count + len(new_ids) > meta['capacity']:
+                    # Grow geometrically so appends stay amortized O(1)
+                    capacity = max(meta['capacity'] * 2, count + len(new_ids))
+                    old = (np.array(features[:count]), np.array(ids[:count]), np.array(groups[:count]))
+                    del features, ids, groups
+                    self._create(directory, capacity, old)
+                    meta['capacity'] = capacity
+                else:
+                    del features, ids, groups
+
+                features, ids, groups = self._open(month, mode='r+')
+                for record_id, vector, group in rows:
+                    index = existing.get(record_id)
+                    if index is None:
+                        index = existing[record_id] = count
+                        count += 1
+                    features[index] = vector
+                    ids[index] = record_id
+                    groups[index] = group
+                    written += 1
+                features.flush()
+                ids.flush()
+                groups.flush()
+                del features, ids, groups
+
+                # Publish the new rows only after the data is on disk
+                meta['count'] = count
+                self._write_meta(month, meta)
+
+        return written
+
+    def add(self, record_id: str, features: Dict[str, Any], recorded_at: Optional[datetime] = None,
+            group_id: Optional[str] = None) -> bool:
+        """
+        Store one feature vector.
+
+        Args:
+            record_id: Recording id
+            features: Dict from ``extract_audio_features``
+            recorded_at: Timestamp selecting the monthly partition
+            group_id: Owning assessment id, used for cohort filters
+
+        Returns:
+            bool: True if a row was written
+        """
+        try:
+            return self.add_many([(record_id, features, recorded_at, group_id)]) > 0
+        except (OSError, ValueError) as e:
+            logger.error(f"Error storing features for {record_id}: {str(e)}")
+            return False
+
+    # Reading
+
+    def load(self, months: Optional[Iterable[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Load the stored vectors.
+
+        A single partition is returned as a read-only memory map; several are
+        concatenated.
+
+        Args:
+            months: Partitions to include (default: all)
+
+        Returns:
+            tuple: (ids, group_ids, matrix) with one row per recording
+        """
+        parts = []
+        for month in (months or self.months()):
+            meta = self._read_meta(month)
+            if not meta or not meta['count']:
+                continue
+            features, ids, groups = self._open(month)
+            count = meta['count']
+            parts.append((ids[:count], groups[:count], features[:count]))
+
+        if not parts:
+            empty_ids = np.empty(0, dtype=_ID_DTYPE)
+            return empty_ids, empty_ids, np.empty((0, len(self.feature_names)), dtype=np.float32)
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+    def get(self, record_id: str, months: Optional[Iterable[str]] = None) -> Optional[Dict[str, float]]:
+        """Get the stored features of one recording as a dict."""
+        ids, _, matrix = self.load(months)
+        rows = np.flatnonzero(ids == str(record_id))
+        if not len(rows):
+            return None
+        return {name: float(value) for name, value in zip(self.feature_names, matrix[rows[-1]])}
+
+    def _select(self, ids, groups, matrix, group_ids):
+        if group_ids is None:
+            return ids, matrix
+        mask = np.isin(groups, [str(g) for g in group_ids])
+        return ids[mask], matrix[mask]
+
+    def cohort_stats(self, months: Optional[Iterable[str]] = None,
+                     group_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Per-feature distribution of a cohort.
+
+        Args:
+            months: Partitions to include (default: all)
+            group_ids: Restrict to these assessment ids
+
+        Returns:
+            Dict mapping feature name to count, mean, std, p10, median and p90
+        """
+        ids, groups, matrix = self.load(months)
+        _, matrix = self._select(ids, groups, matrix, group_ids)
+        if not len(matrix):
+            return {}
+
+        with np.errstate(all='ignore'):
+            data = np.asarray(matrix, dtype=np.float64)
+            counts = np.sum(~np.isnan(data), axis=0)
+            means = np.nanmean(data, axis=0)
+            stds = np.nanstd(data, axis=0)
+            p10, median, p90 = np.nanpercentile(data, [10, 50, 90], axis=0)
+
+        return {
+            name: {
+                'count': int(counts[i]),
+                'mean': float(means[i]),
+                'std': float(stds[i]),
+                'p10': float(p10[i]),
+                'median': float(median[i]),
+                'p90': float(p90[i])
+            }
+            for i, name in enumerate(self.feature_names)
+        }
+
+    @staticmethod
+    def _standardize(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        data = np.asarray(matrix, dtype=np.float64)
+        with np.errstate(all='ignore'):
+            means = np.nanmean(data, axis=0)
+            stds = np.nanstd(data, axis=0)
+        means = np.nan_to_num(means)
+        stds = np.where(np.nan_to_num(stds) > 0, stds, 1.0)
+        # Missing values sit at the cohort mean, i.e. contribute nothing
+        return np.nan_to_num((data - means) / stds), means, stds
+
+    def zscores(self, record_id: str, months: Optional[Iterable[str]] = None,
+                group_ids: Optional[Iterable[str]] = None) -> Optional[Dict[str, float]]:
+        """
+        Position of a recording within a cohort, in standard deviations per feature.
+
+        Useful for examiner calibration: a recording that scored unusually is
+        compared against the acoustic profile of its cohort.
+        """
+        ids, groups, matrix = self.load(months)
+        rows = np.flatnonzero(ids == str(record_id))
+        if not len(rows):
+            return None
+        target = np.asarray(matrix[rows[-1]], dtype=np.float64)
+
+        _, cohort = self._select(ids, groups, matrix, group_ids)
+        _, means, stds = self._standardize(cohort)
+        scores = np.nan_to_num((target - means) / stds)
+        return {name: float(value) for name, value in zip(self.feature_names, scores)}
+
+    def nearest(self, query: Union[str, Dict[str, Any]], k: int = 5,
+                months: Optional[Iterable[str]] = None,
+                features: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Find the recordings with the most similar feature vectors.
+
+        Features are standardized over the searched partitions so that every
+        column weighs equally, then ranked by Euclidean distance.
+
+        Args:
+            query: Recording id already in the store, or a feature dict
+            k: Number of neighbours
+            months: Partitions to search (default: all)
+            features: Subset of feature names to compare on (default: all)
+
+        Returns:
+            List of dicts with ``id``, ``group_id`` and ``distance``, closest first
+        """
+        ids, groups, matrix = self.load(months)
+        if not len(ids):
+            return []
+
+        columns = [self._columns[name] for name in features] if features else slice(None)
+        standardized, means, stds = self._standardize(np.asarray(matrix)[:, columns])
+
+        exclude = None
+        if isinstance(query, dict):
+            vector = self.vectorize(query)[columns]
+            target = np.nan_to_num((vector - means) / stds)
+        else:
+            rows = np.flatnonzero(ids == str(query))
+            if not len(rows):
+                return []
+            exclude = rows
+            target = standardized[rows[-1]]
+
+        distances = np.sqrt(np.sum((standardized - target) ** 2, axis=1))
+        if exclude is not None:
+            distances[exclude] = np.inf
+
+        k = min(k, len(distances))
+        candidates = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        order = candidates[np.argsort(distances[candidates])]
+        return [
+            {'id': str(ids[i]), 'group_id': str(groups[i]) or None, 'distance': float(distances[i])}
+            for i in order if np.isfinite(distances[i])
+        ]
+
+
+_stores: Dict[str, FeatureStore] = {}
+
+
+def get_feature_store() -> FeatureStore:
+    """
+    Get the feature store configured for the current app.
+
+    Falls back to the static ``Config`` values outside an application context.
+
+    Returns:
+        FeatureStore
+    """
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        root_dir = current_app.config.get('FEATURE_STORE_DIR')
+    else:
+        from config import Config
+        root_dir = getattr(Config, 'FEATURE_STORE_DIR', None)
+
+    root_dir = root_dir or os.path.join(tempfile.gettempdir(), 'ep_feature_store')
+    store = _stores.get(root_dir)
+    if store is None:
+        store = _stores[root_dir] = FeatureStore(root_dir)
+    return store
@@ -299,8 +299,7 @@ def get_audio_duration(file_path: str) -> Optional[float]:
         float: Duration in seconds, or None if an error occurs
     """
     try:
-        import wave
-        import contextlib
+        from .audio_probe import probe_audio
         
         abs_path = Path(current_app.root_path) / file_path
         
@@ -311,23 +310,9 @@ def get_audio_duration(file_path: str) -> Optional[float]:
         if not abs_path.exists() or not abs_path.is_file():
             return None
             
-        # Try to get duration using wave module (works for WAV files)
-        try:
-            with contextlib.closing(wave.open(str(abs_path), 'r')) as f:
-                frames = f.getnframes()
-                rate = f.getframerate()
-                return frames / float(rate)
-        except:
-            # Fall back to other methods for non-WAV files
-            try:
-                import mutagen
-                audio = mutagen.File(str(abs_path))
-                if audio is not None and hasattr(audio.info, 'length'):
-                    return audio.info.length
-            except:
-                pass
-                
-        return None
+        # Read the duration from the container header; no samples are decoded
+        info = probe_audio(str(abs_path))
+        return info['duration'] if info else None
     except Exception as e:
         current_app.logger.error(f"Error getting audio duration for {file_path}: {e}")
         return None
@@ -110,6 +110,16 @@ def success_response(data=None, message="Operation successful", **kwargs):
     """Generate a success JSON response."""
     return json_response(data, 200, message, **kwargs)
 
+def can_access(*owner_ids):
+    """Whether the current user may work with data owned by any of ``owner_ids``."""
+    return current_user.is_admin or current_user.is_examiner or \
+        str(current_user.id) in {str(owner_id) for owner_id in owner_ids if owner_id}
+
+def can_access_assessment(assessment):
+    """Whether the current user may work with ``assessment``: staff, its creator or its assignee."""
+    owners = (assessment.created_by, assessment.assigned_to)
+    return can_access(*(user.id for user in owners if user is not None))
+
 def paginate_query(query, page=1, per_page=10):
     """Paginate a query."""
     return query.paginate(page=page, per_page=per_page, error_out=False)
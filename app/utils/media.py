@@ -0,0 +1,81 @@
+"""
+Media Delivery Utilities
+
+Sends stored files (recordings, uploads, previews) after the view has checked
+authorization. Behind nginx the transfer is offloaded with an
+``X-Accel-Redirect`` to an internal location, so the Python worker is freed as
+soon as the headers are sent and nginx handles Range requests itself. Without
+nginx the file is streamed by Werkzeug with ``Range``/``206``, ``ETag`` and
+``If-None-Match``/``If-Range`` support.
+"""
+import os
+import mimetypes
+from typing import Optional
+from urllib.parse import quote
+
+from flask import abort, current_app, send_file
+
+
+def accel_redirect_path(file_path: str) -> Optional[str]:
+    """
+    Map a file to the internal nginx location that serves it.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        str: URI for ``X-Accel-Redirect``, or None if offloading is disabled
+        or the file lies outside ``MEDIA_ACCEL_ROOT``
+    """
+    config = current_app.config
+    if not config.get('MEDIA_ACCEL_REDIRECT'):
+        return None
+
+    root = os.path.abspath(config.get('MEDIA_ACCEL_ROOT') or current_app.root_path)
+    abs_path = os.path.abspath(file_path)
+    if os.path.commonpath([root, abs_path]) != root:
+        return None
+
+    prefix = config.get('MEDIA_ACCEL_PREFIX', '/_protected/').rstrip('/') + '/'
+    return prefix + quote(os.path.relpath(abs_path, root).replace(os.sep, '/'))
+
+
+def send_media(file_path: str, mimetype: Optional[str] = None, download_name: Optional[str] = None,
+               as_attachment: bool = False, max_age: Optional[int] = None):
+    """
+    Send a file, offloading the transfer to nginx when configured.
+
+    Call this only after the caller is authorized to read the file.
+
+    Args:
+        file_path: Path to the file
+        mimetype: Content type (guessed from the name if omitted)
+        download_name: File name presented to the client
+        as_attachment: Send ``Content-Disposition: attachment``
+        max_age: Cache lifetime in seconds, or None for revalidation on every use
+
+    Returns:
+        Response
+    """
+    if not file_path or not os.path.isfile(file_path):
+        abort(404)
+
+    mimetype = mimetype or mimetypes.guess_type(download_name or file_path)[0] or 'application/octet-stream'
+
+    internal_uri = accel_redirect_path(file_path)
+    if internal_uri is None:
+        return send_file(file_path, mimetype=mimetype, as_attachment=as_attachment,
+                         download_name=download_name, conditional=True, etag=True, max_age=max_age)
+
+    # nginx serves the body (with Range and ETag handling) and keeps these headers
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = internal_uri
+    if download_name or as_attachment:
+        name = download_name or os.path.basename(file_path)
+        disposition = 'attachment' if as_attachment else 'inline'
+        response.headers['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(name)}"
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
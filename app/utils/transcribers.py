@@ -0,0 +1,296 @@
+"""
+Speech Recognition Backends
+
+Transcription goes through one small interface, :class:`Transcriber`, with
+pluggable backends:
+
+- ``google``: Google Web Speech via ``speech_recognition`` (network)
+- ``openai``: the OpenAI Whisper API via the shared async client (network)
+- ``whisper_local``: the ``openai-whisper`` model on the local CPU, for
+  air-gapped exam centres; the model is loaded once per process and kept warm
+
+The backend is chosen per deployment with ``TRANSCRIBER_BACKEND`` in
+``config.py``. Every backend takes a slice of an already decoded buffer
+(float or 16-bit PCM samples), so no temporary files are written.
+
+:func:`benchmark` compares latency and throughput of the backends; run it
+with ``python manage.py benchmark_transcribers``.
+"""
+import io
+import time
+import wave
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sample rate every Whisper model expects
+WHISPER_SAMPLE_RATE = 16000
+
+
+def _as_float(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return np.asarray(samples, dtype=np.float32)
+
+
+def _as_pcm16(samples: np.ndarray) -> bytes:
+    if samples.dtype == np.int16:
+        return np.asarray(samples, dtype='<i2').tobytes()
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+class Transcriber:
+    """
+    Speech-to-text backend.
+
+    Subclasses implement :meth:`transcribe`; they must return an empty string
+    when nothing intelligible was said, and may raise on backend failures.
+    """
+
+    name = 'base'
+
+    # Concurrent calls worth making on one instance (1 for CPU-bound engines)
+    max_concurrency = 4
+
+    def cache_params(self, language: str) -> Dict[str, Any]:
+        """Parameters that identify this backend's output (part of the cache key)."""
+        return {'engine': self.name, 'language': language}
+
+    def warm_up(self) -> None:
+        """Load models or open connections ahead of the first request."""
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int, language: str = 'en-US') -> str:
+        """
+        Transcribe mono samples.
+
+        Args:
+            samples: Mono samples, int16 PCM or float in [-1, 1]
+            sample_rate: Sample rate in Hz
+            language: Language code, e.g. ``'en-US'``
+
+        Returns:
+            str: The transcript
+        """
+        raise NotImplementedError
+
+
+class GoogleTranscriber(Transcriber):
+    """Google Web Speech API through ``speech_recognition``."""
+
+    name = 'google'
+
+    def transcribe(self, samples, sample_rate, language='en-US'):
+        import speech_recognition as sr
+
+        audio_data = sr.AudioData(_as_pcm16(samples), sample_rate, 2)
+        try:
+            return sr.Recognizer().recognize_google(audio_data, language=language)
+        except sr.UnknownValueError:
+            logger.warning("Google Speech Recognition could not understand audio")
+            return ""
+
+
+class OpenAIWhisperTranscriber(Transcriber):
+    """OpenAI Whisper API, sent as in-memory WAV through the shared async client."""
+
+    name = 'openai'
+    max_concurrency = 8
+
+    def __init__(self, model: str = 'whisper-1'):
+        self.model = model
+
+    def cache_params(self, language):
+        return {'engine': self.name, 'model': self.model, 'language': language}
+
+    def transcribe(self, samples, sample_rate, language='en-US'):
+        from utils.openai_client import get_client
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(_as_pcm16(samples))
+        return get_client().transcribe_sync(buffer.getvalue(), model=self.model).strip()
+
+
+class LocalWhisperTranscriber(Transcriber):
+    """
+    ``openai-whisper`` on the local CPU.
+
+    Models are shared by every instance in the process and loaded on first use
+    (or by :meth:`warm_up` when a worker starts). Decoding holds a lock, since
+    one model saturates the CPU threads it is given.
+    """
+
+    name = 'whisper_local'
+    max_concurrency = 1
+
+    _models: Dict[tuple, Any] = {}
+    _load_lock = threading.Lock()
+
+    def __init__(self, model: str = 'base.en', device: str = 'cpu', threads: Optional[int] = None,
+                 model_dir: Optional[str] = None):
+        """
+        Args:
+            model: Whisper model name, e.g. ``'base.en'``
+            device: Torch device
+            threads: Torch CPU threads (default: torch's choice)
+            model_dir: Directory holding (pre-downloaded) model weights
+        """
+        self.model_name = model
+        self.device = device
+        self.threads = threads
+        self.model_dir = model_dir
+        self._decode_lock = threading.Lock()
+
+    def cache_params(self, language):
+        return {'engine': self.name, 'model': self.model_name, 'language': language}
+
+    @property
+    def model(self):
+        key = (self.model_name, self.device)
+        model = self._models.get(key)
+        if model is None:
+            with self._load_lock:
+                model = self._models.get(key)
+                if model is None:
+                    import torch
+                    import whisper
+
+                    if self.threads:
+                        torch.set_num_threads(self.threads)
+                    started = time.perf_counter()
+                    model = self._models[key] = whisper.load_model(
+                        self.model_name, device=self.device, download_root=self.model_dir)
+                    logger.info(f"Loaded Whisper model {self.model_name} on {self.device} "
+                                f"in {time.perf_counter() - started:.1f}s")
+        return model
+
+    def warm_up(self):
+        # Loading the weights and one short decode allocate everything the first request needs
+        self.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), WHISPER_SAMPLE_RATE)
+
+    def transcribe(self, samples, sample_rate, language='en-US'):
+        audio = _as_float(samples)
+        if sample_rate != WHISPER_SAMPLE_RATE:
+            import librosa
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=WHISPER_SAMPLE_RATE)
+
+        model = self.model
+        options = {'fp16': self.device != 'cpu', 'condition_on_previous_text': False}
+        # English-only models take no language option
+        if not self.model_name.endswith('.en'):
+            options['language'] = (language or 'en').split('-')[0]
+        with self._decode_lock:
+            result = model.transcribe(audio, **options)
+        return result.get('text', '').strip()
+
+
+BACKENDS = {
+    GoogleTranscriber.name: GoogleTranscriber,
+    OpenAIWhisperTranscriber.name: OpenAIWhisperTranscriber,
+    LocalWhisperTranscriber.name: LocalWhisperTranscriber
+}
+
+_transcribers: Dict[str, Transcriber] = {}
+
+
+def _config() -> Dict[str, Any]:
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        return current_app.config
+    from config import Config
+    return {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+
+def create_transcriber(name: str, config: Optional[Dict[str, Any]] = None) -> Transcriber:
+    """
+    Build a backend by name, configured from ``config`` (default: the app config).
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    config = config if config is not None else _config()
+    if name == LocalWhisperTranscriber.name:
+        return LocalWhisperTranscriber(model=config.get('WHISPER_MODEL', 'base.en'),
+                                       device=config.get('WHISPER_DEVICE', 'cpu'),
+                                       threads=config.get('WHISPER_THREADS'),
+                                       model_dir=config.get('WHISPER_MODEL_DIR'))
+    if name == OpenAIWhisperTranscriber.name:
+        return OpenAIWhisperTranscriber(model=config.get('OPENAI_TRANSCRIPTION_MODEL', 'whisper-1'))
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    raise ValueError(f"Unknown transcriber backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_transcriber(name: Optional[str] = None) -> Transcriber:
+    """
+    Get the process-wide transcriber for ``name`` (default: ``TRANSCRIBER_BACKEND``).
+
+    Returns:
+        Transcriber
+    """
+    config = _config()
+    name = name or config.get('TRANSCRIBER_BACKEND', 'google')
+    transcriber = _transcribers.get(name)
+    if transcriber is None:
+        transcriber = _transcribers[name] = create_transcriber(name, config)
+    return transcriber
+
+
+def benchmark(audio_paths: Iterable[str], backends: Optional[List[str]] = None,
+              repeat: int = 1) -> Dict[str, Any]:
+    """
+    Compare transcription latency and throughput across backends.
+
+    Each backend is warmed up first (the cold start is reported separately),
+    then transcribes every file ``repeat`` times.
+
+    Args:
+        audio_paths: Audio files to transcribe
+        backends: Backend names (default: all)
+        repeat: Passes over the files per backend
+
+    Returns:
+        Dict mapping each backend to its warm-up time, mean and worst latency
+        per file, real-time factor and files per second, or to ``error``
+    """
+    from .audio_processing import decode_audio
+
+    clips = [decode_audio(path, sample_rate=WHISPER_SAMPLE_RATE) for path in audio_paths]
+    audio_seconds = sum(len(samples) / rate for samples, rate in clips) * repeat
+
+    report = {}
+    for name in backends or list(BACKENDS):
+        try:
+            transcriber = create_transcriber(name)
+            started = time.perf_counter()
+            transcriber.warm_up()
+            warm_up = time.perf_counter() - started
+
+            latencies = []
+            for _ in range(repeat):
+                for samples, rate in clips:
+                    started = time.perf_counter()
+                    transcriber.transcribe(samples, rate)
+                    latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            logger.warning(f"Benchmark of {name} failed: {str(e)}")
+            report[name] = {'error': str(e) or e.__class__.__name__}
+            continue
+
+        total = sum(latencies)
+        report[name] = {
+            'warm_up_seconds': warm_up,
+            'mean_latency_seconds': total / len(latencies) if latencies else 0.0,
+            'max_latency_seconds': max(latencies, default=0.0),
+            'real_time_factor': total / audio_seconds if audio_seconds else 0.0,
+            'files_per_second': len(latencies) / total if total else float('inf')
+        }
+    return report
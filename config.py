@@ -82,12 +82,70 @@ class Config:
     
     # OpenAI settings
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # e.g. a local stub server
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 60))  # seconds per request
+    OPENAI_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', 8))
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 4))
+    OPENAI_BREAKER_THRESHOLD = int(os.environ.get('OPENAI_BREAKER_THRESHOLD', 5))  # consecutive failures
+    OPENAI_BREAKER_RESET = float(os.environ.get('OPENAI_BREAKER_RESET', 30))  # seconds
+    
+    # LLM response cache (MongoDB with TTL, in-process LRU in front)
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'True') == 'True'
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 30 * 24 * 3600))  # seconds
+    LLM_CACHE_LRU_SIZE = int(os.environ.get('LLM_CACHE_LRU_SIZE', 512))
     
     # File upload settings
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'app', 'static', 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp3', 'wav', 'ogg'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
     
+    # Background audio processing queue
+    AUDIO_WORKERS = int(os.environ.get('AUDIO_WORKERS', os.cpu_count() or 1))
+    AUDIO_JOB_POLL_INTERVAL = float(os.environ.get('AUDIO_JOB_POLL_INTERVAL', 1.0))  # seconds
+    AUDIO_JOB_STALE_SECONDS = int(os.environ.get('AUDIO_JOB_STALE_SECONDS', 300))
+    AUDIO_JOB_MAX_ATTEMPTS = int(os.environ.get('AUDIO_JOB_MAX_ATTEMPTS', 3))
+    AUDIO_SEGMENTED_TRANSCRIPTION = os.environ.get('AUDIO_SEGMENTED_TRANSCRIPTION', 'True') == 'True'
+    AUDIO_SEGMENT_WORKERS = int(os.environ.get('AUDIO_SEGMENT_WORKERS', 4))  # concurrent recognizer requests
+    
+    # Speech recognition backend: 'google' (Web Speech), 'openai' (Whisper API)
+    # or 'whisper_local' (offline, on the worker's CPU)
+    TRANSCRIBER_BACKEND = os.environ.get('TRANSCRIBER_BACKEND', 'google')
+    OPENAI_TRANSCRIPTION_MODEL = os.environ.get('OPENAI_TRANSCRIPTION_MODEL', 'whisper-1')
+    WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base.en')
+    WHISPER_DEVICE = os.environ.get('WHISPER_DEVICE', 'cpu')
+    WHISPER_MODEL_DIR = os.environ.get('WHISPER_MODEL_DIR')  # pre-downloaded weights for air-gapped sites
+    WHISPER_THREADS = int(os.environ['WHISPER_THREADS']) if os.environ.get('WHISPER_THREADS') else None
+    
+    # Chunked live uploads: completed speech segments are transcribed while the
+    # candidate is still recording
+    LIVE_TRANSCRIPTION_ENABLED = os.environ.get('LIVE_TRANSCRIPTION_ENABLED', 'True') == 'True'
+    LIVE_TRANSCRIPTION_WORKERS = int(os.environ.get('LIVE_TRANSCRIPTION_WORKERS', 2))  # threads per web process
+    
+    # Ingest transcoding: canonical analysis copy + compressed archival tier
+    AUDIO_ANALYSIS_SAMPLE_RATE = int(os.environ.get('AUDIO_ANALYSIS_SAMPLE_RATE', 16000))
+    AUDIO_ARCHIVE_BITRATE = os.environ.get('AUDIO_ARCHIVE_BITRATE', '24k')  # Opus
+    AUDIO_TIER_AFTER_DAYS = int(os.environ.get('AUDIO_TIER_AFTER_DAYS', 30))
+    
+    # Content-hash cache for transcriptions and audio analysis results
+    AUDIO_CACHE_ENABLED = os.environ.get('AUDIO_CACHE_ENABLED', 'True') == 'True'
+    AUDIO_CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR', os.path.join(BASE_DIR, 'instance', 'audio_cache'))
+    AUDIO_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 256MB
+    
+    # Month-partitioned NumPy store of extracted audio feature vectors
+    FEATURE_STORE_ENABLED = os.environ.get('FEATURE_STORE_ENABLED', 'True') == 'True'
+    FEATURE_STORE_DIR = os.environ.get('FEATURE_STORE_DIR', os.path.join(BASE_DIR, 'instance', 'feature_store'))
+    
+    # Review previews (waveform peaks + spectrogram) generated at ingest
+    AUDIO_WAVEFORM_BUCKETS = int(os.environ.get('AUDIO_WAVEFORM_BUCKETS', 1000))
+    AUDIO_PREVIEW_MAX_AGE = int(os.environ.get('AUDIO_PREVIEW_MAX_AGE', 365 * 24 * 3600))  # 1 year
+    
+    # Media delivery: after authorization, hand file transfers to nginx via
+    # X-Accel-Redirect (files under MEDIA_ACCEL_ROOT map to MEDIA_ACCEL_PREFIX;
+    # other files are sent by the app)
+    MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', 'False') == 'True'
+    MEDIA_ACCEL_ROOT = os.environ.get('MEDIA_ACCEL_ROOT', UPLOAD_FOLDER)
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/_protected/')
+    
     # Redis settings (for rate limiting and caching)
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     
@@ -108,6 +166,7 @@ class Config:
     
     # Pagination
     ITEMS_PER_PAGE = 20
+    LIST_COUNT_CACHE_SECONDS = int(os.environ.get('LIST_COUNT_CACHE_SECONDS', 60))  # list totals
     
     # JWT settings
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', secrets.token_hex(32))
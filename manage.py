@@ -64,5 +64,208 @@ def list_users():
         print(f"- {user.email} (ID: {user.id}, Roles: {', '.join(role_names) if role_names else 'None'})")
         print(f"  Active: {user.is_active}, Verified: {user.email_verified}")
 
+@manager.option('-w', '--workers', dest='workers', type=int, default=None,
+                help='Number of worker processes (default: AUDIO_WORKERS)')
+def audio_worker(workers=None):
+    """Run the background audio processing workers."""
+    from app.services.audio_queue import run_workers
+    run_workers(num_workers=workers, config_name=app.config.get('ENV'))
+
+@manager.option('-w', '--workers', dest='workers', type=int, default=None,
+                help='Number of worker processes (default: available cores)')
+@manager.option('-c', '--checkpoint', dest='checkpoint', default='reanalysis.checkpoint',
+                help='Checkpoint file used to resume an interrupted run (removed on completion)')
+@manager.option('-b', '--batch-size', dest='batch_size', type=int, default=100,
+                help='Number of recordings per bulk write')
+@manager.option('-a', '--assessment', dest='assessments', action='append', default=None,
+                help='Restrict to an assessment id (repeatable)')
+def reanalyze_recordings(workers=None, checkpoint='reanalysis.checkpoint', batch_size=100, assessments=None):
+    """Re-run audio quality metrics and feature extraction for all recordings."""
+    from bson import ObjectId
+    from app.models import get_model
+    from app.services.batch_reanalysis import reanalyze_recordings as run_batch
+    
+    collection = get_model('RecordingBucket')._get_collection()
+    assessment_ids = [ObjectId(a) for a in assessments] if assessments else None
+    stats = run_batch(collection, workers=workers, checkpoint_path=checkpoint,
+                      batch_size=batch_size, assessment_ids=assessment_ids)
+    
+    elapsed = max(stats['elapsed_seconds'], 1e-9)
+    print(f"Processed {stats['processed']} recordings ({stats['failed']} failed, "
+          f"{stats['skipped']} skipped) with {stats['workers']} workers in {elapsed:.1f}s")
+    print(f"Throughput: {stats['processed'] / elapsed:.2f} files/s, "
+          f"{stats['audio_seconds'] / elapsed:.1f} seconds of audio/s")
+
+@manager.option('-d', '--days', dest='days', type=int, default=None,
+                help='Minimum age in days of the completed assessment (default: AUDIO_TIER_AFTER_DAYS)')
+@manager.option('-n', '--dry-run', dest='dry_run', action='store_true', default=False,
+                help='Only report how much space would be freed')
+def tier_recordings(days=None, dry_run=False):
+    """Move recordings of old completed/archived assessments to Opus-only storage."""
+    from app.models import get_model
+    from app.services.audio_tiering import tier_recordings as run_tiering
+    
+    days = days if days is not None else app.config.get('AUDIO_TIER_AFTER_DAYS', 30)
+    collection = get_model('Assessment')._get_collection()
+    buckets = get_model('RecordingBucket')._get_collection()
+    stats = run_tiering(collection, buckets, older_than_days=days, dry_run=dry_run)
+    
+    prefix = 'Would archive' if dry_run else 'Archived'
+    print(f"{prefix} {stats['tiered']} recordings ({stats['failed']} failed), "
+          f"freeing {stats['bytes_freed'] / (1024 * 1024):.1f} MB")
+
+@manager.command
+def build_feature_store():
+    """Load stored recording features into the columnar feature store."""
+    from app.models import get_model
+    from app.utils.feature_store import get_feature_store
+    
+    store = get_feature_store()
+    collection = get_model('RecordingBucket')._get_collection()
+    cursor = collection.find(
+        {'recordings.audio_features': {'$exists': True}},
+        {'assessment_id': 1, 'recordings.id': 1, 'recordings.created_at': 1, 'recordings.audio_features': 1}
+    ).batch_size(500)
+    
+    items, written = [], 0
+    for doc in cursor:
+        for recording in doc.get('recordings') or []:
+            if recording.get('id') and recording.get('audio_features'):
+                items.append((recording['id'], recording['audio_features'],
+                              recording.get('created_at'), doc['assessment_id']))
+        if len(items) >= 1000:
+            written += store.add_many(items)
+            items = []
+    written += store.add_many(items)
+    print(f"Stored {written} feature vectors in {store.root_dir} ({', '.join(store.months())})")
+
+@manager.option('-n', '--count', dest='count', type=int, default=200,
+                help='Number of synthetic transcript pairs')
+@manager.option('-l', '--length', dest='length', type=int, default=100,
+                help='Reference length in words')
+def benchmark_wer(count=200, length=100):
+    """Compare the edit-distance WER engine with the old set-overlap score."""
+    from app.utils.wer import benchmark
+    
+    report = benchmark(count=count, length=length)
+    for name, result in report.items():
+        print(f"{name:<22} {result['seconds'] * 1000:9.1f} ms  "
+              f"{result['pairs_per_second']:10.0f} pairs/s  mean WER {result['mean_wer']:.3f}")
+
+@manager.option('-f', '--file', dest='files', action='append', required=True,
+                help='Audio file to transcribe (repeatable)')
+@manager.option('-b', '--backend', dest='backends', action='append', default=None,
+                help='Backend to include (repeatable; default: all)')
+@manager.option('-r', '--repeat', dest='repeat', type=int, default=1,
+                help='Passes over the files per backend')
+def benchmark_transcribers(files=None, backends=None, repeat=1):
+    """Compare latency and throughput of the speech recognition backends."""
+    from app.utils.transcribers import benchmark
+    
+    report = benchmark(files, backends=backends, repeat=repeat)
+    for name, result in report.items():
+        if 'error' in result:
+            print(f"{name:<14} failed: {result['error']}")
+            continue
+        print(f"{name:<14} warm-up {result['warm_up_seconds']:6.2f}s  "
+              f"mean {result['mean_latency_seconds'] * 1000:8.1f} ms  max {result['max_latency_seconds'] * 1000:8.1f} ms  "
+              f"RTF {result['real_time_factor']:.3f}  {result['files_per_second']:.2f} files/s")
+
+@manager.option('-i', '--iterations', dest='iterations', type=int, default=5000,
+                help='Number of fuzzed replies')
+def benchmark_eval_parser(iterations=5000):
+    """Fuzz and benchmark the structured evaluation parser on recorded model replies."""
+    from utils.evaluation_parser import recorded_outputs, fuzz, benchmark
+    
+    outputs = recorded_outputs()
+    counts = fuzz(outputs, iterations=iterations)
+    print(f"Fuzzed {iterations} replies from {len(outputs)} recorded outputs: "
+          f"{counts['accepted']} accepted, {counts['rejected']} rejected, no parser errors")
+    for name, result in benchmark(outputs).items():
+        print(f"{name:<18} {result['seconds'] * 1000:9.1f} ms  {result['replies_per_second']:10.0f} replies/s  "
+              f"{result['complete']}/{len(outputs)} complete")
+
+@manager.option('-a', '--assessment', dest='assessments', action='append', default=None,
+                help='Assessment id to score (repeatable; default: unscored completed assessments)')
+@manager.option('-c', '--concurrency', dest='concurrency', type=int, default=4,
+                help='Maximum requests in flight')
+@manager.option('-t', '--token-budget', dest='token_budget', type=int, default=None,
+                help='Maximum prompt tokens per request')
+@manager.option('-n', '--dry-run', dest='dry_run', action='store_true', default=False,
+                help='Score but do not write the results')
+def evaluate_assessments(assessments=None, concurrency=4, token_budget=None, dry_run=False):
+    """Score many assessments with packed, token-budgeted requests."""
+    from bson import ObjectId
+    from app.models import get_model
+    from app.services.batch_evaluation import evaluate_assessments as run_evaluation, DEFAULT_TOKEN_BUDGET
+    
+    collection = get_model('Assessment')._get_collection()
+    if assessments:
+        ids = [ObjectId(a) for a in assessments]
+    else:
+        ids = collection.distinct('_id', {'status': 'completed', 'overall_score': {'$in': [0, None]}})
+    
+    stats = run_evaluation(collection, ids, token_budget=token_budget or DEFAULT_TOKEN_BUDGET,
+                           concurrency=concurrency, dry_run=dry_run)
+    print(f"Scored {stats['scored']} assessments in {stats['requests']} requests "
+          f"({stats['failed']} failed, {stats['skipped']} without transcripts)")
+    for assessment_id, message in stats['errors'].items():
+        print(f"  {assessment_id}: {message}")
+
+@manager.option('-m', '--model', dest='model', default=None,
+                help='Only drop completions of this model')
+@manager.option('-s', '--namespace', dest='namespace', default=None,
+                help='Only drop entries of this kind (evaluate_response, generate_questions)')
+def clear_llm_cache(model=None, namespace=None):
+    """Invalidate cached LLM completions so the next request calls the API."""
+    from utils.llm_cache import invalidate
+    
+    deleted = invalidate(model=model, namespace=namespace)
+    print(f"Deleted {deleted} cached LLM completions")
+
+@manager.option('-n', '--dry-run', dest='dry_run', action='store_true', default=False,
+                help='Only count what would be moved')
+@manager.option('-b', '--batch-size', dest='batch_size', type=int, default=100,
+                help='Assessments per round of bulk writes')
+def migrate_assessment_buckets(dry_run=False, batch_size=100):
+    """Move embedded questions and recordings into their bucket collections."""
+    from app.services.bucket_migration import migrate_assessments
+    
+    stats = migrate_assessments(dry_run=dry_run, batch_size=batch_size)
+    prefix = 'Would move' if dry_run else 'Moved'
+    print(f"{prefix} {stats['questions']} questions and {stats['recordings']} recordings of "
+          f"{stats['assessments']} assessments into {stats['buckets']} buckets")
+
+@manager.option('-c', '--count', dest='counts', type=int, action='append', default=None,
+                help='Recording count to measure at (repeatable; default: 10 to 500)')
+@manager.option('-w', '--words', dest='words', type=int, default=300,
+                help='Transcript length of each sample recording in words')
+def benchmark_assessment_buckets(counts=None, words=300):
+    """Compare save/load cost of embedded and bucketed recordings."""
+    from app.services.bucket_migration import benchmark
+    
+    kwargs = {'counts': counts} if counts else {}
+    print(f"{'recordings':>10} {'save':>9} {'append':>9} {'load':>9} {'summary':>9} {'buckets':>9} "
+          f"{'doc KB':>9} {'summary KB':>11}")
+    for row in benchmark(transcript_words=words, **kwargs):
+        print(f"{row['recordings']:>10} {row['embedded_save_ms']:>7.2f}ms {row['bucket_append_ms']:>7.2f}ms "
+              f"{row['embedded_load_ms']:>7.2f}ms {row['summary_load_ms']:>7.2f}ms {row['bucket_load_ms']:>7.2f}ms "
+              f"{row['embedded_bytes'] / 1024:>9.1f} {row['summary_bytes'] / 1024:>11.2f}")
+
+@manager.option('-m', '--model', dest='models', action='append',
+                help='Model to measure (repeatable; default: User, Assessment, Notification)')
+@manager.option('-l', '--limit', dest='limit', type=int, default=500, help='Rows read per query')
+@manager.option('-r', '--repeat', dest='repeat', type=int, default=5, help='Queries per mode')
+def benchmark_list_queries(models=None, limit=500, repeat=5):
+    """Compare rows/sec of document, projected, raw and fast() list queries."""
+    from app.services.list_benchmark import benchmark
+    
+    modes = ('documents', 'documents_only', 'as_pymongo', 'fast_rows', 'fast_dicts')
+    print(f"{'model':<14} {'rows':>6} " + ' '.join(f'{mode:>14}' for mode in modes) + f" {'speedup':>8}")
+    for name, result in benchmark(models=models, limit=limit, repeat=repeat).items():
+        rates = ' '.join(f'{result[mode]:>14.0f}' if result.get(mode) else f"{'failed':>14}" for mode in modes)
+        speedup = f"{result['speedup']:>7.1f}x" if result.get('speedup') else f"{'-':>8}"
+        print(f"{name:<14} {result.get('rows', 0):>6} {rates} {speedup}")
+
 if __name__ == "__main__":
     manager.run()
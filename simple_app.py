@@ -6,7 +6,7 @@ A streamlined version of the EP-Simulator application for testing and developmen
 import os
 from datetime import datetime
 from uuid import uuid4
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, send_file
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_bootstrap import Bootstrap
 from mongoengine import connect
@@ -18,9 +18,11 @@ from datetime import datetime
 import os
 from models import User, ExamResult, MediaFile, TestScript
 from app.auth.forms import LoginForm, RegistrationForm
+from app.utils.media import send_media
 from io import BytesIO
 from wtforms import StringField, PasswordField, BooleanField
 from wtforms.validators import DataRequired, Email, Length
+from werkzeug.exceptions import HTTPException
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Initialize extensions
@@ -71,6 +73,12 @@ def create_app():
     # Basic configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-key-please-change-in-production'
     
+    # Media delivery (X-Accel-Redirect offload when running behind nginx)
+    app.config['MEDIA_ACCEL_REDIRECT'] = os.environ.get('MEDIA_ACCEL_REDIRECT', 'False') == 'True'
+    app.config['MEDIA_ACCEL_ROOT'] = os.environ.get(
+        'MEDIA_ACCEL_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'uploads'))
+    app.config['MEDIA_ACCEL_PREFIX'] = os.environ.get('MEDIA_ACCEL_PREFIX', '/_protected/')
+    
     # Disconnect any existing connections
     from mongoengine import disconnect
     disconnect()
@@ -235,13 +243,17 @@ def create_app():
     def view_media(file_id):
         try:
             media = MediaFile.objects.get(file_id=file_id)
-            # Assuming file_path is the path to the actual file
-            return send_file(media.file_path)
+            # Offloaded to nginx when MEDIA_ACCEL_REDIRECT is set, otherwise
+            # streamed with Range/ETag support
+            return send_media(media.file_path, download_name=media.filename)
         except DoesNotExist:
             return jsonify({
                 'success': False,
                 'message': 'Media file not found'
             }), 404
+        except HTTPException:
+            # e.g. the 404 of send_media for a missing file
+            raise
         except Exception as e:
             return jsonify({
                 'success': False,
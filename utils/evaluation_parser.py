@@ -0,0 +1,300 @@
+"""
+Structured evaluation output
+
+The JSON contract ``evaluate_response`` asks the model to follow, and a
+strict validator for it. A reply must be one JSON object of the form::
+
+    {"criteria": {"pronunciation": {"score": 4, "justification": "..."}, ...},
+     "summary": "..."}
+
+with an integer score from 1 to 6 and a non-empty justification for every
+requested criterion. Anything else raises :class:`EvaluationParseError`, so a
+malformed reply is retried instead of silently dropping criteria.
+
+:func:`fuzz` and :func:`benchmark` exercise the validator over recorded
+model outputs (the built-in samples, or ``evaluate_response`` entries in the
+LLM cache); run them with ``python manage.py benchmark_eval_parser``.
+"""
+import json
+import time
+import random
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The six ICAO criteria, used by the recorded samples, fuzzing and benchmark
+CRITERIA = ('pronunciation', 'structure', 'vocabulary', 'fluency', 'comprehension', 'interaction')
+
+# Fields allowed in one criterion's result
+_CRITERION_KEYS = frozenset(('score', 'justification'))
+
+
+class EvaluationParseError(ValueError):
+    """Raised when a model reply does not follow the evaluation schema."""
+
+
+def evaluation_schema(criteria: Iterable[str]) -> Dict[str, Any]:
+    """
+    JSON Schema of an evaluation reply for ``criteria``.
+
+    Args:
+        criteria: Criterion names
+
+    Returns:
+        dict: JSON Schema (draft 2020-12)
+    """
+    criterion = {
+        'type': 'object',
+        'properties': {
+            'score': {'type': 'integer', 'minimum': 1, 'maximum': 6},
+            'justification': {'type': 'string', 'minLength': 1}
+        },
+        'required': ['score', 'justification'],
+        'additionalProperties': False
+    }
+    names = list(criteria)
+    return {
+        'type': 'object',
+        'properties': {
+            'criteria': {
+                'type': 'object',
+                'properties': {name: criterion for name in names},
+                'required': names,
+                'additionalProperties': False
+            },
+            'summary': {'type': 'string'}
+        },
+        'required': ['criteria'],
+        'additionalProperties': False
+    }
+
+
+def _decode(text: str) -> Any:
+    """Decode the reply's JSON object, tolerating a code fence or surrounding prose."""
+    if not isinstance(text, str):
+        raise EvaluationParseError('Reply is not text')
+    text = text.strip()
+    if not text.startswith('{'):
+        start = text.find('{')
+        if start < 0:
+            raise EvaluationParseError('Reply contains no JSON object')
+        text = text[start:text.rfind('}') + 1]
+    elif not text.endswith('}'):
+        text = text[:text.rfind('}') + 1]
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, RecursionError) as e:
+        raise EvaluationParseError(f'Reply is not valid JSON: {str(e)}') from e
+
+
+def parse_evaluation(text: str, criteria: Iterable[str]) -> Dict[str, Any]:
+    """
+    Validate an evaluation reply against the schema.
+
+    Args:
+        text: Completion text
+        criteria: Criterion names that must all be present
+
+    Returns:
+        dict: ``scores`` (criterion -> float), ``justifications``
+        (criterion -> str) and ``summary``
+
+    Raises:
+        EvaluationParseError: On any deviation from the schema
+    """
+    data = _decode(text)
+    if not isinstance(data, dict):
+        raise EvaluationParseError('Reply is not a JSON object')
+    unknown = set(data) - {'criteria', 'summary'}
+    if unknown:
+        raise EvaluationParseError(f"Unknown keys: {', '.join(sorted(unknown))}")
+
+    results = data.get('criteria')
+    if not isinstance(results, dict):
+        raise EvaluationParseError('"criteria" is missing or not an object')
+    summary = data.get('summary', '')
+    if not isinstance(summary, str):
+        raise EvaluationParseError('"summary" is not a string')
+
+    names = list(criteria)
+    unknown = set(results) - set(names)
+    if unknown:
+        raise EvaluationParseError(f"Unknown criteria: {', '.join(sorted(unknown))}")
+
+    scores, justifications = {}, {}
+    for name in names:
+        result = results.get(name)
+        if not isinstance(result, dict):
+            raise EvaluationParseError(f'{name} is missing or not an object')
+        if result.keys() - _CRITERION_KEYS:
+            raise EvaluationParseError(f"Unknown keys in {name}: {', '.join(sorted(result.keys() - _CRITERION_KEYS))}")
+        score = result.get('score')
+        if type(score) is not int:
+            # Accept 4.0 but not 4.5, "4" or true
+            if type(score) is not float or not score.is_integer():
+                raise EvaluationParseError(f'{name} score is not an integer')
+        if not 1 <= score <= 6:
+            raise EvaluationParseError(f'{name} score is out of range: {score}')
+        justification = result.get('justification')
+        if not isinstance(justification, str) or not justification.strip():
+            raise EvaluationParseError(f'{name} justification is missing')
+        scores[name] = float(score)
+        justifications[name] = justification.strip()
+
+    return {'scores': scores, 'justifications': justifications, 'summary': summary.strip()}
+
+
+def format_instructions(criteria: Dict[str, str]) -> str:
+    """Prompt text describing the reply contract for ``criteria`` (name -> description)."""
+    lines = [f"- {name}: {description}" for name, description in criteria.items()]
+    example = {'criteria': {name: {'score': '<integer 1-6>', 'justification': '<one or two sentences>'}
+                            for name in criteria},
+               'summary': '<overall comment>'}
+    return ('\n'.join(lines) +
+            '\n\nReply with exactly one JSON object and nothing else, following this JSON Schema:\n' +
+            json.dumps(evaluation_schema(criteria)) +
+            '\n\nFor example:\n' + json.dumps(example))
+
+
+def _legacy_parse(evaluation: str) -> Dict[str, float]:
+    """The former colon/float line scanner, kept only for benchmarking."""
+    scores = {}
+    for line in evaluation.split('\n'):
+        if ':' in line:
+            criterion, score_text = line.split(':', 1)
+            criterion = criterion.strip().lower()
+            for word in score_text.split():
+                try:
+                    score = float(word)
+                    if 1 <= score <= 6:
+                        scores[criterion] = score
+                        break
+                except (ValueError, AttributeError):
+                    pass
+    return scores
+
+
+def _sample(scores, fence=False, prose=False):
+    reply = json.dumps({
+        'criteria': {name: {'score': score, 'justification': f'{name.capitalize()} is consistent with level {score}: '
+                            'the candidate handled routine phraseology but hesitated on non-routine topics.'}
+                     for name, score in zip(CRITERIA, scores)},
+        'summary': 'Operational level overall.'
+    }, indent=2)
+    if fence:
+        reply = f'```json\n{reply}\n```'
+    if prose:
+        reply = f'Here is my evaluation:\n{reply}\nLet me know if you need more detail.'
+    return reply
+
+
+# Representative replies seen from the model: clean, fenced, wrapped in
+# prose, and the malformed shapes the retry path has to catch
+RECORDED_OUTPUTS = (
+    _sample((4, 4, 4, 4, 5, 4)),
+    _sample((3, 4, 3, 4, 4, 3), fence=True),
+    _sample((5, 5, 4, 5, 5, 5), prose=True),
+    _sample((6, 6, 6, 6, 6, 6)),
+    _sample((4, 4, 4, 4, 5, 4))[:-40],  # cut off at max_tokens
+    _sample((4, 4, 4, 4, 5, 4)).replace('"score": 4', '"score": "4"', 1),
+    _sample((4, 4, 7, 4, 5, 4)),
+    '{"criteria": {"pronunciation": {"score": 4, "justification": "Clear."}}}',
+    "Pronunciation: 4 - Generally intelligible with some L1 influence.\n"
+    "Structure: 4 - Basic structures are controlled.\nVocabulary: 4 - Adequate range.\n"
+    "Fluency: 4 - Appropriate tempo.\nComprehension: 5 - Understands most situations.\n"
+    "Interaction: 4 - Responses are immediate and appropriate.",
+)
+
+
+def recorded_outputs(limit: int = 500) -> List[str]:
+    """
+    Model replies to test the parser on: cached ``evaluate_response`` replies
+    when the LLM cache is reachable, plus the built-in samples.
+    """
+    outputs = list(RECORDED_OUTPUTS)
+    try:
+        from app.models.llm_cache import LLMCacheEntry
+        outputs += list(LLMCacheEntry.objects(namespace='evaluate_response').limit(limit).scalar('response'))
+    except Exception as e:
+        logger.info(f"Using built-in samples only: {str(e)}")
+    return outputs
+
+
+def _mutate(text: str, rng: random.Random) -> str:
+    """Corrupt a reply the ways model output goes wrong: truncation, noise, edits."""
+    if not text:
+        return text
+    roll = rng.random()
+    position = rng.randrange(len(text))
+    if roll < 0.25:
+        return text[:position]
+    if roll < 0.5:
+        return text[:position] + rng.choice('{}[]":,0123456789-. \n\\x') + text[position + 1:]
+    if roll < 0.7:
+        return text[:position] + text[position + rng.randint(1, 20):]
+    if roll < 0.85:
+        return text.replace(str(rng.randint(1, 6)), rng.choice(['0', '7', '4.5', 'null', '"5"', 'true']), 1)
+    return text[:position] + rng.choice(['{', '[', '{"criteria": ', '"summary": 1, ']) + text[position:]
+
+
+def fuzz(outputs: Optional[List[str]] = None, iterations: int = 5000, seed: int = 0) -> Dict[str, int]:
+    """
+    Feed mutated recorded outputs to the parser.
+
+    Every input must either parse into a complete, in-range result or raise
+    :class:`EvaluationParseError`; anything else is a parser bug.
+
+    Returns:
+        dict: Counts of ``accepted`` and ``rejected`` inputs
+
+    Raises:
+        AssertionError: If the parser raises another error or accepts an invalid result
+    """
+    rng = random.Random(seed)
+    outputs = outputs or list(RECORDED_OUTPUTS)
+    counts = {'accepted': 0, 'rejected': 0}
+    for _ in range(iterations):
+        text = _mutate(rng.choice(outputs), rng)
+        try:
+            result = parse_evaluation(text, CRITERIA)
+        except EvaluationParseError:
+            counts['rejected'] += 1
+            continue
+        except Exception as e:
+            raise AssertionError(f'Parser raised {e.__class__.__name__} on {text!r}') from e
+        assert set(result['scores']) == set(CRITERIA), text
+        assert all(1 <= score <= 6 for score in result['scores'].values()), text
+        assert all(result['justifications'][name] for name in CRITERIA), text
+        counts['accepted'] += 1
+    return counts
+
+
+def benchmark(outputs: Optional[List[str]] = None, repeat: int = 200) -> Dict[str, Any]:
+    """
+    Time the schema validator against the former line scanner.
+
+    Returns:
+        Dict mapping each parser to its total seconds, replies/s and the
+        number of replies it produced a complete result for
+    """
+    outputs = outputs or list(RECORDED_OUTPUTS)
+
+    def strict(text):
+        try:
+            return parse_evaluation(text, CRITERIA)['scores']
+        except EvaluationParseError:
+            return {}
+
+    report = {}
+    for name, parse in (('line_scanner', _legacy_parse), ('schema_validator', strict)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            results = [parse(text) for text in outputs]
+        elapsed = time.perf_counter() - started
+        report[name] = {
+            'seconds': elapsed,
+            'replies_per_second': repeat * len(outputs) / elapsed if elapsed else float('inf'),
+            'complete': sum(1 for scores in results if set(CRITERIA) <= set(scores))
+        }
+    return report
@@ -0,0 +1,242 @@
+"""
+LLM response cache
+
+Caches chat completions keyed by (model, normalized prompt, parameters), so
+re-evaluating an assessment with the same transcript and criteria, re-rendering
+a result or retrying ``/api/evaluate`` does not call the API again.
+
+Lookups go through a small in-process LRU first and then the ``llm_cache``
+MongoDB collection (:class:`app.models.llm_cache.LLMCacheEntry`), whose TTL
+index expires old entries. If the database is unavailable the cache degrades
+to the in-process LRU.
+
+Admin tooling can bypass a lookup (``use_cache=False``), force a fresh
+completion (``refresh=True``) or drop entries with :func:`invalidate` and
+``python manage.py clear_llm_cache``.
+"""
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import Config
+from utils.openai_client import get_client, request_key
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(messages: List[Dict[str, str]]) -> List[List[str]]:
+    """
+    Normalize chat messages for keying.
+
+    Runs of whitespace (including the indentation of triple-quoted prompt
+    templates) collapse to one space and the ends are trimmed; case and
+    punctuation are kept since they can change the completion.
+    """
+    return [[m.get('role', ''), _WHITESPACE.sub(' ', m.get('content') or '').strip()] for m in messages]
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], **params) -> str:
+    """Key for a completion of ``messages`` by ``model`` with ``params``."""
+    return request_key('llm', model, normalize_prompt(messages), params)
+
+
+class LLMCache:
+    """
+    Two-level completion cache: in-process LRU in front of MongoDB.
+    """
+
+    def __init__(self, ttl_seconds: int = 30 * 24 * 3600, lru_size: int = 512, enabled: bool = True):
+        """
+        Args:
+            ttl_seconds: Lifetime of a persisted entry
+            lru_size: Maximum number of entries held in process
+            enabled: When False every lookup is a miss and nothing is stored
+        """
+        self.ttl_seconds = ttl_seconds
+        self.lru_size = lru_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model():
+        from app.models.llm_cache import LLMCacheEntry
+        return LLMCacheEntry
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached completion, or None."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return value
+
+        try:
+            value = self._model().lookup(key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+        self._remember(key, value)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, model: str, value: str, namespace: Optional[str] = None,
+            params: Optional[Dict[str, Any]] = None) -> None:
+        """Store a completion in both levels."""
+        if not self.enabled or not value:
+            return
+        self._remember(key, value)
+        try:
+            self._model().store(key, model, value, self.ttl_seconds, namespace=namespace, params=params)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def invalidate(self, key: Optional[str] = None, model: Optional[str] = None,
+                   namespace: Optional[str] = None) -> int:
+        """
+        Drop cached entries.
+
+        With a ``key`` only that entry is removed; otherwise every entry
+        matching ``model`` and/or ``namespace`` (all entries if neither is given).
+
+        Returns:
+            int: Number of persisted entries deleted
+        """
+        query = {}
+        if key:
+            query['key'] = key
+        if model:
+            query['model'] = model
+        if namespace:
+            query['namespace'] = namespace
+
+        with self._lock:
+            if key:
+                self._lru.pop(key, None)
+            else:
+                # The LRU does not record model or namespace; start it afresh
+                self._lru.clear()
+
+        try:
+            return self._model().objects(**query).delete()
+        except Exception as e:
+            logger.warning(f"LLM cache invalidation failed: {str(e)}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """In-process hit statistics."""
+        with self._lock:
+            size = len(self._lru)
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'lru_entries': size
+        }
+
+
+_cache = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the process-wide cache configured from ``Config``."""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache(
+            ttl_seconds=Config.LLM_CACHE_TTL,
+            lru_size=Config.LLM_CACHE_LRU_SIZE,
+            enabled=Config.LLM_CACHE_ENABLED
+        )
+    return _cache
+
+
+def cached_chat(messages: List[Dict[str, str]], model: str = 'gpt-4', temperature: float = 0.3,
+                max_tokens: int = 1000, namespace: Optional[str] = None,
+                use_cache: bool = True, refresh: bool = False) -> str:
+    """
+    Get a chat completion, served from the cache when possible.
+
+    Args:
+        messages: Chat messages
+        model: Model name
+        temperature: Sampling temperature
+        max_tokens: Completion token limit
+        namespace: Label stored with the entry (e.g. ``'evaluate_response'``)
+        use_cache: When False the cache is neither read nor written
+        refresh: Skip the lookup but store the new completion
+
+    Returns:
+        str: The completion text
+    """
+    cache = get_llm_cache()
+    params = {'temperature': temperature, 'max_tokens': max_tokens}
+    key = cache_key(model, messages, **params)
+
+    if use_cache and not refresh:
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    content = get_client().chat_sync(messages=messages, model=model, **params)
+    if use_cache:
+        cache.set(key, model, content, namespace=namespace, params=params)
+    return content
+
+
+def stream_cached_chat(messages: List[Dict[str, str]], model: str = 'gpt-4', temperature: float = 0.3,
+                       max_tokens: int = 1000, namespace: Optional[str] = None,
+                       use_cache: bool = True, refresh: bool = False) -> Iterator[str]:
+    """
+    Stream a chat completion, or replay it in one piece from the cache.
+
+    Takes the same arguments as :func:`cached_chat` and shares its cache
+    entries. A completion is only stored once the stream has finished.
+
+    Yields:
+        str: Content deltas
+    """
+    cache = get_llm_cache()
+    params = {'temperature': temperature, 'max_tokens': max_tokens}
+    key = cache_key(model, messages, **params)
+
+    if use_cache and not refresh:
+        content = cache.get(key)
+        if content is not None:
+            yield content
+            return
+
+    parts = []
+    for delta in get_client().stream_chat_sync(messages=messages, model=model, **params):
+        parts.append(delta)
+        yield delta
+    if use_cache:
+        cache.set(key, model, ''.join(parts).strip(), namespace=namespace, params=params)
+
+
+def invalidate(key: Optional[str] = None, model: Optional[str] = None,
+               namespace: Optional[str] = None) -> int:
+    """Drop cached completions; see :meth:`LLMCache.invalidate`."""
+    return get_llm_cache().invalidate(key=key, model=model, namespace=namespace)
@@ -0,0 +1,459 @@
+"""
+Async OpenAI client layer
+
+Wraps ``openai.AsyncOpenAI`` with the controls the evaluation endpoints need:
+
+- a semaphore bounding concurrent API calls per process
+- retries with exponential backoff and full jitter (honouring Retry-After)
+- a circuit breaker that fails fast while the API is unhealthy
+- single-flight coalescing, so identical in-flight prompts or transcriptions
+  share one API call
+- streaming of chat completions as they are generated
+
+Flask routes are synchronous, so the client runs on one background event loop
+per process and exposes ``*_sync`` wrappers (iterators for streams). Point
+``OPENAI_BASE_URL`` at a local server (see ``utils/openai_stub.py``) to
+exercise it without network.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Union
+
+import openai
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker rejects a call."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    A trial that ends without an outcome (cancelled, or an error unrelated to
+    API health) must be released with :meth:`release_trial`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may proceed.
+
+        Returns:
+            bool: True if the call is the half-open trial
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight):
+                raise CircuitOpenError('OpenAI circuit breaker is open')
+            if state == self.HALF_OPEN:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """End the half-open trial without an outcome, so the next call is the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so one cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+def request_key(*parts: Any) -> str:
+    """Stable hash of a request's model, inputs and parameters."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AsyncOpenAIClient:
+    """
+    Concurrency-limited, retrying, coalescing OpenAI client.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_concurrency: int = 8, max_retries: int = 4, timeout: float = 60.0,
+                 backoff_base: float = 0.5, backoff_cap: float = 20.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            api_key: OpenAI API key
+            base_url: API base URL (e.g. a local stub server)
+            max_concurrency: Maximum simultaneous API calls
+            max_retries: Retries after the first attempt for retryable errors
+            timeout: Per-request timeout in seconds
+            backoff_base: First backoff ceiling in seconds
+            backoff_cap: Maximum backoff ceiling in seconds
+            breaker: Circuit breaker (default: 5 failures, 30 s reset)
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.single_flight = SingleFlight()
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        # Created lazily so both belong to the loop that first uses them
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key or 'not-set',
+                base_url=self.base_url or None,
+                timeout=self.timeout,
+                max_retries=0  # retries are handled here, with jitter and the breaker
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if longer."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            delay = max(delay, min(float(retry_after), self.backoff_cap))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    async def _call(self, make_request: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run one API request under the semaphore, breaker and retry policy."""
+        client = self._ensure_client()
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                async with self._semaphore:
+                    result = await make_request(client)
+            except _RETRYABLE_ERRORS as e:
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                error = e
+            except openai.APIStatusError:
+                # Client errors say nothing about API health
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                if trial:
+                    # Cancellation and other errors leave no outcome
+                    self.breaker.release_trial()
+
+            delay = self._backoff(attempt, error)
+            logger.warning(f"OpenAI call failed ({error.__class__.__name__}), retrying in {delay:.2f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = 'gpt-4',
+                   temperature: float = 0.3, max_tokens: int = 1000, **params) -> str:
+        """
+        Get a chat completion's text, coalescing identical in-flight requests.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            **params: Extra parameters for ``chat.completions.create``
+
+        Returns:
+            str: The first choice's content
+        """
+        key = request_key('chat', model, messages, temperature, max_tokens, params)
+
+        async def request():
+            response = await self._call(lambda client: client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature,
+                max_tokens=max_tokens, n=1, **params))
+            return (response.choices[0].message.content or '').strip()
+
+        return await self.single_flight.do(key, request)
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: str = 'gpt-4',
+                          temperature: float = 0.3, max_tokens: int = 1000,
+                          **params) -> AsyncIterator[str]:
+        """
+        Stream a chat completion's text as it is generated.
+
+        The request holds a semaphore slot until the stream ends. Only opening
+        the stream is retried; an error after the first chunk is raised, since
+        the caller may already have used the partial text.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            **params: Extra parameters for ``chat.completions.create``
+
+        Yields:
+            str: Content deltas of the first choice
+        """
+        client = self._ensure_client()
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                await self._semaphore.acquire()
+            except BaseException:
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            try:
+                stream = await client.chat.completions.create(
+                    model=model, messages=messages, temperature=temperature,
+                    max_tokens=max_tokens, n=1, stream=True, **params)
+            except _RETRYABLE_ERRORS as e:
+                self._semaphore.release()
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"OpenAI stream failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._semaphore.release()
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            break
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except _RETRYABLE_ERRORS:
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            # A stream closed early (client disconnect) leaves no outcome
+            if trial:
+                self.breaker.release_trial()
+            self._semaphore.release()
+            await stream.close()
+
+    async def transcribe(self, audio: Union[str, bytes], model: str = 'whisper-1', key: Optional[str] = None,
+                         filename: str = 'audio.wav') -> str:
+        """
+        Transcribe audio, coalescing concurrent requests for the same audio.
+
+        Args:
+            audio: Path to the audio file, or the encoded file's bytes
+            model: Transcription model
+            key: Coalescing key, e.g. the audio's content hash (default: path or bytes hash)
+            filename: Upload name for ``audio`` bytes; its extension tells the API the format
+
+        Returns:
+            str: The transcript
+        """
+        if isinstance(audio, (bytes, bytearray)):
+            key = request_key('transcribe', model, key or hashlib.sha256(audio).hexdigest())
+        else:
+            key = request_key('transcribe', model, key or os.path.abspath(audio))
+
+        async def make_request(client):
+            if isinstance(audio, (bytes, bytearray)):
+                return await client.audio.transcriptions.create(model=model, file=(filename, bytes(audio)))
+            with open(audio, 'rb') as audio_file:
+                return await client.audio.transcriptions.create(model=model, file=audio_file)
+
+        async def request():
+            response = await self._call(make_request)
+            return response.text
+
+        return await self.single_flight.do(key, request)
+
+    # Sync wrappers for Flask routes
+
+    def chat_sync(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """Blocking :meth:`chat`, run on the shared background loop."""
+        return run_sync(self.chat(*args, **kwargs), timeout=timeout)
+
+    def transcribe_sync(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """Blocking :meth:`transcribe`, run on the shared background loop."""
+        return run_sync(self.transcribe(*args, **kwargs), timeout=timeout)
+
+    def stream_chat_sync(self, *args, **kwargs) -> Iterator[str]:
+        """Blocking iterator over :meth:`stream_chat`, run on the shared background loop."""
+        return iter_sync(self.stream_chat(*args, **kwargs))
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Start (once per process) the event loop that all sync callers share."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='openai-client-loop', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background loop and wait for its result.
+
+    Sharing one loop lets requests from different Flask threads be coalesced
+    and limited by the same semaphore.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    return future.result(timeout)
+
+
+def iter_sync(agen: AsyncIterator[Any], timeout: Optional[float] = None) -> Iterator[Any]:
+    """
+    Iterate an async generator from synchronous code.
+
+    The generator runs on the shared background loop and hands items over
+    through a queue. Closing the returned iterator early (e.g. when a client
+    disconnects from a streamed response) cancels the generator.
+
+    Args:
+        agen: Async generator to drain
+        timeout: Maximum seconds to wait for each item
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except Exception as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+    try:
+        while True:
+            item, error = items.get(timeout=timeout)
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+_client = None
+
+
+def get_client() -> AsyncOpenAIClient:
+    """Get the process-wide client configured from ``Config``."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAIClient(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            max_concurrency=Config.OPENAI_MAX_CONCURRENCY,
+            max_retries=Config.OPENAI_MAX_RETRIES,
+            timeout=Config.OPENAI_TIMEOUT,
+            breaker=CircuitBreaker(Config.OPENAI_BREAKER_THRESHOLD, Config.OPENAI_BREAKER_RESET)
+        )
+    return _client
@@ -0,0 +1,229 @@
+"""
+Local OpenAI stub server
+
+A minimal stand-in for the OpenAI HTTP API, for exercising
+``utils/openai_client.py`` without network access. It answers
+``/v1/chat/completions`` with a fixed ICAO-style evaluation (JSON when the
+prompt carries a schema), a list of questions, or JSON scores for packed
+batch evaluations, streamed when the request asks for it, and
+``/v1/audio/transcriptions`` with a fixed transcript, and can inject latency,
+transient failures and malformed replies.
+
+Usage::
+
+    python -m utils.openai_stub --port 8099 --latency 0.2 --fail-first 2
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python app.py
+
+``GET /stats`` returns the number of requests served per endpoint;
+``StubState.peak_in_flight`` is the most requests handled at once.
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EVALUATION = """Pronunciation: 4 - Generally intelligible with some L1 influence.
+Structure: 4 - Basic structures are controlled; complex ones contain errors.
+Vocabulary: 4 - Adequate range for common aviation topics.
+Fluency: 4 - Produces stretches of language at an appropriate tempo.
+Comprehension: 5 - Understands most routine and non-routine situations.
+Interaction: 4 - Responses are immediate and appropriate."""
+
+QUESTIONS = """What would you do if the weather deteriorated below minimums?
+How would you report a bird strike to ATC?
+Describe how you would handle a radio failure during approach."""
+
+EVALUATION_JSON = json.dumps({
+    'criteria': {
+        'pronunciation': {'score': 4, 'justification': 'Generally intelligible with some L1 influence.'},
+        'structure': {'score': 4, 'justification': 'Basic structures are controlled; complex ones contain errors.'},
+        'vocabulary': {'score': 4, 'justification': 'Adequate range for common aviation topics.'},
+        'fluency': {'score': 4, 'justification': 'Produces stretches of language at an appropriate tempo.'},
+        'comprehension': {'score': 5, 'justification': 'Understands most routine and non-routine situations.'},
+        'interaction': {'score': 4, 'justification': 'Responses are immediate and appropriate.'}
+    },
+    'summary': 'Operational level (4).'
+})
+
+BATCH_SCORES = {'pronunciation': 4, 'structure': 4, 'vocabulary': 4,
+                'fluency': 4, 'comprehension': 5, 'interaction': 4}
+
+TRANSCRIPT = "Tower, Speedbird one two three, ready for departure runway two seven."
+
+
+class StubState:
+    """Request counters and failure injection shared by all handler threads."""
+
+    def __init__(self, latency=0.0, fail_first=0, fail_status=503, token_latency=0.0, malformed_first=0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.fail_remaining = fail_first
+        self.malformed_remaining = malformed_first
+        self.fail_status = fail_status
+        self.counts = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def next_failure(self):
+        with self.lock:
+            if self.fail_remaining > 0:
+                self.fail_remaining -= 1
+                return self.fail_status
+            return None
+
+    def next_malformed(self):
+        with self.lock:
+            if self.malformed_remaining > 0:
+                self.malformed_remaining -= 1
+                return True
+            return False
+
+    def count(self, path):
+        with self.lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, model, content):
+            # Server-sent chunks, one word (with its whitespace) per delta
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            try:
+                for delta in re.findall(r'\S+\s*', content):
+                    if state.token_latency:
+                        time.sleep(state.token_latency)
+                    chunk = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model, 'choices': [{'index': 0, 'delta': {'content': delta}, 'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading
+            self.close_connection = True
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/stats'):
+                with state.lock:
+                    return self._send(200, dict(state.counts))
+            self._send(404, {'error': {'message': 'Not found'}})
+
+        def do_POST(self):
+            state.enter()
+            try:
+                self._post()
+            finally:
+                state.leave()
+
+        def _post(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            path = self.path.split('?')[0]
+            state.count(path)
+
+            if state.latency:
+                time.sleep(state.latency)
+
+            status = state.next_failure()
+            if status:
+                return self._send(status, {'error': {'message': 'Injected failure', 'type': 'server_error'}},
+                                  {'Retry-After': '0'} if status == 429 else None)
+
+            if path.endswith('/chat/completions'):
+                request = json.loads(body or b'{}')
+                prompt = '\n'.join(m.get('content', '') for m in request.get('messages', []))
+                candidates = re.findall(r'^### Candidate (\S+)', prompt, re.MULTILINE)
+                if candidates:
+                    # Packed batch evaluation: one JSON result per candidate
+                    content = json.dumps({'results': [dict(BATCH_SCORES, id=c) for c in candidates]})
+                elif 'JSON Schema' in prompt:
+                    # Structured evaluation; optionally cut short to exercise the retry path
+                    content = EVALUATION_JSON[:len(EVALUATION_JSON) // 2] if state.next_malformed() else EVALUATION_JSON
+                else:
+                    content = QUESTIONS if 'question' in prompt.lower() and 'proficiency' not in prompt.lower() else EVALUATION
+                if request.get('stream'):
+                    return self._stream(request.get('model', 'gpt-4'), content)
+                return self._send(200, {
+                    'id': 'chatcmpl-stub',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'gpt-4'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                              'total_tokens': (len(prompt) + len(content)) // 4}
+                })
+
+            if path.endswith('/audio/transcriptions'):
+                return self._send(200, {'text': TRANSCRIPT})
+
+            self._send(404, {'error': {'message': f'Unknown endpoint {path}'}})
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8099, latency=0.0, fail_first=0, fail_status=503, token_latency=0.0,
+          malformed_first=0):
+    """
+    Start the stub server in a background thread.
+
+    Returns:
+        tuple: (server, state); call ``server.shutdown()`` to stop it
+    """
+    state = StubState(latency=latency, fail_first=fail_first, fail_status=fail_status,
+                      token_latency=token_latency, malformed_first=malformed_first)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local OpenAI API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--token-latency', type=float, default=0.0,
+                        help='Seconds between streamed chunks')
+    parser.add_argument('--fail-first', type=int, default=0, help='Fail this many requests first')
+    parser.add_argument('--malformed-first', type=int, default=0,
+                        help='Truncate this many structured evaluation replies first')
+    parser.add_argument('--fail-status', type=int, default=503, help='Status code of injected failures')
+    args = parser.parse_args()
+
+    server, _ = serve(args.host, args.port, args.latency, args.fail_first, args.fail_status, args.token_latency,
+                      args.malformed_first)
+    print(f"OpenAI stub listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
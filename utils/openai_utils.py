@@ -1,52 +1,71 @@
-import openai
 import os
-from config import Config
 from datetime import datetime
+from app.utils.audio_cache import get_audio_cache, audio_digest
+from utils.openai_client import get_client
+from utils.llm_cache import cached_chat, stream_cached_chat, cache_key, get_llm_cache, invalidate
+from utils.evaluation_parser import EvaluationParseError, format_instructions, parse_evaluation
 
-# Configure OpenAI
-openai.api_key = Config.OPENAI_API_KEY
+# The six ICAO rating criteria; each maps to an ``<name>_score`` field on Assessment
+ICAO_CRITERIA = {
+    'pronunciation': "Assess the pronunciation, stress, rhythm, and intonation",
+    'structure': "Evaluate the accuracy and variety of grammatical structures",
+    'vocabulary': "Assess the range and appropriateness of vocabulary",
+    'fluency': "Evaluate the flow, speed, and coherence of speech",
+    'comprehension': "Assess the understanding of questions and responses",
+    'interaction': "Evaluate the ability to maintain and develop the conversation"
+}
 
 def transcribe_audio(audio_file_path):
     """
     Transcribe audio using OpenAI Whisper
+
+    Results are cached by the SHA-256 of the audio bytes, so retries and
+    re-uploads of the same recording do not call the API again.
     """
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            response = openai.Audio.transcribe(
-                model="whisper-1",
-                file=audio_file
-            )
-        return response['text']
+        cache = get_audio_cache()
+        digest = audio_digest(audio_file_path)
+        key = cache.make_key(digest, 'transcription', {'engine': 'whisper-1'})
+        # Concurrent requests for the same audio share one API call
+        return cache.get_or_compute(key, lambda: get_client().transcribe_sync(
+            audio_file_path, model="whisper-1", key=digest))
     except Exception as e:
         print(f"Error in transcription: {str(e)}")
         return None
 
-def generate_questions(transcript, context=None, num_questions=3):
-    """
-    Generate follow-up questions based on the transcript using GPT-4
-    """
-    try:
-        prompt = f"""Based on the following transcript, generate {num_questions} relevant follow-up questions:
+def _question_messages(transcript, context, num_questions):
+    prompt = f"""Based on the following transcript, generate {num_questions} relevant follow-up questions:
         
         Transcript: {transcript}
         
         Context: {context or 'No specific context provided'}
         
         Questions (one per line):"""
-        
-        response = openai.ChatCompletion.create(
+    return [
+        {"role": "system", "content": "You are a helpful assistant that generates relevant follow-up questions."},
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_questions(transcript, context=None, num_questions=3, use_cache=True, refresh=False):
+    """
+    Generate follow-up questions based on the transcript using GPT-4
+
+    Completions are cached by (model, normalized prompt, parameters); pass
+    ``use_cache=False`` to bypass the cache or ``refresh=True`` to replace the
+    cached entry.
+    """
+    try:
+        content = cached_chat(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates relevant follow-up questions."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_question_messages(transcript, context, num_questions),
             max_tokens=500,
-            n=1,
-            stop=None,
             temperature=0.7,
+            namespace="generate_questions",
+            use_cache=use_cache,
+            refresh=refresh,
         )
         
-        questions = response.choices[0].message['content'].strip().split('\n')
+        questions = content.split('\n')
         questions = [q.strip() for q in questions if q.strip()]
         
         return questions[:num_questions]  # Return only the requested number of questions
@@ -54,64 +73,102 @@ def generate_questions(transcript, context=None, num_questions=3):
         print(f"Error generating questions: {str(e)}")
         return []
 
-def evaluate_response(transcript, criteria=None):
+def stream_questions(transcript, context=None, num_questions=3, use_cache=True, refresh=False):
+    """
+    Generate follow-up questions like :func:`generate_questions`, yielding
+    each question as soon as the model has finished its line
+
+    Shares the same cache entries as :func:`generate_questions`. Errors are
+    raised to the caller, which may already have sent earlier questions.
+    """
+    buffer, count = '', 0
+    deltas = stream_cached_chat(
+        model="gpt-4",
+        messages=_question_messages(transcript, context, num_questions),
+        max_tokens=500,
+        temperature=0.7,
+        namespace="generate_questions",
+        use_cache=use_cache,
+        refresh=refresh,
+    )
+    for delta in deltas:
+        buffer += delta
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            if line.strip() and count < num_questions:
+                count += 1
+                yield line.strip()
+    if buffer.strip() and count < num_questions:
+        yield buffer.strip()
+
+def _evaluation_messages(transcript, criteria):
+    prompt = f"""Evaluate the following pilot's response based on ICAO language proficiency criteria (scale 1-6, where 6 is expert level):
+        
+        Response: {transcript}
+        
+        Provide a score and a brief justification for each criterion:
+"""
+    prompt += format_instructions(criteria)
+    return [
+        {"role": "system", "content": "You are an ICAO language proficiency rater. Evaluate the response objectively."},
+        {"role": "user", "content": prompt}
+    ]
+
+def evaluate_response(transcript, criteria=None, use_cache=True, refresh=False):
     """
     Evaluate the response based on ICAO language proficiency criteria
+
+    The model must reply with the JSON contract in ``utils/evaluation_parser``;
+    a reply that fails validation is sent back once with the error for a
+    corrected answer, and is never left in the cache.
+
+    Re-evaluating the same transcript with the same criteria is served from
+    the LLM cache; see :func:`generate_questions` for ``use_cache``/``refresh``.
     """
     if criteria is None:
-        criteria = {
-            'pronunciation': "Assess the pronunciation, stress, rhythm, and intonation",
-            'structure': "Evaluate the accuracy and variety of grammatical structures",
-            'vocabulary': "Assess the range and appropriateness of vocabulary",
-            'fluency': "Evaluate the flow, speed, and coherence of speech",
-            'comprehension': "Assess the understanding of questions and responses",
-            'interaction': "Evaluate the ability to maintain and develop the conversation"
-        }
+        criteria = ICAO_CRITERIA
+    
+    params = {'max_tokens': 1000, 'temperature': 0.3}
+    messages = _evaluation_messages(transcript, criteria)
+    key = cache_key("gpt-4", messages, **params)
     
     try:
-        prompt = f"""Evaluate the following pilot's response based on ICAO language proficiency criteria (scale 1-6, where 6 is expert level):
-        
-        Response: {transcript}
-        
-        Provide scores and brief justifications for each criterion:"""
-        
-        for criterion, description in criteria.items():
-            prompt += f"\n- {criterion.capitalize()}: {description}"
-        
-        response = openai.ChatCompletion.create(
+        evaluation = cached_chat(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an ICAO language proficiency rater. Evaluate the response objectively."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            n=1,
-            stop=None,
-            temperature=0.3,
+            messages=messages,
+            namespace="evaluate_response",
+            use_cache=use_cache,
+            refresh=refresh,
+            **params
         )
         
-        evaluation = response.choices[0].message['content'].strip()
-        
-        # Extract scores (this is a simple implementation, you might want to make it more robust)
-        scores = {}
-        for line in evaluation.split('\n'):
-            if ':' in line:
-                criterion, score_text = line.split(':', 1)
-                criterion = criterion.strip().lower()
-                # Extract the first number in the score text
-                for word in score_text.split():
-                    try:
-                        score = float(word)
-                        if 1 <= score <= 6:  # ICAO levels are 1-6
-                            scores[criterion] = score
-                            break
-                    except (ValueError, AttributeError):
-                        pass
+        try:
+            parsed = parse_evaluation(evaluation, criteria)
+        except EvaluationParseError as e:
+            # Show the model its reply and the error, and ask once more
+            retry_messages = messages + [
+                {"role": "assistant", "content": evaluation},
+                {"role": "user", "content": f"That reply was invalid: {str(e)}. "
+                                            "Reply again with only the JSON object, following the schema."}
+            ]
+            evaluation = get_client().chat_sync(model="gpt-4", messages=retry_messages, **params)
+            try:
+                parsed = parse_evaluation(evaluation, criteria)
+            except EvaluationParseError:
+                if use_cache:
+                    invalidate(key=key)
+                raise
+            if use_cache:
+                # The corrected reply answers the original prompt
+                get_llm_cache().set(key, "gpt-4", evaluation, namespace="evaluate_response", params=params)
         
+        scores = parsed['scores']
         overall_score = sum(scores.values()) / len(scores) if scores else 0
         return {
             'evaluation': evaluation,
             'scores': scores,
+            'justifications': parsed['justifications'],
+            'summary': parsed['summary'],
             'overall_score': round(overall_score, 1)
         }
     except Exception as e:
@@ -119,5 +176,7 @@ def evaluate_response(transcript, criteria=None):
         return {
             'evaluation': f"Error during evaluation: {str(e)}",
             'scores': {},
+            'justifications': {},
+            'summary': '',
             'overall_score': 0
         }
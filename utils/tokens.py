@@ -0,0 +1,66 @@
+"""
+Token counting
+
+Counts prompt tokens with ``tiktoken`` so requests can be packed against a
+model's context budget. When ``tiktoken`` or its encoding files are not
+available, a four-characters-per-token estimate is used instead.
+"""
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Rough English average used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text, model='gpt-4'):
+    """
+    Count the tokens of ``text`` for ``model``.
+
+    Args:
+        text: Text to count
+        model: Model whose tokenizer to use
+
+    Returns:
+        int: Number of tokens (estimated if no tokenizer is available)
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, max_tokens, model='gpt-4'):
+    """
+    Cut ``text`` to at most ``max_tokens`` tokens.
+
+    Args:
+        text: Text to cut
+        max_tokens: Token limit
+        model: Model whose tokenizer to use
+
+    Returns:
+        str: The text, unchanged if it already fits
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])